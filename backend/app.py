@@ -1,8 +1,31 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
 import csv
+import hmac
 import io
-from csv_processor import process_csv_data
+import json
+import threading
+import time
+from datetime import date
+from csv_processor import process_csv_data, iter_process_rows, new_summary, add_to_summary, summarize_results
+from eos_store import get_eos_store
+from normalizer import get_normalize_cache
+from eos_lookup import get_lookup_cache
+from disk_cache import get_disk_cache
+from config import (
+    PERSIST_UPLOADS, ADMIN_TOKEN, FORECAST_PERIODS, FORECAST_MAX_PERIODS,
+    HIGH_RISK_DAYS, MEDIUM_RISK_DAYS
+)
+from database import (
+    save_results, start_upload, delete_upload, get_connection, get_upload, list_uploads,
+    query_results, summarize_upload, apply_eos_patch, forecast_upload, FORECAST_INTERVALS
+)
+from jobs import get_job_queue, QueueFull
+from delta import ingest_delta
+from responses import encode_json, columnar, compress, gzip_body, recompress
+from response_cache import get_response_cache, read_upload, response_key
+import metrics
+from metrics import STAGE_SECONDS, HTTP_REQUEST_SECONDS
 
 # Create Flask app
 app = Flask(__name__)
@@ -10,13 +33,47 @@ app = Flask(__name__)
 # Enable CORS (allows frontend on different port to call this API)
 CORS(app)
 
+# Values read when /metrics is scraped
+metrics.register_gauge("scrumbot_eos_products", "Products in the loaded EOS database",
+                       lambda: get_eos_store().stats()["products"])
+metrics.register_gauge("scrumbot_eos_reloads", "Times the EOS database has been (re)loaded",
+                       lambda: get_eos_store().stats()["reloads"])
+metrics.register_gauge("scrumbot_jobs_active", "Background jobs queued or running",
+                       lambda: get_job_queue().active_count())
+
+# Request timing (for streamed responses this is the time to first byte)
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    if 'request_start' in g:
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - g.request_start,
+            endpoint=request.url_rule.rule if request.url_rule else "unmatched",
+            method=request.method,
+            status=response.status_code
+        )
+    return response
+
+# Prometheus scrape endpoint
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Stage timings, row counts, cache hits and match scores (Prometheus text format)."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # Health check endpoint - test if server is running
 @app.route('/health', methods=['GET'])
 def health_check():
     """Simple endpoint to check if API is alive"""
     return jsonify({
         "status": "healthy",
-        "message": "Scrumbot API is running"
+        "message": "Scrumbot API is running",
+        "eos_store": get_eos_store().stats(),
+        "caches": [get_normalize_cache().stats(), get_lookup_cache().stats()],
+        "disk_cache": get_disk_cache().stats() if get_disk_cache() else None,
+        "response_cache": get_response_cache().stats() if get_response_cache() else None
     })
 
 # Main CSV processing endpoint
@@ -27,6 +84,28 @@ def process_csv():
     
     Expected: CSV file in request
     Returns: JSON with normalized data and risk scores
+    
+    With ?stream=ndjson (or an "Accept: application/x-ndjson" header) the
+    upload is decoded and processed incrementally and results are sent
+    back as newline-delimited JSON, one row per line, followed by a final
+    {"success": true, "upload_id": ..., "summary": {...}} line.
+    
+    With ?async=1 the file is queued for background processing and a job
+    id is returned right away (202); poll /api/jobs/<job_id> for progress.
+    
+    With ?delta=<name> (or ?delta=1 to use the filename as the name) the
+    file is diffed against the stored snapshot of that name and only new
+    rows are processed; see process_delta().
+    
+    With ?format=columnar, "results" holds one array per column instead
+    of one object per row (see responses.py). Either way large responses
+    are gzip/brotli compressed if the client's Accept-Encoding allows.
+    
+    Plain (non-streamed, non-delta, non-async) responses carry an ETag
+    derived from the file's contents, the EOS database version and
+    today's date. Uploading the same file again the same day is answered
+    from the response cache (including the first upload's upload_id), or
+    with 304 Not Modified if the request's If-None-Match has that ETag.
     """
     try:
         # Check if file was uploaded
@@ -52,28 +131,57 @@ def process_csv():
                 "message": "Please upload a CSV file"
             }), 400
         
-        # Read CSV data
-        csv_data = file.read().decode('utf-8')
+        # Only process what changed since the last export
+        snapshot_name = delta_snapshot_name(file)
+        if snapshot_name:
+            return process_delta(file, snapshot_name)
+        
+        # Stream results back instead of building them all in memory
+        if wants_ndjson():
+            return stream_ndjson(file)
+        
+        # Queue for background processing and return right away
+        if request.args.get('async', '').lower() in ('1', 'true'):
+            return submit_job(file)
+        
+        # Read CSV data, hashing it on the way in
+        data, content_hash = read_upload(file.stream)
+        
+        # Same file, same EOS data, same day: answer from the cache
+        response_cache = get_response_cache()
+        etag = None
+        if response_cache:
+            eos_version = get_eos_store().version
+            etag = response_key(content_hash, eos_version, 'columnar' if wants_columnar() else '')
+            if etag in request.if_none_match:
+                return not_modified(etag)
+            cached = response_cache.get(etag)
+            if cached is not None:
+                return cached_response(cached, etag)
         
         # Process the CSV
-        results = process_csv_data(csv_data)
+        results = process_csv_data(data.decode('utf-8'))
+        del data
+        
+        # The EOS database was reloaded meanwhile: don't cache under the old version
+        if etag and get_eos_store().version != eos_version:
+            etag = None
         
         # Calculate summary statistics
-        summary = {
-            "total": len(results),
-            "critical": sum(1 for r in results if r.get('risk_level') == 'CRITICAL'),
-            "high": sum(1 for r in results if r.get('risk_level') == 'HIGH'),
-            "medium": sum(1 for r in results if r.get('risk_level') == 'MEDIUM'),
-            "low": sum(1 for r in results if r.get('risk_level') == 'LOW'),
-            "unknown": sum(1 for r in results if r.get('risk_level') == 'UNKNOWN')
-        }
+        summary = summarize_results(results)
+        
+        # Save the upload so it can be queried later
+        upload_id = None
+        if PERSIST_UPLOADS:
+            upload_id = save_results(results, file.filename)
         
         # Return success response
-        return jsonify({
+        return results_response({
             "success": True,
+            "upload_id": upload_id,
             "results": results,
             "summary": summary
-        }), 200  # 200 = Success
+        }, etag=etag)  # 200 = Success
     
     except Exception as e:
         # If anything goes wrong, return error
@@ -82,9 +190,404 @@ def process_csv():
             "message": str(e)
         }), 500  # 500 = Internal Server Error
 
+def delta_snapshot_name(file):
+    """Snapshot name from ?delta=, or None if delta mode wasn't asked for."""
+    value = request.args.get('delta', '').strip()
+    if value.lower() in ('', '0', 'false'):
+        return None
+    if value.lower() in ('1', 'true'):
+        return file.filename
+    return value
+
+def process_delta(file, snapshot_name):
+    """
+    Apply an uploaded CSV to a named snapshot as a diff.
+    
+    Rows are fingerprinted (software_name, install_date, source) and
+    compared with the stored snapshot: only added rows are normalized and
+    scored, removed rows are retired, unchanged rows are left alone.
+    The response has added/removed/unchanged counts, the results for the
+    added rows and the summary of the whole updated snapshot.
+    """
+    text = io.TextIOWrapper(file.stream, encoding='utf-8', newline='')
+    delta = ingest_delta(csv.DictReader(text), snapshot_name, file.filename)
+    
+    return results_response({
+        "success": True,
+        "upload_id": delta["upload_id"],
+        "snapshot": snapshot_name,
+        "delta": {
+            "added": delta["added"],
+            "removed": delta["removed"],
+            "unchanged": delta["unchanged"]
+        },
+        "results": delta["results"],
+        "summary": delta["summary"]
+    })
+
+def wants_columnar():
+    """Check if the client asked for the columnar results format."""
+    return request.args.get('format', '').lower() == 'columnar'
+
+def results_response(payload, status=200, etag=None):
+    """
+    Send a payload holding a "results" list, columnar if requested,
+    encoded with the fast JSON encoder and compressed if the client
+    accepts it.
+    
+    With an etag, the response is tagged with it and its body is stored
+    in the response cache under it.
+    """
+    with STAGE_SECONDS.time(stage="serialize"):
+        if wants_columnar():
+            payload = {**payload, "format": "columnar", "results": columnar(payload["results"])}
+        body = encode_json(payload)
+    
+    with STAGE_SECONDS.time(stage="compress"):
+        compressed, encoding = compress(body, request.accept_encodings)
+        if etag and encoding != 'gzip':
+            body = gzip_body(body)
+    
+    if etag:
+        get_response_cache().put(etag, compressed if encoding == 'gzip' else body)
+    
+    return json_response(compressed, encoding, status, etag, "MISS" if etag else None)
+
+def cached_response(gzipped, etag):
+    """Send a body from the response cache."""
+    with STAGE_SECONDS.time(stage="compress"):
+        body, encoding = recompress(gzipped, request.accept_encodings)
+    return json_response(body, encoding, etag=etag, cache_status="HIT")
+
+def not_modified(etag):
+    """304 for a client that already has the response with this ETag."""
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    return response
+
+def json_response(body, encoding, status=200, etag=None, cache_status=None):
+    """Wrap an encoded (and possibly compressed) JSON body in a Response."""
+    response = Response(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(etag)
+    if cache_status:
+        response.headers['X-Cache'] = cache_status
+    return response
+
+def wants_ndjson():
+    """Check if the client asked for a streamed NDJSON response."""
+    if request.args.get('stream', '').lower() in ('ndjson', '1', 'true'):
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+def stream_ndjson(file):
+    """
+    Process an uploaded CSV as a stream and return chunked NDJSON.
+    
+    The upload is decoded incrementally into csv.DictReader and processed
+    in chunks; the summary is a running tally, so memory does not grow
+    with the size of the file.
+    
+    The upload is saved as rows stream out; if processing fails or the
+    client goes away first, the partial upload is deleted again.
+    """
+    def generate():
+        summary = new_summary()
+        serialize_seconds = 0.0
+        writer = None
+        completed = False
+        try:
+            text = io.TextIOWrapper(file.stream, encoding='utf-8', newline='')
+            reader = csv.DictReader(text)
+            writer = start_upload(file.filename) if PERSIST_UPLOADS else None
+            
+            for result in iter_process_rows(reader):
+                add_to_summary(summary, result)
+                if writer:
+                    writer.add(result)
+                start = time.perf_counter()
+                line = json.dumps(result.to_dict()) + "\n"
+                serialize_seconds += time.perf_counter() - start
+                yield line
+            
+            STAGE_SECONDS.observe(serialize_seconds, stage="serialize")
+            upload_id = None
+            if writer:
+                writer.close()
+                upload_id = writer.upload_id
+            completed = True
+            
+            yield json.dumps({"success": True, "upload_id": upload_id, "summary": summary}) + "\n"
+        
+        except Exception as e:
+            # Headers are already sent - report the failure in-band
+            yield json.dumps({
+                "error": "Processing failed",
+                "message": str(e),
+                "summary": summary
+            }) + "\n"
+        
+        finally:
+            # Also reached on GeneratorExit, when the client disconnects
+            if writer and not completed:
+                delete_upload(get_connection(), writer.upload_id)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def submit_job(file):
+    """Queue an uploaded CSV on the background job queue."""
+    csv_data = file.read().decode('utf-8')
+    
+    try:
+        job = get_job_queue().submit(csv_data, file.filename)
+    except QueueFull as e:
+        response = jsonify({
+            "error": "Too many jobs",
+            "message": str(e)
+        })
+        response.headers['Retry-After'] = '30'
+        return response, 429  # 429 = Too Many Requests
+    
+    return jsonify({
+        "success": True,
+        "job_id": job.id,
+        "status_url": f"/api/jobs/{job.id}"
+    }), 202  # 202 = Accepted
+
+# Background job status
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Progress of a queued upload: rows done/total, rows/sec, ETA."""
+    job = get_job_queue().get(job_id)
+    if not job:
+        return jsonify({"error": "Not found", "message": "Unknown job id"}), 404
+    return jsonify(job.progress())
+
+# Background job results
+@app.route('/api/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    """Results of a finished job (same shapes as /api/process-csv)."""
+    job = get_job_queue().get(job_id)
+    if not job:
+        return jsonify({"error": "Not found", "message": "Unknown job id"}), 404
+    
+    if job.status != "done":
+        return jsonify({
+            "error": "Not ready",
+            "message": f"Job is {job.status}",
+            **job.progress()
+        }), 409  # 409 = Conflict
+    
+    return results_response({
+        "success": True,
+        "upload_id": job.upload_id,
+        "results": job.results,
+        "summary": job.summary
+    })
+
+# Cancel a background job
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job."""
+    job = get_job_queue().cancel(job_id)
+    if not job:
+        return jsonify({"error": "Not found", "message": "Unknown job id"}), 404
+    return jsonify(job.progress())
+
+# Stored uploads
+@app.route('/api/uploads', methods=['GET'])
+def uploads():
+    """Most recent processed uploads."""
+    return jsonify({"uploads": list_uploads(get_connection())})
+
+def upload_filters():
+    """Read the risk_level/vendor/source filters from the query string."""
+    risk_levels = [level.strip().upper()
+                   for level in request.args.get('risk_level', '').split(',')
+                   if level.strip()]
+    return {
+        "risk_levels": risk_levels or None,
+        "vendor": request.args.get('vendor') or None,
+        "source": request.args.get('source') or None,
+    }
+
+@app.route('/api/uploads/<int:upload_id>/results', methods=['GET'])
+def upload_results(upload_id):
+    """
+    One page of a stored upload's results, sorted by days until EOS.
+    
+    Query params:
+        limit: rows per page (default 100, max 1000)
+        cursor: next_cursor from the previous page
+        order: asc (soonest EOS first, default) or desc
+        risk_level: comma-separated levels, e.g. CRITICAL,HIGH
+        vendor: canonical vendor name
+        source: inventory source, e.g. CMDB
+    """
+    conn = get_connection()
+    if not get_upload(conn, upload_id):
+        return jsonify({"error": "Not found", "message": "Unknown upload id"}), 404
+    
+    try:
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+        results, next_cursor = query_results(
+            conn, upload_id,
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            descending=request.args.get('order', 'asc').lower() == 'desc',
+            **upload_filters()
+        )
+    except ValueError as e:
+        return jsonify({"error": "Bad request", "message": str(e)}), 400
+    
+    return jsonify({
+        "success": True,
+        "upload_id": upload_id,
+        "results": results,
+        "next_cursor": next_cursor
+    })
+
+@app.route('/api/uploads/<int:upload_id>/summary', methods=['GET'])
+def upload_summary(upload_id):
+    """Risk/vendor/source counts for a stored upload (same filters as results)."""
+    conn = get_connection()
+    upload = get_upload(conn, upload_id)
+    if not upload:
+        return jsonify({"error": "Not found", "message": "Unknown upload id"}), 404
+    
+    return jsonify({
+        "success": True,
+        "upload": upload,
+        "summary": summarize_upload(conn, upload_id, **upload_filters())
+    })
+
+@app.route('/api/uploads/<int:upload_id>/forecast', methods=['GET'])
+def upload_forecast(upload_id):
+    """
+    How a stored upload's risk levels change over the coming months or
+    weeks: rows per level at the start of each period, and rows crossing
+    into each level during it.
+    
+    Query params:
+        periods: number of periods (default FORECAST_PERIODS)
+        interval: month (default) or week
+        as_of: start date, YYYY-MM-DD (default today)
+        high_days, medium_days: risk thresholds (default HIGH_RISK_DAYS,
+                                MEDIUM_RISK_DAYS)
+        vendor, source: same filters as results
+    """
+    conn = get_connection()
+    upload = get_upload(conn, upload_id)
+    if not upload:
+        return jsonify({"error": "Not found", "message": "Unknown upload id"}), 404
+    
+    try:
+        periods = int(request.args.get('periods', FORECAST_PERIODS))
+        high_days = int(request.args.get('high_days', HIGH_RISK_DAYS))
+        medium_days = int(request.args.get('medium_days', MEDIUM_RISK_DAYS))
+        as_of = request.args.get('as_of')
+        as_of = date.fromisoformat(as_of) if as_of else None
+    except ValueError as e:
+        return jsonify({"error": "Bad request", "message": str(e)}), 400
+    
+    interval = request.args.get('interval', 'month').lower()
+    if interval not in FORECAST_INTERVALS:
+        message = f"interval must be one of {', '.join(FORECAST_INTERVALS)}"
+    elif not 1 <= periods <= FORECAST_MAX_PERIODS:
+        message = f"periods must be between 1 and {FORECAST_MAX_PERIODS}"
+    elif not 0 <= high_days <= medium_days:
+        message = "Thresholds must satisfy 0 <= high_days <= medium_days"
+    else:
+        message = None
+    if message:
+        return jsonify({"error": "Bad request", "message": message}), 400
+    
+    filters = upload_filters()
+    forecast = forecast_upload(
+        conn, upload_id,
+        periods=periods,
+        interval=interval,
+        as_of=as_of,
+        high_days=high_days,
+        medium_days=medium_days,
+        vendor=filters["vendor"],
+        source=filters["source"]
+    )
+    
+    body = encode_json({"success": True, "upload": upload, "forecast": forecast})
+    return json_response(*compress(body, request.accept_encodings))
+
+# Admin: change the live EOS database
+
+# One patch at a time: a patch and the re-assessment of stored inventory
+# for it finish before the next patch starts
+_patch_lock = threading.Lock()
+
+@app.route('/api/admin/eos', methods=['POST'])
+def patch_eos_database():
+    """
+    Add, change or remove EOS entries without editing the JSON file.
+    
+    Body: {"changes": [...]}, see eos_store.py for the change format.
+    The patch is applied to the in-memory store (readers are never
+    blocked) and written to the file; then stored inventory matched to
+    the patched products is re-assessed.
+    
+    Requires "Authorization: Bearer <ADMIN_TOKEN>"; disabled while
+    ADMIN_TOKEN is unset.
+    """
+    denied = admin_denied()
+    if denied:
+        return denied
+    
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Bad request", "message": "Expected a JSON object with a changes list"}), 400
+    
+    store = get_eos_store()
+    with _patch_lock:
+        previous_version = store.version
+        try:
+            snapshot, products = store.apply_patch(payload.get('changes'))
+        except ValueError as e:
+            return jsonify({"error": "Bad request", "message": str(e)}), 400
+        
+        # Nothing actually changed: nothing to re-assess
+        reassessed = None
+        if PERSIST_UPLOADS and snapshot.version != previous_version:
+            reassessed = apply_eos_patch(snapshot)
+    
+    return jsonify({
+        "success": True,
+        "version": snapshot.version,
+        "changed": snapshot.version != previous_version,
+        "products": sorted(products),
+        "reassessed": reassessed
+    })
+
+def admin_denied():
+    """Error response if the request doesn't carry the admin token, else None."""
+    if not ADMIN_TOKEN:
+        return jsonify({
+            "error": "Forbidden",
+            "message": "The admin API is disabled (ADMIN_TOKEN is not set)"
+        }), 403
+    supplied = request.headers.get('Authorization', '').encode('utf-8')
+    if not hmac.compare_digest(supplied, f"Bearer {ADMIN_TOKEN}".encode('utf-8')):
+        return jsonify({"error": "Unauthorized", "message": "Missing or wrong admin token"}), 401
+    return None
+
 # Run the server
 if __name__ == '__main__':
     print("Starting Scrumbot API...")
+    
+    # Load the EOS database up front so the first upload doesn't pay for it
+    get_eos_store().get()
+    
     print("Health check: http://localhost:5000/health")
     print("API endpoint: http://localhost:5000/api/process-csv")
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,324 @@
+import argparse
+import codecs
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+from collections import deque
+from config import PROCESS_CHUNK_SIZE, BATCH_CHECKPOINT_ROWS
+from csv_processor import RESULT_FIELDS, iter_process_rows, new_summary, add_to_summary
+
+# ============================================================================
+# OFFLINE BATCH PROCESSING
+# ============================================================================
+# Streams an inventory export of any size from disk to disk:
+#
+#   python backend/batch.py inventory.csv.gz results.jsonl
+#
+# Memory use is bounded by the chunk size (rows are never collected into a
+# list). Every BATCH_CHECKPOINT_ROWS rows the output is flushed and the
+# input byte offset, row count and running summary are saved next to the
+# output; running the same command again after a crash or Ctrl-C resumes
+# from the last checkpoint instead of starting over.
+
+OUTPUT_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 2.0
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def output_format(path):
+    """Pick csv/jsonl from the output file extension."""
+    fmt = OUTPUT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Can't tell the output format of {path}; use .csv or .jsonl (or --format)")
+    return fmt
+
+
+class InputReader:
+    """
+    Line iterator over a CSV file (plain or gzip) that tracks the byte
+    offset of the next unread line.
+
+    csv.reader pulls lines one at a time and only as many as the current
+    row needs, so after each parsed row `offset` is exactly where the next
+    row starts. For gzip input the offset is into the decompressed data.
+    """
+
+    def __init__(self, path, offset=0):
+        self._raw = open(path, 'rb')
+        self.size = os.fstat(self._raw.fileno()).st_size
+        self.compressed = self._raw.read(2) == GZIP_MAGIC
+        self._raw.seek(0)
+        self._file = gzip.GzipFile(fileobj=self._raw) if self.compressed else self._raw
+        if offset:
+            # gzip seeks by decompressing up to the offset: still far
+            # cheaper than normalizing and matching those rows again
+            self._file.seek(offset)
+        self.offset = offset
+
+    def __iter__(self):
+        for line in self._file:
+            length = len(line)
+            if self.offset == 0 and line.startswith(codecs.BOM_UTF8):
+                line = line[len(codecs.BOM_UTF8):]
+            self.offset += length
+            yield line.decode('utf-8', errors='replace')
+
+    def fraction_read(self):
+        """Share of the file on disk read so far (compressed bytes for gzip)."""
+        return self._raw.tell() / self.size if self.size else 1.0
+
+    def close(self):
+        self._file.close()
+        self._raw.close()
+
+
+def read_header(lines):
+    """Return the first non-blank CSV row (the column names), or None."""
+    for header in csv.reader(lines):
+        if header:
+            return header
+    return None
+
+
+# ============================================================================
+# CHECKPOINTS
+# ============================================================================
+
+def load_checkpoint(path):
+    """Return the saved checkpoint dict, or None if there is none."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, state):
+    """Write the checkpoint atomically (a crash leaves the old one intact)."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def check_checkpoint(state, input_path, output_path, fmt):
+    """Refuse to resume from a checkpoint written for another run."""
+    if state['input'] != os.path.abspath(input_path) or state['input_size'] != os.path.getsize(input_path):
+        raise ValueError(f"Checkpoint is for a different input ({state['input']}); use --restart")
+    if state['format'] != fmt:
+        raise ValueError(f"Checkpoint was written for {state['format']} output; use --restart")
+    if not os.path.exists(output_path) or os.path.getsize(output_path) < state['output_bytes']:
+        raise ValueError(f"{output_path} is shorter than at the last checkpoint; use --restart")
+
+
+# ============================================================================
+# OUTPUT
+# ============================================================================
+
+def csv_writer(f, write_header):
+    writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+    if write_header:
+        writer.writeheader()
+    return writer.writerow
+
+
+def jsonl_writer(f, write_header):
+    def write(result):
+        f.write(json.dumps(result.to_dict(), separators=(',', ':')))
+        f.write('\n')
+    return write
+
+
+WRITERS = {'csv': csv_writer, 'jsonl': jsonl_writer}
+
+
+class Progress:
+    """Rows/sec and percent-done line on stderr, at most every `interval` s."""
+
+    def __init__(self, stream=sys.stderr, interval=PROGRESS_INTERVAL):
+        self.stream = stream
+        self.interval = interval
+        self.end = '\r' if stream.isatty() else '\n'
+        self.start = time.monotonic()
+        self.last = self.start
+
+    def update(self, rows, new_rows, fraction, force=False):
+        now = time.monotonic()
+        if not force and now - self.last < self.interval:
+            return
+        self.last = now
+        elapsed = now - self.start
+        rate = new_rows / elapsed if elapsed > 0 else 0.0
+        self.stream.write(f"{rows:,} rows  {fraction * 100:5.1f}%  {rate:,.0f} rows/s{self.end}")
+        self.stream.flush()
+
+    def finish(self, rows, new_rows, fraction):
+        self.update(rows, new_rows, fraction, force=True)
+        if self.end == '\r':
+            self.stream.write('\n')
+
+
+# ============================================================================
+# BATCH RUN
+# ============================================================================
+
+def run_batch(input_path, output_path, fmt=None, checkpoint_path=None,
+              checkpoint_rows=BATCH_CHECKPOINT_ROWS, workers=None,
+              chunk_size=PROCESS_CHUNK_SIZE, restart=False, limit=None, progress=None):
+    """
+    Process an inventory CSV file into a CSV or JSONL results file.
+
+    Args:
+        input_path: CSV file (gzip-compressed files are detected automatically)
+        output_path: results file (.csv or .jsonl)
+        fmt: 'csv' or 'jsonl' (default: from the output extension)
+        checkpoint_path: resume state (default: output_path + '.checkpoint')
+        checkpoint_rows: rows between checkpoints
+        workers: number of processes (default PARALLEL_WORKERS, 1 = serial)
+        chunk_size: rows per chunk
+        restart: ignore an existing checkpoint and start from the top
+        limit: stop after this many rows (the checkpoint is kept)
+        progress: Progress instance, or None for no progress output
+
+    Returns:
+        dict with rows (total written), resumed_from, summary and
+        complete (False if stopped by `limit`)
+    """
+    fmt = fmt or output_format(output_path)
+    checkpoint_path = checkpoint_path or output_path + '.checkpoint'
+
+    # Step 1: Pick up where the last run stopped
+    state = None if restart else load_checkpoint(checkpoint_path)
+    if state:
+        check_checkpoint(state, input_path, output_path, fmt)
+        # Drop anything written after the checkpoint
+        os.truncate(output_path, state['output_bytes'])
+        start_rows = state['rows']
+        summary = state['summary']
+    else:
+        start_rows = 0
+        summary = new_summary()
+
+    reader = InputReader(input_path, state['offset'] if state else 0)
+    lines = iter(reader)
+    fieldnames = state['fieldnames'] if state else read_header(lines)
+    stop_at = start_rows + limit if limit is not None else None
+
+    # Step 2: Note the input offset at every checkpoint boundary as rows
+    # are read; results arrive later (chunks in flight), so the offset is
+    # saved once that many results have been written
+    marks = deque()
+
+    def tracked_rows():
+        if fieldnames is None:
+            return
+        count = start_rows
+        for row in csv.DictReader(lines, fieldnames=fieldnames):
+            count += 1
+            if count % checkpoint_rows == 0 or count == stop_at:
+                marks.append((count, reader.offset))
+            yield row
+            if count == stop_at:
+                return
+
+    out = open(output_path, 'a' if state else 'w', newline='', encoding='utf-8')
+
+    def checkpoint(rows, offset):
+        out.flush()
+        os.fsync(out.fileno())
+        save_checkpoint(checkpoint_path, {
+            "input": os.path.abspath(input_path),
+            "input_size": os.path.getsize(input_path),
+            "format": fmt,
+            "fieldnames": fieldnames,
+            "offset": offset,
+            "rows": rows,
+            "output_bytes": os.fstat(out.fileno()).st_size,
+            "summary": summary,
+        })
+
+    # Step 3: Stream results to the output, checkpointing as we go
+    write = WRITERS[fmt](out, write_header=not state)
+    rows = start_rows
+    try:
+        for result in iter_process_rows(tracked_rows(), chunk_size, workers):
+            write(result)
+            add_to_summary(summary, result)
+            rows += 1
+
+            if marks and marks[0][0] == rows:
+                checkpoint(*marks.popleft())
+            if progress:
+                progress.update(rows, rows - start_rows, reader.fraction_read())
+
+        if progress:
+            progress.finish(rows, rows - start_rows, reader.fraction_read())
+    finally:
+        out.close()
+        reader.close()
+
+    # Step 4: A finished run needs no resume point
+    complete = stop_at is None or rows < stop_at
+    if complete and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    return {
+        "rows": rows,
+        "resumed_from": start_rows,
+        "summary": summary,
+        "complete": complete,
+    }
+
+
+def main():
+    """Process an inventory export offline, resuming after interruptions."""
+    parser = argparse.ArgumentParser(description="Assess EOS risk for a large inventory CSV file")
+    parser.add_argument('input', help="Inventory CSV (software_name, install_date, source); may be gzipped")
+    parser.add_argument('output', help="Results file (.csv or .jsonl)")
+    parser.add_argument('--format', choices=sorted(WRITERS), help="Output format (default: from extension)")
+    parser.add_argument('--checkpoint', help="Checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument('--checkpoint-rows', type=int, default=BATCH_CHECKPOINT_ROWS,
+                        help=f"Rows between checkpoints (default: {BATCH_CHECKPOINT_ROWS})")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: PARALLEL_WORKERS)")
+    parser.add_argument('--chunk-size', type=int, default=PROCESS_CHUNK_SIZE, help="Rows per chunk")
+    parser.add_argument('--limit', type=int, help="Stop after this many rows (resume later)")
+    parser.add_argument('--restart', action='store_true', help="Ignore any checkpoint and start over")
+    parser.add_argument('--quiet', action='store_true', help="No progress output")
+    args = parser.parse_args()
+
+    if args.checkpoint_rows < 1:
+        parser.error("--checkpoint-rows must be at least 1")
+
+    start = time.perf_counter()
+    try:
+        stats = run_batch(
+            args.input, args.output, fmt=args.format, checkpoint_path=args.checkpoint,
+            checkpoint_rows=args.checkpoint_rows, workers=args.workers,
+            chunk_size=args.chunk_size, restart=args.restart, limit=args.limit,
+            progress=None if args.quiet else Progress()
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume from the last checkpoint",
+              file=sys.stderr)
+        sys.exit(130)
+    elapsed = time.perf_counter() - start
+
+    resumed = f" (resumed at row {stats['resumed_from']:,})" if stats['resumed_from'] else ""
+    print(f"Wrote {stats['rows']:,} rows to {args.output}{resumed} in {elapsed:.2f}s")
+    print("  " + ", ".join(f"{level}: {count:,}" for level, count in stats['summary'].items()))
+    if not stats['complete']:
+        print("  Stopped at --limit; run again to continue")
+
+
+if __name__ == '__main__':
+    main()
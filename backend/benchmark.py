@@ -0,0 +1,536 @@
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+import disk_cache
+from csv_processor import process_csv_data, shutdown_process_pool
+from disk_cache import DiskCache, get_disk_cache
+from eos_lookup import lookup_eos_date, get_lookup_cache
+from normalizer import normalize_software_name, get_normalize_cache
+from risk_calculator import calculate_risk
+from eos_index import ProductIndex
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Timings only compare on the machine that recorded them, so the baseline
+# is not committed: record one with --save on the machine that runs --check
+BASELINE_PATH = 'data/benchmark_baseline.json'
+DEFAULT_SIZES = [1000, 100000]
+ALL_SIZES = [1000, 100000, 1000000]
+
+# Fail the check when throughput drops more than this fraction below baseline
+REGRESSION_THRESHOLD = 0.25
+
+# How each EOS product shows up in real inventories
+PRODUCT_SPELLINGS = {
+    "Microsoft Office": ["Microsoft Office", "MS Office", "msft office", "Office"],
+    "Windows Server": ["Windows Server", "Win Server", "win svr", "win srv", "Microsoft Windows Server"],
+    "SQL Server": ["SQL Server", "Microsoft SQL Server", "MS SQL Server", "sql svr"],
+    "Python": ["Python", "python", "CPython"],
+    "Oracle Database": ["Oracle Database", "Oracle DB", "oracle db"],
+    "Adobe Acrobat": ["Adobe Acrobat", "Adobe Acrobat Reader", "adobe acrobat reader"],
+    "VMware vSphere": ["VMware vSphere", "vmware vsphere client", "VMware ESXi vSphere"],
+    "Red Hat Enterprise Linux": ["Red Hat Enterprise Linux", "RHEL", "redhat enterprise linux"],
+}
+
+# Versions as they appear in the wild, keyed by EOS database version
+VERSION_SPELLINGS = {
+    "19c": ["19c", "19.3.0.0.0", "19.18.0.0", "19"],
+    "21c": ["21c", "21.3.0.0.0", "21"],
+    "DC": ["DC", "DC 2023.001", "DC v2023.003.20215"],
+    "365": ["365", "365 ProPlus"],
+}
+
+EDITIONS = ["Professional Plus", "Enterprise Edition", "Standard", "Developer Edition",
+            "Datacenter", "Express", "Community"]
+
+ARCHITECTURES = ["x64", "x86", "amd64", "x86_64", "arm64", "i386"]
+
+# Software that is not in the EOS database at all
+UNKNOWN_SOFTWARE = ["Google Chrome", "Mozilla Firefox", "Notepad++", "7-Zip",
+                    "Slack", "Zoom Client", "Git for Windows", "Node.js"]
+
+SOURCES = ["CMDB", "Endpoint Tool", "Asset Manager", "Discovery Scan", "Developer Workstation"]
+
+# Building blocks for synthetic lifecycle catalogs
+CATALOG_SYLLABLES = ["ac", "me", "glo", "bex", "ini", "tech", "um", "brel", "hoo", "li", "van",
+                     "de", "lay", "stark", "tyr", "ell", "cy", "ber", "dyne", "soy", "lent",
+                     "won", "ka", "ap", "er", "ture", "mas", "sive", "os", "corp", "zor", "ga",
+                     "nex", "tra", "vo", "lux", "qua", "ri", "sol", "ta", "pix", "el", "ro"]
+CATALOG_FAMILIES = ["Data", "Cloud", "Secure", "Net", "Office", "Sync", "Backup", "Vision",
+                    "Stream", "Core", "Edge", "Identity", "Mail", "Print", "Build", "Desk",
+                    "Analytics", "Workflow", "Storage", "Remote"]
+CATALOG_SUFFIXES = ["Server", "Client", "Manager", "Studio", "Gateway", "Agent", "Suite",
+                    "Console", "Platform", "Viewer", "Connector", "Toolkit"]
+
+# Minimum share of queries where the blocked match equals the exhaustive one
+RECALL_MIN = 0.99
+
+
+# ============================================================================
+# SYNTHETIC INVENTORY GENERATOR
+# ============================================================================
+
+def messy_version(version, rng):
+    """A realistic spelling of an EOS database version."""
+    if version in VERSION_SPELLINGS:
+        return rng.choice(VERSION_SPELLINGS[version])
+
+    # Long dotted build numbers: 3.11 -> 3.11.4, 7.0 -> 7.0.3.21, 8 -> 8.6
+    # (years like 2019 stay as they are)
+    if len(version) < 4 and rng.random() < 0.4:
+        extra = rng.randint(1, 3)
+        version += ''.join(f".{rng.randint(0, 20)}" for _ in range(extra))
+    return version
+
+
+def messy_name(product, version, rng):
+    """
+    One messy software_name for a product/version, in the styles seen in
+    data/sample_input.csv.
+    """
+    parts = [rng.choice(PRODUCT_SPELLINGS.get(product, [product]))]
+
+    version = messy_version(version, rng)
+    parts.append(('v' + version) if rng.random() < 0.15 and version[0].isdigit() else version)
+
+    if rng.random() < 0.3:
+        parts.append(rng.choice(EDITIONS))
+    if rng.random() < 0.2:
+        parts.append(rng.choice(ARCHITECTURES))
+
+    name = ' '.join(parts)
+
+    # Separator/case styles: "Name 1.0", "name_1.0", "name-1.0"
+    style = rng.random()
+    if style < 0.35:
+        name = name.lower().replace(' ', '_')
+    elif style < 0.45:
+        name = name.lower().replace(' ', '-')
+
+    return name
+
+
+def generate_inventory(n, seed=42, eos_db=None, unknown_rate=0.05):
+    """
+    Generate n synthetic inventory rows with messy software names.
+
+    Args:
+        n: number of rows
+        seed: random seed (same seed = same rows)
+        eos_db: EOS database dict to draw products from (default: data/eos_database.json)
+        unknown_rate: fraction of rows for software not in the EOS database
+
+    Returns:
+        List of dicts with software_name, install_date, source
+    """
+    rng = random.Random(seed)
+
+    if eos_db is None:
+        with open('data/eos_database.json', 'r') as f:
+            eos_db = json.load(f)
+    entries = [(product, version) for product, versions in eos_db.items() for version in versions]
+
+    first_install = date(2018, 1, 1)
+    rows = []
+    for _ in range(n):
+        if rng.random() < unknown_rate:
+            name = f"{rng.choice(UNKNOWN_SOFTWARE)} {rng.randint(1, 120)}.{rng.randint(0, 9)}"
+        else:
+            name = messy_name(*rng.choice(entries), rng)
+
+        rows.append({
+            "software_name": name,
+            "install_date": (first_install + timedelta(days=rng.randint(0, 2500))).isoformat(),
+            "source": rng.choice(SOURCES),
+        })
+
+    return rows
+
+
+def generate_csv(n, seed=42):
+    """Same as generate_inventory, as a CSV string (for process_csv_data)."""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=["software_name", "install_date", "source"])
+    writer.writeheader()
+    writer.writerows(generate_inventory(n, seed))
+    return output.getvalue()
+
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+# Each benchmark times one stage over n rows and returns rows/sec.
+# The micro-benchmarks call the uncached functions, so they measure the
+# work itself rather than the LRU caches in front of it.
+
+def time_rows(func, items):
+    """Call func on every item; returns rows/sec."""
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    elapsed = time.perf_counter() - start
+    return len(items) / elapsed if elapsed > 0 else float('inf')
+
+
+def bench_normalize(rows):
+    names = [row["software_name"] for row in rows]
+    return time_rows(normalize_software_name, names)
+
+
+def bench_lookup(rows):
+    triples = []
+    for row in rows:
+        normalized = normalize_software_name(row["software_name"])
+        triples.append((normalized["vendor"], normalized["product"], normalized["version"]))
+    return time_rows(lambda triple: lookup_eos_date(*triple), triples)
+
+
+def bench_risk(rows):
+    # Mix of past, near and far EOS dates plus subscriptions (None)
+    rng = random.Random(len(rows))
+    today = date.today()
+    dates = [None if rng.random() < 0.1
+             else (today + timedelta(days=rng.randint(-1000, 2000))).isoformat()
+             for _ in rows]
+    return time_rows(calculate_risk, dates)
+
+
+@contextmanager
+def scratch_disk_cache():
+    """
+    Point the disk cache at a throwaway file for the duration, so cold
+    starts can empty it without wiping the real one (worker processes
+    started inside pick the file up from the environment). Nothing changes
+    if the disk cache is disabled.
+    """
+    if not disk_cache.DISK_CACHE_PATH:
+        yield
+        return
+
+    saved = disk_cache._disk_cache, os.environ.get('DISK_CACHE_PATH')
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, 'normalize_cache.db')
+    os.environ['DISK_CACHE_PATH'] = path
+    disk_cache._disk_cache = DiskCache(path)
+    try:
+        yield
+    finally:
+        # Workers still using the scratch file go too
+        shutdown_process_pool()
+        disk_cache._disk_cache = saved[0]
+        if saved[1] is None:
+            os.environ.pop('DISK_CACHE_PATH')
+        else:
+            os.environ['DISK_CACHE_PATH'] = saved[1]
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def bench_process_csv(rows, csv_string):
+    # Cold start: empty caches (the disk cache is a scratch copy, see
+    # run_benchmarks), fresh worker pool
+    get_normalize_cache().clear()
+    get_lookup_cache().clear()
+    if get_disk_cache():
+        get_disk_cache().clear()
+    shutdown_process_pool()
+
+    start = time.perf_counter()
+    results = process_csv_data(csv_string)
+    elapsed = time.perf_counter() - start
+    return len(results) / elapsed if elapsed > 0 else float('inf')
+
+
+BENCHMARKS = {
+    "normalize_software_name": bench_normalize,
+    "lookup_eos_date": bench_lookup,
+    "calculate_risk": bench_risk,
+    "process_csv_data": bench_process_csv,
+}
+
+
+def run_benchmarks(sizes, repeat=3, seed=42, names=None):
+    """
+    Run the benchmarks at each size.
+
+    Args:
+        sizes: list of row counts
+        repeat: runs per benchmark (best is kept; sizes >= 1M run once)
+        seed: generator seed
+        names: benchmark names to run (default: all)
+
+    Returns:
+        dict: benchmark name -> {str(size): rows/sec}
+    """
+    names = names or list(BENCHMARKS)
+    results = {name: {} for name in names}
+
+    with scratch_disk_cache():
+        for size in sizes:
+            rows = generate_inventory(size, seed)
+            csv_string = generate_csv(size, seed) if "process_csv_data" in names else None
+            runs = 1 if size >= 1000000 else repeat
+
+            for name in names:
+                bench = BENCHMARKS[name]
+                args = (rows, csv_string) if name == "process_csv_data" else (rows,)
+                best = max(bench(*args) for _ in range(runs))
+                results[name][str(size)] = round(best, 1)
+                print(f"  {name:<26} {size:>9,} rows  {best:>12,.0f} rows/sec", flush=True)
+
+    return results
+
+
+# ============================================================================
+# PRODUCT MATCHING RECALL
+# ============================================================================
+# Large catalogs only fuzzy score the trigram index's top candidates. These
+# helpers check that this pruning finds the same product as scoring every
+# catalog entry.
+
+def generate_catalog(n, seed=42, eos_db=None):
+    """
+    Product names for a synthetic lifecycle catalog of about n products:
+    the real EOS database products plus vendor/family/suffix combinations.
+    """
+    rng = random.Random(seed)
+
+    if eos_db is None:
+        with open('data/eos_database.json', 'r') as f:
+            eos_db = json.load(f)
+
+    def pseudo_word(syllables):
+        return ''.join(rng.choice(CATALOG_SYLLABLES) for _ in range(syllables)).title()
+
+    # About 20 products per vendor; product names mix common words with
+    # vendor-specific brand names
+    vendors = [pseudo_word(rng.randint(2, 3)) for _ in range(max(n // 20, 1))]
+    brands = [pseudo_word(rng.randint(2, 3)) for _ in range(max(n // 5, 1))]
+
+    names = dict.fromkeys(eos_db)
+    while len(names) < n:
+        words = [rng.choice(vendors), rng.choice(brands)]
+        if rng.random() < 0.5:
+            words.append(rng.choice(CATALOG_FAMILIES))
+        words.append(rng.choice(CATALOG_SUFFIXES))
+        if rng.random() < 0.3:
+            words.append(rng.choice(EDITIONS))
+        names[' '.join(dict.fromkeys(words))] = None
+
+    return list(names)
+
+
+def catalog_queries(catalog, n, seed=42):
+    """
+    n messy (vendor, product) queries drawn from catalog names: vendor
+    split off, words dropped or reordered, typos, lower-casing.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        words = rng.choice(catalog).split()
+
+        vendor = None
+        if len(words) > 2 and rng.random() < 0.6:
+            vendor, words = words[0], words[1:]
+        if len(words) > 2 and rng.random() < 0.3:
+            words.pop(rng.randrange(len(words)))
+        if rng.random() < 0.2:
+            rng.shuffle(words)
+        if rng.random() < 0.3:
+            word = rng.randrange(len(words))
+            pos = rng.randrange(len(words[word]))
+            words[word] = words[word][:pos] + rng.choice('aeiourst') + words[word][pos + 1:]
+
+        product = ' '.join(words)
+        queries.append((vendor, product.lower() if rng.random() < 0.5 else product))
+
+    return queries
+
+
+def measure_recall(catalog, queries):
+    """
+    Match queries with and without the trigram blocking stage.
+
+    Returns:
+        dict with recall (share of identical (product, score) results),
+        per-query timings and the mismatches
+    """
+    exhaustive = ProductIndex(catalog, blocking=False)
+    blocked = ProductIndex(catalog, blocking=True)
+
+    start = time.perf_counter()
+    expected = [exhaustive.match(vendor, product) for vendor, product in queries]
+    exhaustive_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = [blocked.match(vendor, product) for vendor, product in queries]
+    blocked_seconds = time.perf_counter() - start
+
+    mismatches = [(query, want, got) for query, want, got in zip(queries, expected, found) if want != got]
+    return {
+        "catalog_size": len(catalog),
+        "queries": len(queries),
+        "recall": 1 - len(mismatches) / len(queries) if queries else 1.0,
+        "exhaustive_us_per_query": round(exhaustive_seconds / len(queries) * 1e6, 1),
+        "blocked_us_per_query": round(blocked_seconds / len(queries) * 1e6, 1),
+        "mismatches": mismatches,
+    }
+
+
+# ============================================================================
+# MEMORY
+# ============================================================================
+
+def measure_memory(n, seed=42):
+    """
+    Memory held by the results of process_csv_data for n generated rows.
+
+    The caches are warmed by a first run, so only what the result list
+    itself keeps alive is counted (including strings parsed from the CSV).
+
+    Returns: dict with rows, total bytes, bytes per row, peak bytes
+    """
+    csv_string = generate_csv(n, seed)
+    process_csv_data(csv_string, workers=1)
+
+    tracemalloc.start()
+    results = process_csv_data(csv_string, workers=1)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "rows": len(results),
+        "bytes": current,
+        "bytes_per_row": current / len(results) if results else 0.0,
+        "peak_bytes": peak,
+    }
+
+
+# ============================================================================
+# BASELINES
+# ============================================================================
+
+def load_baseline(path=BASELINE_PATH):
+    """Load a saved baseline, or None if there isn't one."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def machine_description():
+    """Short description of this machine, stored with a baseline."""
+    return f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs"
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    """Merge results into the baseline file (other sizes are kept)."""
+    baseline = load_baseline(path) or {"results": {}}
+
+    for name, by_size in results.items():
+        baseline["results"].setdefault(name, {}).update(by_size)
+
+    baseline["updated_at"] = datetime.now().isoformat(timespec='seconds')
+    baseline["python"] = platform.python_version()
+    baseline["machine"] = machine_description()
+
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def check_regressions(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare results against a baseline.
+
+    Returns:
+        List of (name, size, baseline rows/sec, current rows/sec) for every
+        benchmark more than `threshold` slower than its baseline
+    """
+    regressions = []
+    for name, by_size in results.items():
+        for size, current in by_size.items():
+            expected = baseline.get("results", {}).get(name, {}).get(size)
+            if expected and current < expected * (1 - threshold):
+                regressions.append((name, size, expected, current))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark normalization, lookup and CSV processing")
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma-separated row counts, or 'all' for 1k/100k/1M")
+    parser.add_argument('--only', help="Comma-separated benchmark names to run")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per benchmark (best is kept)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument('--save', action='store_true', help="Save results as the new baseline")
+    parser.add_argument('--check', action='store_true', help="Exit 1 if slower than the baseline")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Allowed slowdown before --check fails (fraction)")
+    parser.add_argument('--recall', type=int, metavar='PRODUCTS',
+                        help="Only check trigram blocking recall on a synthetic catalog of this size")
+    parser.add_argument('--memory', type=int, metavar='ROWS',
+                        help="Only measure the memory held by the results for this many rows")
+    args = parser.parse_args()
+
+    if args.memory:
+        report = measure_memory(args.memory, args.seed)
+        print(f"Results for {report['rows']:,} rows: {report['bytes'] / 2**20:,.1f} MiB "
+              f"({report['bytes_per_row']:,.0f} bytes/row, peak {report['peak_bytes'] / 2**20:,.1f} MiB)")
+        print(f"Per 1M rows: {report['bytes_per_row'] * 1e6 / 2**20:,.0f} MiB")
+        sys.exit(0)
+
+    if args.recall:
+        catalog = generate_catalog(args.recall, args.seed)
+        report = measure_recall(catalog, catalog_queries(catalog, 2000, args.seed))
+        print(f"Catalog: {report['catalog_size']:,} products, {report['queries']:,} queries")
+        print(f"Recall vs exhaustive search: {report['recall']:.2%}")
+        print(f"Per query: {report['exhaustive_us_per_query']:,}us exhaustive, "
+              f"{report['blocked_us_per_query']:,}us blocked")
+        for query, want, got in report['mismatches'][:10]:
+            print(f"  {query}: expected {want}, got {got}")
+        sys.exit(0 if report['recall'] >= RECALL_MIN else 1)
+
+    sizes = ALL_SIZES if args.sizes == 'all' else [int(s) for s in args.sizes.split(',')]
+    names = args.only.split(',') if args.only else None
+
+    print("Running benchmarks:\n")
+    results = run_benchmarks(sizes, repeat=args.repeat, seed=args.seed, names=names)
+
+    if args.check:
+        baseline = load_baseline(args.baseline)
+        if baseline is None:
+            print(f"\nNo baseline at {args.baseline} (run with --save first)")
+            sys.exit(1)
+        if baseline.get("machine") != machine_description():
+            print(f"\nWarning: baseline recorded on {baseline.get('machine')}, this is "
+                  f"{machine_description()}; re-record it here with --save")
+
+        regressions = check_regressions(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions (more than {args.threshold:.0%} below baseline):")
+            for name, size, expected, current in regressions:
+                print(f"  {name} @ {size}: {current:,.0f} rows/sec (baseline {expected:,.0f})")
+            sys.exit(1)
+        print(f"\nNo regressions (threshold {args.threshold:.0%})")
+
+    if args.save:
+        save_baseline(results, args.baseline)
+        print(f"\nBaseline saved to {args.baseline}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+
+# Marker for "not in cache" (None is a valid cached value)
+_MISSING = object()
+
+
+def freeze(value):
+    """
+    Return a read-only copy of a result so cached entries can't be
+    changed by callers. Dicts become MappingProxyType (recursively),
+    lists become tuples.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe least-recently-used cache with hit/miss/eviction
+    counters.
+    """
+
+    def __init__(self, maxsize, name=None):
+        self.maxsize = maxsize
+        self.name = name
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        # Membership test only: no hit/miss counting, no LRU reordering
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Return the cached value (marking it recently used) or default."""
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry if full."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, or compute, freeze and cache it.
+
+        The computation runs outside the lock, so two threads missing on
+        the same key may both compute it; the result is the same either way.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = freeze(compute())
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._data.clear()
+
+    def discard_where(self, predicate):
+        """Drop the entries for which predicate(key, value) is true. Returns how many."""
+        with self._lock:
+            stale = [key for key, value in self._data.items() if predicate(key, value)]
+            for key in stale:
+                del self._data[key]
+        return len(stale)
+
+    def stats(self):
+        """Counters for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,121 @@
+import os
+from dotenv import load_dotenv
+
+# Pick up overrides from a local .env file (if present)
+load_dotenv()
+
+# ============================================================================
+# EOS DATABASE
+# ============================================================================
+
+# Path to the lifecycle data, relative to the repo root
+EOS_DATABASE_PATH = os.getenv('EOS_DATABASE_PATH', 'data/eos_database.json')
+
+# ============================================================================
+# NORMALIZATION
+# ============================================================================
+
+# Extra vendor aliases, JSON {"Vendor": ["alias", ...]}, added to the
+# built-in table ('' for none)
+VENDOR_ALIASES_PATH = os.getenv('VENDOR_ALIASES_PATH', '')
+
+# ============================================================================
+# RISK THRESHOLDS
+# ============================================================================
+
+# EOS within this many days is HIGH risk
+HIGH_RISK_DAYS = int(os.getenv('HIGH_RISK_DAYS', '90'))
+
+# EOS within this many days (but not HIGH) is MEDIUM risk
+MEDIUM_RISK_DAYS = int(os.getenv('MEDIUM_RISK_DAYS', '180'))
+
+# Periods (months or weeks) in an exposure forecast unless asked otherwise
+FORECAST_PERIODS = int(os.getenv('FORECAST_PERIODS', '24'))
+
+# Most periods a single forecast may ask for
+FORECAST_MAX_PERIODS = int(os.getenv('FORECAST_MAX_PERIODS', '520'))
+
+# ============================================================================
+# IN-MEMORY CACHES
+# ============================================================================
+
+# Max distinct raw software names kept by the normalization cache
+NORMALIZE_CACHE_SIZE = int(os.getenv('NORMALIZE_CACHE_SIZE', '50000'))
+
+# Max distinct (vendor, product, version) triples kept by the EOS lookup cache
+LOOKUP_CACHE_SIZE = int(os.getenv('LOOKUP_CACHE_SIZE', '20000'))
+
+# On-disk cache of raw software_name -> normalized result + EOS match,
+# kept across runs ('' to disable)
+DISK_CACHE_PATH = os.getenv('DISK_CACHE_PATH', 'data/normalize_cache.db')
+
+# ============================================================================
+# CSV PROCESSING
+# ============================================================================
+
+# Rows normalized and looked up together per batch when streaming
+PROCESS_CHUNK_SIZE = int(os.getenv('PROCESS_CHUNK_SIZE', '5000'))
+
+# Worker processes for large inventories (1 = always serial)
+PARALLEL_WORKERS = int(os.getenv('PARALLEL_WORKERS', str(os.cpu_count() or 1)))
+
+# Inputs smaller than this are processed serially
+PARALLEL_MIN_ROWS = int(os.getenv('PARALLEL_MIN_ROWS', '20000'))
+
+# Offline batch runs (backend/batch.py) save a resume point this often (rows)
+BATCH_CHECKPOINT_ROWS = int(os.getenv('BATCH_CHECKPOINT_ROWS', '100000'))
+
+# ============================================================================
+# API RESPONSES
+# ============================================================================
+
+# JSON responses at least this large are gzip/brotli compressed when the
+# client accepts it
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+
+# On-disk cache of responses to repeated uploads of the same file
+# ('' to disable)
+RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH', 'data/response_cache.db')
+
+# Max total size of the cached (compressed) responses, in bytes
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(256 * 2**20)))
+
+# ============================================================================
+# STORAGE
+# ============================================================================
+
+# SQLite database for processed uploads, relative to the repo root
+DATABASE_PATH = os.getenv('DATABASE_PATH', 'data/scrumbot.db')
+
+# Rows written per transaction
+DB_BATCH_SIZE = int(os.getenv('DB_BATCH_SIZE', '10000'))
+
+# Save every processed upload so it can be queried later
+PERSIST_UPLOADS = os.getenv('PERSIST_UPLOADS', 'true').lower() in ('1', 'true', 'yes')
+
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+
+# Threads running queued uploads (?async=1)
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+
+# Max jobs queued or running at once; more get HTTP 429
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '8'))
+
+# Finished jobs kept in memory for result fetching
+JOB_HISTORY = int(os.getenv('JOB_HISTORY', '50'))
+
+# ============================================================================
+# ADMIN API
+# ============================================================================
+
+# Bearer token required by /api/admin endpoints ('' disables them)
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+# Record per-stage timings, row counts and match scores for /metrics
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
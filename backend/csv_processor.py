@@ -1,117 +1,410 @@
+import atexit
 import csv
 import io
-from normalizer import normalize_software_name
-from eos_lookup import lookup_eos_date
-from risk_calculator import calculate_risk
+import multiprocessing
+import signal
+import sys
+import threading
+from collections import deque, Counter
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from operator import attrgetter
+from config import PROCESS_CHUNK_SIZE, PARALLEL_WORKERS, PARALLEL_MIN_ROWS
+from normalizer import normalize_software_name_cached, prime_normalize_cache, get_normalize_cache
+from eos_lookup import lookup_eos_batch, prime_lookup_cache
+from disk_cache import get_disk_cache
+from eos_store import get_eos_store
+from risk_calculator import calculate_risk, NO_EOS_RISK
+from metrics import STAGE_SECONDS, ROWS_TOTAL, drain, merge
 
-def process_csv(input_file):
+def lookup_key(normalized):
+    """
+    Return the (vendor, product, version) triple to look up, or None if
+    the normalizer couldn't extract all three.
+    """
+    if normalized['vendor'] and normalized['product'] and normalized['version']:
+        return (normalized['vendor'], normalized['product'], normalized['version'])
+    return None
+
+# Keys of every result row, in order
+RESULT_FIELDS = [
+    "raw_input", "install_date", "source", "vendor", "product", "version",
+    "edition", "confidence_score", "eos_date", "eos_source", "eos_product",
+    "eos_version", "risk_level", "days_until_eos", "risk_reason"
+]
+
+class ResultRecord(Mapping):
+    """
+    One result row, stored in slots instead of a dict.
+
+    Large inventories keep every result in memory (sync responses, jobs),
+    and a 15-key dict costs several times more than the values it holds.
+    A record reads like a read-only dict of RESULT_FIELDS (r['vendor'],
+    r.get(...), keys(), == against a dict), so consumers don't change;
+    to_dict() gives a real dict where one is needed (JSON encoding).
+    """
+    __slots__ = tuple(RESULT_FIELDS)
+
+    def __init__(self, raw_input, install_date, source, vendor, product, version,
+                 edition, confidence_score, eos_date, eos_source, eos_product,
+                 eos_version, risk_level, days_until_eos, risk_reason):
+        self.raw_input = raw_input
+        self.install_date = install_date
+        self.source = source
+        self.vendor = vendor
+        self.product = product
+        self.version = version
+        self.edition = edition
+        self.confidence_score = confidence_score
+        self.eos_date = eos_date
+        self.eos_source = eos_source
+        self.eos_product = eos_product
+        self.eos_version = eos_version
+        self.risk_level = risk_level
+        self.days_until_eos = days_until_eos
+        self.risk_reason = risk_reason
+
+    def __getitem__(self, key):
+        if key not in _RESULT_FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(RESULT_FIELDS)
+
+    def __len__(self):
+        return len(RESULT_FIELDS)
+
+    def __repr__(self):
+        return f"ResultRecord({self.to_dict()!r})"
+
+    def __reduce__(self):
+        # Pickled as a plain tuple of values (results coming back from workers)
+        return ResultRecord, _result_values(self)
+
+    def to_dict(self):
+        """The result as a plain dict (keys in RESULT_FIELDS order)."""
+        return dict(zip(RESULT_FIELDS, _result_values(self)))
+
+_RESULT_FIELD_SET = frozenset(RESULT_FIELDS)
+_result_values = attrgetter(*RESULT_FIELDS)
+
+def result_to_dict(value):
+    """
+    JSON encoder fallback (`default=`) for result records.
+
+    Raises: TypeError for anything else, like json.dumps would
+    """
+    if isinstance(value, ResultRecord):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def build_result(row, normalized, eos_info, risk_info=None):
+    """
+    Combine everything into one result row.
+
+    Args:
+        row: CSV row dict
+        normalized: normalize_software_name result
+        eos_info: EOS lookup result or None
+        risk_info: calculate_risk result for the EOS date (computed if omitted)
+
+    Returns: ResultRecord
+    """
+    if not eos_info:
+        eos_info = {}
+        risk_info = NO_EOS_RISK
+    elif risk_info is None:
+        risk_info = calculate_risk(eos_info.get('eos_date'))
+
+    # Install dates and sources repeat across rows, and so do names: share
+    # one string per distinct value instead of one per row (csv.DictReader
+    # fills the missing cells of short rows with None)
+    return ResultRecord(
+        sys.intern(row.get('software_name') or ''),
+        sys.intern(row.get('install_date') or ''),
+        sys.intern(row.get('source') or ''),
+        normalized['vendor'],
+        normalized['product'],
+        normalized['version'],
+        normalized['edition'],
+        normalized['confidence_score'],
+        eos_info.get('eos_date'),
+        eos_info.get('source'),
+        eos_info.get('matched_product'),
+        eos_info.get('matched_version'),
+        risk_info['risk_level'],
+        risk_info['days_until_eos'],
+        risk_info['reason']
+    )
+
+def process_rows(rows):
+    """
+    Run the full pipeline over CSV rows.
+
+    Rows are normalized first, then all (vendor, product, version) triples
+    are resolved in one batch lookup, and finally results are assembled
+    in input order.
+
+    Args:
+        rows: iterable of dicts with software_name, install_date, source
+
+    Returns:
+        List of ResultRecords with normalized data, EOS info, and risk scores
+    """
+    rows = list(rows)
+
+    # Step 0: Load names seen in earlier runs from the on-disk cache
+    disk_cache = get_disk_cache()
+    if disk_cache:
+        eos_version = get_eos_store().version
+        new_names = warm_caches(disk_cache, rows, eos_version)
+
+    # Step 1: Normalize the software names
+    with STAGE_SECONDS.time(stage="normalize"):
+        normalized_rows = [
+            normalize_software_name_cached(row.get('software_name', ''))
+            for row in rows
+        ]
+
+    # Step 2: Look up EOS dates for all distinct triples at once
+    keys = [lookup_key(normalized) for normalized in normalized_rows]
+    eos_results = lookup_eos_batch(key for key in keys if key)
+
+    # Step 3: Calculate risk once per distinct EOS date (rows with the
+    # same date share the reason string) and combine everything
+    with STAGE_SECONDS.time(stage="risk"):
+        risks = {}
+        results = []
+        for row, normalized, key in zip(rows, normalized_rows, keys):
+            eos_info = eos_results[key] if key else None
+            risk_info = None
+            if eos_info:
+                eos_date = eos_info.get('eos_date')
+                risk_info = risks.get(eos_date)
+                if risk_info is None:
+                    risk_info = risks[eos_date] = calculate_risk(eos_date)
+            results.append(build_result(row, normalized, eos_info, risk_info))
+
+    for risk_level, count in Counter(result['risk_level'] for result in results).items():
+        ROWS_TOTAL.inc(count, risk_level=risk_level)
+
+    # Step 4: Remember names seen for the first time
+    if disk_cache and new_names:
+        remember_names(disk_cache, new_names, rows, normalized_rows, keys, eos_results, eos_version)
+
+    return results
+
+# ============================================================================
+# PERSISTENT CACHE
+# ============================================================================
+# The on-disk cache only feeds the in-memory caches: names found there
+# are loaded into the normalization and lookup LRUs before a chunk is
+# processed, so the regex and fuzzy work is skipped for them.
+
+def warm_caches(disk_cache, rows, eos_version):
+    """
+    Load this chunk's names from the disk cache into the in-memory caches.
+
+    Returns: set of names in neither cache (to be stored after processing)
+    """
+    memory_cache = get_normalize_cache()
+    names = [
+        name for name in dict.fromkeys(row.get('software_name', '') for row in rows)
+        if name not in memory_cache
+    ]
+    if not names:
+        return set()
+
+    with STAGE_SECONDS.time(stage="disk_cache_read"):
+        found = disk_cache.get_many(names, eos_version)
+
+    prime_normalize_cache((name, normalized) for name, (normalized, _) in found.items())
+    prime_lookup_cache(
+        ((lookup_key(normalized), eos_data) for normalized, eos_data in found.values()
+         if lookup_key(normalized)),
+        eos_version
+    )
+
+    return set(names) - found.keys()
+
+def remember_names(disk_cache, names, rows, normalized_rows, keys, eos_results, eos_version):
+    """Store the results for names not yet in the disk cache."""
+    # The EOS database was reloaded mid-chunk: these results may be stale
+    if get_eos_store().version != eos_version:
+        return
+
+    entries = {}
+    for row, normalized, key in zip(rows, normalized_rows, keys):
+        name = row.get('software_name', '')
+        if name in names and name not in entries:
+            entries[name] = (name, normalized, eos_results[key] if key else None)
+
+    with STAGE_SECONDS.time(stage="disk_cache_write"):
+        disk_cache.put_many(entries.values(), eos_version)
+
+# ============================================================================
+# PARALLEL PROCESSING
+# ============================================================================
+
+# Shared worker pools (one per worker count), created on first parallel run
+_process_pools = {}
+_process_pools_lock = threading.Lock()
+
+def _init_worker():
+    """Pool initializer: load the EOS database and indexes once per worker."""
+    # Ctrl-C reaches the whole process group; let the parent handle it and
+    # shut the pool down instead of every worker dying mid-chunk
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    get_eos_store().snapshot()
+
+def _process_chunk(chunk):
+    """Pool task: process one chunk and hand back this worker's metrics."""
+    return process_rows(chunk), drain()
+
+def get_process_pool(workers):
+    """
+    Return the shared process pool with `workers` processes, creating it
+    on first use. Pools are never replaced while running: a request
+    asking for another worker count gets a pool of its own, so no request
+    loses the pool it is using.
+    """
+    with _process_pools_lock:
+        pool = _process_pools.get(workers)
+        if pool is None:
+            # spawn, not fork: the Flask server is multithreaded
+            pool = _process_pools[workers] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+        return pool
+
+@atexit.register
+def shutdown_process_pool():
+    """Stop the shared process pools (if running)."""
+    with _process_pools_lock:
+        pools = list(_process_pools.values())
+        _process_pools.clear()
+
+    for pool in pools:
+        pool.shutdown(cancel_futures=True)
+
+def iter_chunks(rows, chunk_size):
+    """Split an iterable of rows into lists of at most `chunk_size` rows."""
+    rows = iter(rows)
+    while True:
+        # Pulling rows from a csv.DictReader is where the parsing happens
+        with STAGE_SECONDS.time(stage="parse"):
+            chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def iter_process_rows(rows, chunk_size=PROCESS_CHUNK_SIZE, workers=None):
+    """
+    Stream results for an iterable of CSV rows.
+
+    Rows are pulled and processed `chunk_size` at a time, so memory use
+    is bounded by the chunk size rather than the size of the input.
+
+    With more than one worker, chunks are processed in a process pool
+    (at most two chunks per worker in flight). Inputs with fewer than
+    PARALLEL_MIN_ROWS rows are always processed serially.
+
+    Args:
+        rows: iterable of dicts with software_name, install_date, source
+        chunk_size: rows per chunk
+        workers: number of processes (default PARALLEL_WORKERS, 1 = serial)
+
+    Yields: result dicts in input order
+    """
+    if workers is None:
+        workers = PARALLEL_WORKERS
+
+    rows = iter(rows)
+
+    if workers > 1:
+        # Small files aren't worth shipping to other processes
+        head = list(islice(rows, PARALLEL_MIN_ROWS))
+        if len(head) < PARALLEL_MIN_ROWS:
+            workers = 1
+        rows = chain(head, rows)
+
+    if workers <= 1:
+        for chunk in iter_chunks(rows, chunk_size):
+            yield from process_rows(chunk)
+        return
+
+    pool = get_process_pool(workers)
+    pending = deque()
+
+    def finished_chunk():
+        results, worker_metrics = pending.popleft().result()
+        merge(worker_metrics)
+        return results
+
+    for chunk in iter_chunks(rows, chunk_size):
+        pending.append(pool.submit(_process_chunk, chunk))
+        if len(pending) >= workers * 2:
+            yield from finished_chunk()
+
+    while pending:
+        yield from finished_chunk()
+
+def new_summary():
+    """Return an empty risk summary tally."""
+    return {
+        "total": 0,
+        "critical": 0,
+        "high": 0,
+        "medium": 0,
+        "low": 0,
+        "unknown": 0
+    }
+
+def add_to_summary(summary, result):
+    """Count one result in a running risk summary."""
+    summary["total"] += 1
+    level = (result.get('risk_level') or '').lower()
+    if level in summary:
+        summary[level] += 1
+
+def summarize_results(results):
+    """Build the risk summary in a single pass over the results."""
+    summary = new_summary()
+    for result in results:
+        add_to_summary(summary, result)
+    return summary
+
+def process_csv(input_file, workers=None, chunk_size=PROCESS_CHUNK_SIZE):
     """
     Process software inventory CSV file.
-    
+
     Args:
         input_file: Path to CSV file
-    
+        workers: number of processes (default PARALLEL_WORKERS, 1 = serial)
+        chunk_size: rows per chunk
+
     Returns:
         List of dicts with normalized data, EOS info, and risk scores
     """
-    results = []
-    
-    with open(input_file, 'r') as f:
-        reader = csv.DictReader(f)
-        
-        for row in reader:
-            software_name = row.get('software_name', '')
-            
-            # Step 1: Normalize the software name
-            normalized = normalize_software_name(software_name)
-            
-            # Step 2: Look up EOS date
-            eos_info = None
-            if normalized['vendor'] and normalized['product'] and normalized['version']:
-                eos_info = lookup_eos_date(
-                    normalized['vendor'],
-                    normalized['product'],
-                    normalized['version']
-                )
-            
-            # Step 3: Calculate risk
-            risk_info = {"risk_level": "UNKNOWN", "days_until_eos": None, "reason": "No EOS data available"}
-            if eos_info:
-                risk_info = calculate_risk(eos_info.get('eos_date'))
-            
-            # Combine everything
-            result = {
-                "raw_input": software_name,
-                "install_date": row.get('install_date', ''),
-                "source": row.get('source', ''),
-                "vendor": normalized['vendor'],
-                "product": normalized['product'],
-                "version": normalized['version'],
-                "edition": normalized['edition'],
-                "confidence_score": normalized['confidence_score'],
-                "eos_date": eos_info.get('eos_date') if eos_info else None,
-                "eos_source": eos_info.get('source') if eos_info else None,
-                "risk_level": risk_info['risk_level'],
-                "days_until_eos": risk_info['days_until_eos'],
-                "risk_reason": risk_info['reason']
-            }
-            
-            results.append(result)
-    
-    return results
+    with open(input_file, 'r', newline='') as f:
+        return list(iter_process_rows(csv.DictReader(f), chunk_size, workers))
 
 
-def process_csv_data(csv_string):
+def process_csv_data(csv_string, workers=None, chunk_size=PROCESS_CHUNK_SIZE):
     """
     Process CSV data from a string (for API use).
-    
+
     Args:
         csv_string: CSV content as string
-    
+        workers: number of processes (default PARALLEL_WORKERS, 1 = serial)
+        chunk_size: rows per chunk
+
     Returns:
         List of dicts with normalized data, EOS info, and risk scores
     """
-    results = []
     csv_file = io.StringIO(csv_string)
-    reader = csv.DictReader(csv_file)
-    
-    for row in reader:
-        software_name = row.get('software_name', '')
-        
-        # Step 1: Normalize the software name
-        normalized = normalize_software_name(software_name)
-        
-        # Step 2: Look up EOS date
-        eos_info = None
-        if normalized['vendor'] and normalized['product'] and normalized['version']:
-            eos_info = lookup_eos_date(
-                normalized['vendor'],
-                normalized['product'],
-                normalized['version']
-            )
-        
-        # Step 3: Calculate risk
-        risk_info = {"risk_level": "UNKNOWN", "days_until_eos": None, "reason": "No EOS data available"}
-        if eos_info:
-            risk_info = calculate_risk(eos_info.get('eos_date'))
-        
-        # Combine everything
-        result = {
-            "raw_input": software_name,
-            "install_date": row.get('install_date', ''),
-            "source": row.get('source', ''),
-            "vendor": normalized['vendor'],
-            "product": normalized['product'],
-            "version": normalized['version'],
-            "edition": normalized['edition'],
-            "confidence_score": normalized['confidence_score'],
-            "eos_date": eos_info.get('eos_date') if eos_info else None,
-            "eos_source": eos_info.get('source') if eos_info else None,
-            "risk_level": risk_info['risk_level'],
-            "days_until_eos": risk_info['days_until_eos'],
-            "risk_reason": risk_info['reason']
-        }
-        
-        results.append(result)
-    
-    return results
\ No newline at end of file
+    return list(iter_process_rows(csv.DictReader(csv_file), chunk_size, workers))
@@ -0,0 +1,1190 @@
+import base64
+import json
+import sqlite3
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+import numpy as np
+from config import (
+    DATABASE_PATH, DB_BATCH_SIZE, FORECAST_PERIODS, HIGH_RISK_DAYS, MEDIUM_RISK_DAYS
+)
+from eos_store import get_eos_store
+from eos_lookup import lookup_eos_batch
+from metrics import STAGE_SECONDS
+from normalizer import VENDOR_ALIASES
+from risk_calculator import (
+    RISK_BUCKETS, NO_EOS_RISK, days_until_eos, risk_buckets, describe_risk, calculate_risk,
+    bucket_counts
+)
+from sqlite_cache import QUERY_BATCH
+
+# ============================================================================
+# SCHEMA (see docs/database-schema.md)
+# ============================================================================
+
+# Undated rows sort after every real date
+EOS_SORT_KEY = "IFNULL(eos_date, '9999-12-31')"
+RESULT_SORT_KEY = "IFNULL(r.eos_date, '9999-12-31')"
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS vendors (
+    id INTEGER PRIMARY KEY,
+    canonical_name TEXT NOT NULL UNIQUE,
+    aliases TEXT
+);
+
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    vendor_id INTEGER REFERENCES vendors(id),
+    product_name TEXT NOT NULL UNIQUE,
+    product_family TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_products_vendor ON products(vendor_id);
+
+CREATE TABLE IF NOT EXISTS eos_dates (
+    id INTEGER PRIMARY KEY,
+    product_id INTEGER NOT NULL REFERENCES products(id),
+    version TEXT NOT NULL,
+    eos_date TEXT,
+    source TEXT,
+    notes TEXT,
+    last_verified TEXT,
+    UNIQUE (product_id, version)
+);
+
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY,
+    filename TEXT,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    snapshot_name TEXT              -- set for inventories kept up to date by delta uploads
+);
+
+CREATE INDEX IF NOT EXISTS idx_uploads_snapshot ON uploads(snapshot_name) WHERE snapshot_name IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS software_inventory (
+    id INTEGER PRIMARY KEY,
+    upload_id INTEGER NOT NULL REFERENCES uploads(id),
+    row_number INTEGER NOT NULL,
+    raw_input TEXT,
+    install_date TEXT,
+    source TEXT,
+    normalized_vendor_id INTEGER REFERENCES vendors(id),
+    normalized_product_id INTEGER REFERENCES products(id),
+    product TEXT,
+    version TEXT,
+    edition TEXT,
+    confidence_score REAL,
+    eos_date_id INTEGER REFERENCES eos_dates(id),
+    created_at TEXT NOT NULL,
+    fingerprint INTEGER             -- hash of the input row (delta uploads only)
+);
+
+CREATE INDEX IF NOT EXISTS idx_inventory_eos ON software_inventory(eos_date_id);
+CREATE INDEX IF NOT EXISTS idx_inventory_fingerprint ON software_inventory(upload_id, fingerprint)
+    WHERE fingerprint IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS risk_assessments (
+    inventory_id INTEGER PRIMARY KEY REFERENCES software_inventory(id),
+    upload_id INTEGER NOT NULL REFERENCES uploads(id),
+    risk_level TEXT NOT NULL,
+    days_until_eos INTEGER,
+    reason TEXT,
+    eos_date TEXT,
+    calculated_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_risk_upload_level ON risk_assessments(upload_id, risk_level, {EOS_SORT_KEY});
+CREATE INDEX IF NOT EXISTS idx_risk_upload_eos ON risk_assessments(upload_id, {EOS_SORT_KEY});
+
+-- Row counts per upload/risk level/vendor/source, kept up to date on
+-- every write so summaries never have to scan the inventory
+CREATE TABLE IF NOT EXISTS upload_counts (
+    upload_id INTEGER NOT NULL REFERENCES uploads(id),
+    risk_level TEXT NOT NULL,
+    vendor_id INTEGER NOT NULL,     -- 0 = no vendor
+    source TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    PRIMARY KEY (upload_id, risk_level, vendor_id, source)
+) WITHOUT ROWID;
+
+-- Rows with a dated EOS match per upload/EOS date/vendor/source, kept up
+-- to date the same way, so forecasts never have to scan the inventory
+CREATE TABLE IF NOT EXISTS upload_eos_counts (
+    upload_id INTEGER NOT NULL REFERENCES uploads(id),
+    eos_date TEXT NOT NULL,
+    vendor_id INTEGER NOT NULL,     -- 0 = no vendor
+    source TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    PRIMARY KEY (upload_id, eos_date, vendor_id, source)
+) WITHOUT ROWID;
+"""
+
+
+def now():
+    """Current timestamp as stored in the database."""
+    return datetime.now().isoformat(timespec='seconds')
+
+
+# ============================================================================
+# CONNECTIONS
+# ============================================================================
+
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+_initialized = set()
+
+
+def connect(path=None):
+    """
+    Open a new connection with the pragmas every connection needs and make
+    sure the schema exists.
+
+    WAL mode lets readers run while an upload is being written.
+    """
+    path = path or DATABASE_PATH
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")   # 64 MB, keeps index pages hot during bulk inserts
+
+    if path not in _initialized:
+        conn.executescript(SCHEMA)
+        _initialized.add(path)
+
+    return conn
+
+
+def get_connection(path=None):
+    """
+    Return this thread's connection (one connection per thread, reused
+    for every call on that thread).
+    """
+    path = path or DATABASE_PATH
+    pool = getattr(_local, 'connections', None)
+    if pool is None:
+        pool = _local.connections = {}
+
+    conn = pool.get(path)
+    if conn is None:
+        conn = pool[path] = connect(path)
+        with _connections_lock:
+            _connections.append(conn)
+
+    return conn
+
+
+def close_all():
+    """Close every pooled connection (all threads)."""
+    with _connections_lock:
+        for conn in _connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # Owned by another, still running thread
+                pass
+        _connections.clear()
+    _local.__dict__.clear()
+
+
+class transaction:
+    """
+    Context manager for a write transaction.
+
+    BEGIN IMMEDIATE takes the write lock up front, so id allocation inside
+    the transaction can't race with another writer.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
+
+
+# ============================================================================
+# REFERENCE DATA (vendors, products, eos_dates)
+# ============================================================================
+
+def get_meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row['value'] if row else None
+
+
+def set_meta(conn, key, value):
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, value)
+    )
+
+
+def sync_vendors(conn):
+    """Make sure every canonical vendor exists. Returns {name: id}."""
+    with transaction(conn):
+        conn.executemany(
+            "INSERT INTO vendors (canonical_name, aliases) VALUES (?, ?) "
+            "ON CONFLICT(canonical_name) DO UPDATE SET aliases = excluded.aliases",
+            [(name, json.dumps(aliases)) for name, aliases in VENDOR_ALIASES.items()]
+        )
+    return {row['canonical_name']: row['id']
+            for row in conn.execute("SELECT id, canonical_name FROM vendors")}
+
+
+def sync_eos_catalog(conn, snapshot):
+    """
+    Mirror the EOS database snapshot into products/eos_dates.
+
+    Only runs when the snapshot version differs from the one last synced.
+    """
+    if get_meta(conn, 'eos_version') == snapshot.version:
+        return
+
+    vendor_ids = sync_vendors(conn)
+    synced_at = now()
+
+    with transaction(conn):
+        for product_name in snapshot.db:
+            mirror_product(conn, snapshot, product_name, vendor_ids, synced_at)
+
+        set_meta(conn, 'eos_version', snapshot.version)
+
+
+def mirror_product(conn, snapshot, product_name, vendor_ids, synced_at):
+    """Upsert one product of a snapshot and its versions. Returns the product id."""
+    vendor = snapshot.product_vendors[product_name]
+    conn.execute(
+        "INSERT INTO products (vendor_id, product_name) VALUES (?, ?) "
+        "ON CONFLICT(product_name) DO UPDATE SET vendor_id = excluded.vendor_id",
+        (vendor_ids.get(vendor), product_name)
+    )
+    product_id = conn.execute(
+        "SELECT id FROM products WHERE product_name = ?", (product_name,)
+    ).fetchone()['id']
+
+    conn.executemany(
+        "INSERT INTO eos_dates (product_id, version, eos_date, source, notes, last_verified) "
+        "VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT(product_id, version) DO UPDATE SET "
+        "eos_date = excluded.eos_date, source = excluded.source, "
+        "notes = excluded.notes, last_verified = excluded.last_verified",
+        [(product_id, version, entry.get('eos_date'), entry.get('source'),
+          entry.get('notes'), synced_at)
+         for version, entry in snapshot.db[product_name].items()]
+    )
+    return product_id
+
+
+def load_reference_ids(conn):
+    """
+    Return lookup maps used when writing inventory rows:
+    vendor name -> id, product name -> id, (product, version) -> eos_dates id
+    """
+    vendor_ids = {row['canonical_name']: row['id']
+                  for row in conn.execute("SELECT id, canonical_name FROM vendors")}
+    product_ids = {row['product_name']: row['id']
+                   for row in conn.execute("SELECT id, product_name FROM products")}
+    eos_ids = {(row['product_name'], row['version']): row['id']
+               for row in conn.execute(
+                   "SELECT e.id, p.product_name, e.version "
+                   "FROM eos_dates e JOIN products p ON p.id = e.product_id")}
+    return vendor_ids, product_ids, eos_ids
+
+
+# ============================================================================
+# UPLOADS
+# ============================================================================
+
+def adjust_counts(conn, deltas):
+    """
+    Apply changes to upload_counts.
+
+    Args:
+        deltas: list of (upload_id, risk_level, vendor_id, source, change)
+    """
+    conn.executemany(
+        "INSERT INTO upload_counts (upload_id, risk_level, vendor_id, source, row_count) "
+        "VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(upload_id, risk_level, vendor_id, source) "
+        "DO UPDATE SET row_count = row_count + excluded.row_count",
+        deltas
+    )
+
+
+def adjust_eos_counts(conn, deltas):
+    """
+    Apply changes to upload_eos_counts.
+
+    Args:
+        deltas: list of (upload_id, eos_date, vendor_id, source, change)
+    """
+    conn.executemany(
+        "INSERT INTO upload_eos_counts (upload_id, eos_date, vendor_id, source, row_count) "
+        "VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(upload_id, eos_date, vendor_id, source) "
+        "DO UPDATE SET row_count = row_count + excluded.row_count",
+        deltas
+    )
+
+
+def dated_eos(eos_date, days_until):
+    """EOS date a row is counted under in upload_eos_counts, or None if undated/invalid."""
+    return eos_date if days_until is not None else None
+
+
+def create_upload(conn, filename=None, snapshot_name=None):
+    """Register a new upload and return its id."""
+    with transaction(conn):
+        cur = conn.execute(
+            "INSERT INTO uploads (filename, created_at, snapshot_name) VALUES (?, ?, ?)",
+            (filename, now(), snapshot_name)
+        )
+    return cur.lastrowid
+
+
+class InventoryWriter:
+    """
+    Buffered writer for the results of one upload.
+
+    Rows are collected and written with executemany, DB_BATCH_SIZE rows
+    per transaction, into software_inventory and risk_assessments.
+
+    Also used to append rows to an existing upload (delta uploads); the
+    upload's row_count is increased by the rows written.
+    """
+
+    def __init__(self, conn, upload_id, snapshot, batch_size=DB_BATCH_SIZE):
+        self.conn = conn
+        self.upload_id = upload_id
+        self.batch_size = batch_size
+        self.row_count = 0
+        self._pending = []
+
+        sync_vendors(conn)
+        sync_eos_catalog(conn, snapshot)
+        self.vendor_ids, self.product_ids, self.eos_ids = load_reference_ids(conn)
+
+    def add(self, result, row_number=None, fingerprint=None):
+        """
+        Queue one result row (a dict from csv_processor).
+
+        row_number defaults to the next position in this writer's output;
+        fingerprint is the input row hash kept for delta uploads.
+        """
+        if row_number is None:
+            row_number = self.row_count + len(self._pending)
+        self._pending.append((row_number, fingerprint, result))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, results):
+        for result in results:
+            self.add(result)
+
+    def flush(self):
+        """Write all queued rows in one transaction."""
+        if not self._pending:
+            return
+
+        rows = self._pending
+        self._pending = []
+        created_at = now()
+        vendor_ids, product_ids, eos_ids = self.vendor_ids, self.product_ids, self.eos_ids
+
+        with STAGE_SECONDS.time(stage="persist"), transaction(self.conn):
+            # Ids are allocated here; safe because we hold the write lock
+            first_id = self.conn.execute(
+                "SELECT COALESCE(MAX(id), 0) + 1 FROM software_inventory"
+            ).fetchone()[0]
+
+            upload_id = self.upload_id
+            inventory = []
+            risks = []
+            for inventory_id, (row_number, fingerprint, r) in enumerate(rows, first_id):
+                eos_product = r['eos_product']
+                inventory.append((
+                    inventory_id, upload_id, row_number,
+                    r['raw_input'], r['install_date'], r['source'],
+                    vendor_ids.get(r['vendor']), product_ids.get(eos_product),
+                    r['product'], r['version'], r['edition'], r['confidence_score'],
+                    eos_ids.get((eos_product, r['eos_version'])),
+                    created_at, fingerprint
+                ))
+                risks.append((
+                    inventory_id, upload_id, r['risk_level'],
+                    r['days_until_eos'], r['risk_reason'], r['eos_date'], created_at
+                ))
+
+            self.conn.executemany(
+                "INSERT INTO software_inventory (id, upload_id, row_number, raw_input, "
+                "install_date, source, normalized_vendor_id, normalized_product_id, "
+                "product, version, edition, confidence_score, eos_date_id, created_at, "
+                "fingerprint) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                inventory
+            )
+            self.conn.executemany(
+                "INSERT INTO risk_assessments (inventory_id, upload_id, risk_level, "
+                "days_until_eos, reason, eos_date, calculated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                risks
+            )
+
+            counts = Counter(
+                (upload_id, risk[2], inv[6] or 0, inv[5] or '')
+                for inv, risk in zip(inventory, risks)
+            )
+            adjust_counts(self.conn, [key + (n,) for key, n in counts.items()])
+
+            eos_counts = Counter(
+                (upload_id, risk[5], inv[6] or 0, inv[5] or '')
+                for inv, risk in zip(inventory, risks) if risk[3] is not None
+            )
+            adjust_eos_counts(self.conn, [key + (n,) for key, n in eos_counts.items()])
+
+        self.row_count += len(rows)
+
+    def close(self):
+        """Flush remaining rows and add them to the upload's row count."""
+        self.flush()
+        with transaction(self.conn):
+            self.conn.execute(
+                "UPDATE uploads SET row_count = row_count + ? WHERE id = ?",
+                (self.row_count, self.upload_id)
+            )
+        return self.row_count
+
+
+def start_upload(filename=None, snapshot=None, conn=None, snapshot_name=None):
+    """
+    Register a new upload and return an InventoryWriter for its rows
+    (for callers that produce results incrementally).
+    """
+    conn = conn or get_connection()
+    snapshot = snapshot or get_eos_store().snapshot()
+
+    upload_id = create_upload(conn, filename, snapshot_name)
+    return InventoryWriter(conn, upload_id, snapshot)
+
+
+def save_results(results, filename=None, snapshot=None, conn=None):
+    """
+    Persist the output of csv_processor.process_csv_data.
+
+    Args:
+        results: iterable of result dicts
+        filename: original upload name (optional)
+        snapshot: EOS snapshot the results were matched against
+                  (default: the current one)
+        conn: connection to use (default: this thread's pooled connection)
+
+    Returns: upload id
+    """
+    writer = start_upload(filename, snapshot, conn)
+    writer.add_many(results)
+    writer.close()
+    return writer.upload_id
+
+
+def get_upload(conn, upload_id):
+    """Return the uploads row as a dict, or None."""
+    row = conn.execute("SELECT * FROM uploads WHERE id = ?", (upload_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def delete_upload(conn, upload_id):
+    """Delete an upload with all its rows, assessments and counts."""
+    with transaction(conn):
+        conn.execute(
+            "DELETE FROM software_inventory WHERE id IN "
+            "(SELECT inventory_id FROM risk_assessments WHERE upload_id = ?)",
+            (upload_id,)
+        )
+        for table in ("risk_assessments", "upload_counts", "upload_eos_counts"):
+            conn.execute(f"DELETE FROM {table} WHERE upload_id = ?", (upload_id,))
+        conn.execute("DELETE FROM uploads WHERE id = ?", (upload_id,))
+
+
+# ============================================================================
+# SNAPSHOTS (delta uploads)
+# ============================================================================
+# A named snapshot is one upload that successive exports of the same
+# inventory are applied to as diffs: rows are matched by fingerprint,
+# new rows are appended and rows missing from the latest export are
+# retired (deleted along with their assessments).
+
+def get_snapshot_upload(conn, snapshot_name):
+    """Return the upload holding a named snapshot as a dict, or None."""
+    row = conn.execute(
+        "SELECT * FROM uploads WHERE snapshot_name = ? ORDER BY id DESC LIMIT 1",
+        (snapshot_name,)
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def snapshot_fingerprints(conn, upload_id):
+    """Return Counter fingerprint -> number of rows in the upload."""
+    return Counter(dict(conn.execute(
+        "SELECT fingerprint, COUNT(*) FROM software_inventory "
+        "WHERE upload_id = ? AND fingerprint IS NOT NULL GROUP BY fingerprint",
+        (upload_id,)
+    ).fetchall()))
+
+
+def retire_rows(conn, upload_id, fingerprints):
+    """
+    Remove rows that are no longer in a snapshot.
+
+    Args:
+        conn: database connection
+        upload_id: snapshot upload
+        fingerprints: dict fingerprint -> number of rows to remove
+
+    Returns: number of rows removed
+    """
+    with transaction(conn):
+        ids = []
+        for fingerprint, n in fingerprints.items():
+            ids.extend(row[0] for row in conn.execute(
+                "SELECT id FROM software_inventory WHERE upload_id = ? AND fingerprint = ? LIMIT ?",
+                (upload_id, fingerprint, n)
+            ))
+
+        deltas = Counter()
+        eos_deltas = Counter()
+        for i in range(0, len(ids), QUERY_BATCH):
+            batch = ids[i:i + QUERY_BATCH]
+            placeholders = ', '.join('?' * len(batch))
+            for level, vendor_id, source, eos_date, days in conn.execute(
+                "SELECT r.risk_level, IFNULL(i.normalized_vendor_id, 0), IFNULL(i.source, ''), "
+                "r.eos_date, r.days_until_eos "
+                "FROM software_inventory i JOIN risk_assessments r ON r.inventory_id = i.id "
+                f"WHERE i.id IN ({placeholders})",
+                batch
+            ):
+                deltas[(upload_id, level, vendor_id, source)] -= 1
+                if dated_eos(eos_date, days) is not None:
+                    eos_deltas[(upload_id, eos_date, vendor_id, source)] -= 1
+            conn.execute(f"DELETE FROM risk_assessments WHERE inventory_id IN ({placeholders})", batch)
+            conn.execute(f"DELETE FROM software_inventory WHERE id IN ({placeholders})", batch)
+
+        adjust_counts(conn, [key + (n,) for key, n in deltas.items()])
+        adjust_eos_counts(conn, [key + (n,) for key, n in eos_deltas.items()])
+        conn.execute(
+            "UPDATE uploads SET row_count = row_count - ? WHERE id = ?",
+            (len(ids), upload_id)
+        )
+
+    return len(ids)
+
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+RESULT_COLUMNS = f"""
+    r.inventory_id, i.raw_input, i.install_date, i.source, v.canonical_name AS vendor,
+    i.product, i.version, i.edition, i.confidence_score,
+    r.eos_date, e.source AS eos_source, p.product_name AS eos_product, e.version AS eos_version,
+    r.risk_level, r.days_until_eos, r.reason, r.calculated_at,
+    {RESULT_SORT_KEY} AS sort_key
+"""
+
+RESULT_JOINS = """
+    FROM risk_assessments r
+    JOIN software_inventory i ON i.id = r.inventory_id
+    LEFT JOIN vendors v ON v.id = i.normalized_vendor_id
+    LEFT JOIN eos_dates e ON e.id = i.eos_date_id
+    LEFT JOIN products p ON p.id = i.normalized_product_id
+"""
+
+
+def encode_cursor(sort_key, inventory_id):
+    """Opaque cursor pointing just after a row."""
+    raw = json.dumps([sort_key, inventory_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        sort_key, inventory_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(sort_key, str) or not isinstance(inventory_id, int):
+        raise ValueError("Invalid cursor")
+    return sort_key, inventory_id
+
+
+def result_filters(upload_id, risk_levels=None, vendor=None, source=None,
+                   upload_column="r.upload_id"):
+    """WHERE clause and parameters shared by result queries and summaries."""
+    clauses = [f"{upload_column} = ?"]
+    params = [upload_id]
+
+    if risk_levels:
+        clauses.append(f"r.risk_level IN ({', '.join('?' * len(risk_levels))})")
+        params.extend(risk_levels)
+    if vendor:
+        clauses.append("i.normalized_vendor_id = (SELECT id FROM vendors WHERE canonical_name = ?)")
+        params.append(vendor)
+    if source:
+        clauses.append("i.source = ?")
+        params.append(source)
+
+    return " AND ".join(clauses), params
+
+
+def row_to_result(row, today):
+    """
+    Convert a result query row to the /api/process-csv result shape.
+
+    days_until_eos is recomputed for today, and risk_level and reason with
+    it, so the three always agree. Filters and summaries use the level of
+    the last assessment (see reassess_risks), which is the same once the
+    day's re-risking has run.
+    """
+    risk_level = row['risk_level']
+    days_until = row['days_until_eos']
+    reason = row['reason']
+    if row['eos_date']:
+        try:
+            days_until = (date.fromisoformat(row['eos_date']) - today).days
+        except ValueError:
+            pass
+        else:
+            risk = describe_risk(days_until)
+            risk_level, reason = risk['risk_level'], risk['reason']
+
+    return {
+        "id": row['inventory_id'],
+        "raw_input": row['raw_input'],
+        "install_date": row['install_date'],
+        "source": row['source'],
+        "vendor": row['vendor'],
+        "product": row['product'],
+        "version": row['version'],
+        "edition": row['edition'],
+        "confidence_score": row['confidence_score'],
+        "eos_date": row['eos_date'],
+        "eos_source": row['eos_source'],
+        "eos_product": row['eos_product'],
+        "eos_version": row['eos_version'],
+        "risk_level": risk_level,
+        "days_until_eos": days_until,
+        "risk_reason": reason,
+        "assessed_at": row['calculated_at'],
+    }
+
+
+def query_results(conn, upload_id, limit=100, cursor=None, descending=False,
+                  risk_levels=None, vendor=None, source=None):
+    """
+    One page of an upload's results, sorted by days until EOS.
+
+    Uses keyset pagination on (EOS date, inventory id): a page starts
+    with an index seek to the cursor. Unfiltered pages, and pages of a
+    single risk level, read their rows straight off a risk_assessments
+    index in sort order, so they cost the same however deep they are.
+    Other filters (vendor, source, several risk levels) are checked row
+    by row from the cursor on, so with a selective filter a page may read
+    a large part of the upload.
+
+    Args:
+        conn: database connection
+        upload_id: upload to read
+        limit: rows per page
+        cursor: next_cursor from the previous page (None for the first)
+        descending: latest EOS first instead of soonest first
+        risk_levels: only these risk levels (list)
+        vendor: only this canonical vendor
+        source: only this source
+
+    Returns: (results, next_cursor) - next_cursor is None on the last page
+    """
+    where, params = result_filters(upload_id, risk_levels, vendor, source)
+    sort_key = RESULT_SORT_KEY
+    direction = "DESC" if descending else "ASC"
+
+    if cursor:
+        # Spelled out rather than as a row value, so SQLite seeks the index
+        # to the cursor instead of scanning up to it
+        after_key, after_id = decode_cursor(cursor)
+        op = '<' if descending else '>'
+        where += f" AND {sort_key} {op}= ? AND ({sort_key} {op} ? OR r.inventory_id {op} ?)"
+        params.extend([after_key, after_key, after_id])
+
+    rows = conn.execute(
+        f"SELECT {RESULT_COLUMNS} {RESULT_JOINS} WHERE {where} "
+        f"ORDER BY {sort_key} {direction}, r.inventory_id {direction} LIMIT ?",
+        params + [limit + 1]
+    ).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last['sort_key'], last['inventory_id'])
+
+    today = date.today()
+    return [row_to_result(row, today) for row in rows], next_cursor
+
+
+def count_filters(upload_id, risk_levels=None, vendor=None, source=None):
+    """WHERE clause and parameters for the count tables (aliased c)."""
+    clauses = ["c.upload_id = ?"]
+    params = [upload_id]
+
+    if risk_levels:
+        clauses.append(f"c.risk_level IN ({', '.join('?' * len(risk_levels))})")
+        params.extend(risk_levels)
+    if vendor:
+        clauses.append("c.vendor_id = (SELECT id FROM vendors WHERE canonical_name = ?)")
+        params.append(vendor)
+    if source:
+        clauses.append("c.source = ?")
+        params.append(source)
+
+    return " AND ".join(clauses), params
+
+
+def summarize_upload(conn, upload_id, risk_levels=None, vendor=None, source=None):
+    """
+    Aggregate counts for an upload (optionally filtered).
+
+    Answered from the small upload_counts table, so the cost does not
+    depend on the number of rows in the upload.
+
+    Returns: dict with total, per-risk-level counts, by_vendor, by_source
+    """
+    where, params = count_filters(upload_id, risk_levels, vendor, source)
+
+    rows = conn.execute(
+        f"SELECT c.risk_level, v.canonical_name AS vendor, c.source, c.row_count AS n "
+        f"FROM upload_counts c LEFT JOIN vendors v ON v.id = c.vendor_id "
+        f"WHERE {where} AND c.row_count > 0",
+        params
+    ).fetchall()
+
+    summary = {"total": 0, "critical": 0, "high": 0, "medium": 0, "low": 0, "unknown": 0}
+    by_vendor = Counter()
+    by_source = Counter()
+    for row in rows:
+        summary["total"] += row['n']
+        level = row['risk_level'].lower()
+        if level in summary:
+            summary[level] += row['n']
+        by_vendor[row['vendor'] or "Unknown"] += row['n']
+        by_source[row['source']] += row['n']
+
+    summary["by_vendor"] = dict(by_vendor.most_common())
+    summary["by_source"] = dict(by_source.most_common())
+    return summary
+
+
+def list_uploads(conn, limit=50):
+    """Most recent uploads first."""
+    return [dict(row) for row in conn.execute(
+        "SELECT * FROM uploads ORDER BY id DESC LIMIT ?", (limit,)
+    )]
+
+
+# ============================================================================
+# FORECASTS
+# ============================================================================
+# How many rows will sit in each risk bucket over the coming months or
+# weeks. A row's risk depends only on its EOS date, so forecasts are worked
+# out from upload_eos_counts (one entry per EOS date/vendor/source) rather
+# than by scoring every row for every future date. Undated (subscription)
+# rows stay LOW and unmatched rows stay UNKNOWN throughout.
+
+FORECAST_INTERVALS = ('month', 'week')
+
+
+def forecast_dates(start, periods, interval='month'):
+    """
+    Period boundaries: start, then the first day of each following month
+    (or every 7 days, for weeks).
+
+    Returns: list of periods + 1 dates (the last one ends the last period)
+    """
+    if interval == 'week':
+        return [start + timedelta(weeks=k) for k in range(periods + 1)]
+
+    dates = [start]
+    year, month = start.year, start.month
+    for _ in range(periods):
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        dates.append(date(year, month, 1))
+    return dates
+
+
+def forecast_counts(eos_days, counts, low, unknown, boundary_days, high_days, medium_days):
+    """
+    Forecast for one group of rows.
+
+    Args:
+        eos_days, counts: dated rows (numpy arrays, days since 1970-01-01)
+        low, unknown: undated and unmatched rows
+        boundary_days: period boundaries (numpy array, days since 1970-01-01)
+
+    Returns: dict with risk (rows per level at the start of each period)
+             and crossings (rows reaching each level, or a worse one,
+             during each period)
+    """
+    periods = len(boundary_days) - 1
+    buckets = bucket_counts(eos_days, counts, boundary_days, high_days, medium_days)
+    buckets[:, -1] += low
+
+    # Rows at each level or worse; rows only ever move towards CRITICAL
+    reached = np.cumsum(buckets[:, :-1], axis=1)
+    crossings = np.diff(reached, axis=0)
+
+    risk = {level.lower(): buckets[:-1, code].tolist() for code, level in enumerate(RISK_BUCKETS)}
+    risk["unknown"] = [unknown] * periods
+    return {
+        "risk": risk,
+        "crossings": {level.lower(): crossings[:, code].tolist()
+                      for code, level in enumerate(RISK_BUCKETS[:-1])},
+    }
+
+
+def forecast_upload(conn, upload_id, periods=FORECAST_PERIODS, interval='month', as_of=None,
+                    high_days=HIGH_RISK_DAYS, medium_days=MEDIUM_RISK_DAYS, vendor=None, source=None):
+    """
+    Risk exposure of an upload over the coming months or weeks (optionally
+    filtered by vendor/source).
+
+    Answered from the count tables: the cost depends on the number of
+    distinct EOS dates, vendors and sources, not on the number of rows.
+
+    Args:
+        conn: database connection
+        upload_id: upload to forecast
+        periods: number of months or weeks
+        interval: 'month' (periods start on the 1st) or 'week'
+        as_of: start of the first period (default: today)
+        high_days, medium_days: risk thresholds in days until EOS
+
+    Returns: dict with period start dates, the end of the last period, and
+             forecast_counts() results for all rows, by_vendor and by_source
+    """
+    as_of = as_of or date.today()
+    boundaries = forecast_dates(as_of, periods, interval)
+    boundary_days = np.array(boundaries, dtype='datetime64[D]').astype(np.int64)
+    where, params = count_filters(upload_id, vendor=vendor, source=source)
+
+    # Step 1: Dated rows per EOS date, vendor and source
+    dated = conn.execute(
+        "SELECT CAST(julianday(c.eos_date) - 2440587.5 AS INTEGER), "
+        "IFNULL(v.canonical_name, 'Unknown'), c.source, c.row_count "
+        "FROM upload_eos_counts c LEFT JOIN vendors v ON v.id = c.vendor_id "
+        f"WHERE {where} AND c.row_count > 0",
+        params
+    ).fetchall()
+
+    # Step 2: Undated and unmatched rows, per vendor and source: all rows
+    # minus the dated ones, split by the UNKNOWN level
+    fixed = {}
+    for vendor_name, src, level, n in conn.execute(
+        "SELECT IFNULL(v.canonical_name, 'Unknown'), c.source, c.risk_level, c.row_count "
+        "FROM upload_counts c LEFT JOIN vendors v ON v.id = c.vendor_id "
+        f"WHERE {where} AND c.row_count > 0",
+        params
+    ):
+        counts = fixed.setdefault((vendor_name, src), [0, 0])
+        counts[1 if level == 'UNKNOWN' else 0] += n
+    for _, vendor_name, src, n in dated:
+        fixed.setdefault((vendor_name, src), [0, 0])[0] -= n
+
+    # Step 3: Group by vendor and by source
+    groups = {"totals": {None: ([], [], [0, 0])}, "by_vendor": {}, "by_source": {}}
+    for key, (low, unknown) in fixed.items():
+        for breakdown, name in (("totals", None), ("by_vendor", key[0]), ("by_source", key[1])):
+            group = groups[breakdown].setdefault(name, ([], [], [0, 0]))
+            group[2][0] += low
+            group[2][1] += unknown
+    for eos_day, vendor_name, src, n in dated:
+        for breakdown, name in (("totals", None), ("by_vendor", vendor_name), ("by_source", src)):
+            group = groups[breakdown].setdefault(name, ([], [], [0, 0]))
+            group[0].append(eos_day)
+            group[1].append(n)
+
+    # Step 4: Bucket counts per group, largest groups first
+    def forecast(group):
+        eos_days, counts, (low, unknown) = group
+        return forecast_counts(np.array(eos_days, dtype=np.int64), np.array(counts, dtype=np.int64),
+                               low, unknown, boundary_days, high_days, medium_days)
+
+    def breakdown(name):
+        ordered = sorted(groups[name].items(), key=lambda item: -(sum(item[1][1]) + sum(item[1][2])))
+        return {key: forecast(group) for key, group in ordered}
+
+    return {
+        "as_of": as_of.isoformat(),
+        "interval": interval,
+        "thresholds": {"high_days": high_days, "medium_days": medium_days},
+        "periods": [day.isoformat() for day in boundaries[:-1]],
+        "end": boundaries[-1].isoformat(),
+        "totals": forecast(groups["totals"][None]),
+        "by_vendor": breakdown("by_vendor"),
+        "by_source": breakdown("by_source"),
+    }
+
+
+# ============================================================================
+# RE-RISKING
+# ============================================================================
+
+def reassess_risks(conn=None, today=None, upload_id=None):
+    """
+    Re-score stored inventory against a new date without re-normalizing.
+
+    Risk depends only on the matched EOS date, so days until EOS and risk
+    buckets are computed with array operations over the distinct dated
+    EOS entries in use, then only inventory rows whose risk level actually
+    changed are written back (one set-based UPDATE per changed entry).
+
+    Rows whose copy of the EOS date no longer matches their entry (the
+    catalog was synced to a new EOS database since they were assessed)
+    are re-pointed at the entry's date and re-scored too, dated or not.
+
+    Args:
+        conn: connection to use (default: this thread's pooled connection)
+        today: date to assess against (default: today)
+        upload_id: limit to one upload (default: all uploads)
+
+    Returns: dict with rows checked and rows changed
+    """
+    conn = conn or get_connection()
+
+    upload_filter = ""
+    params = ()
+    if upload_id is not None:
+        upload_filter = " AND i.upload_id = ?"
+        params = (upload_id,)
+
+    entries = conn.execute(
+        "SELECT e.id, e.eos_date, CAST(julianday(e.eos_date) - 2440587.5 AS INTEGER), COUNT(*) "
+        "FROM software_inventory i JOIN eos_dates e ON e.id = i.eos_date_id "
+        "WHERE i.eos_date_id IS NOT NULL" + upload_filter + " "
+        "GROUP BY e.id",
+        params
+    ).fetchall()
+    if not entries:
+        return {"checked": 0, "changed": 0}
+
+    # Dated entries are bucketed in one pass; undated (subscription) and
+    # invalid ones always get the same risk
+    dated = [(eos_id, eos_day) for eos_id, _, eos_day, _ in entries if eos_day is not None]
+    levels = {}
+    if dated:
+        eos_ids, eos_days = zip(*dated)
+        days = days_until_eos(np.array(eos_days, dtype=np.int64), today)
+        codes = risk_buckets(days)
+        levels = {eos_id: (days_until, RISK_BUCKETS[code])
+                  for eos_id, days_until, code in zip(eos_ids, days.tolist(), codes.tolist())}
+
+    calculated_at = now()
+    changed = 0
+
+    with transaction(conn):
+        for eos_id, eos_date, _, _ in entries:
+            if eos_id in levels:
+                days_until, new_level = levels[eos_id]
+            else:
+                days_until, new_level = None, calculate_risk(eos_date, today)['risk_level']
+
+            # Rows about to move, grouped the way the count tables are
+            moving = conn.execute(
+                "SELECT i.upload_id, r.risk_level, IFNULL(i.normalized_vendor_id, 0), "
+                "IFNULL(i.source, ''), CASE WHEN r.days_until_eos IS NOT NULL THEN r.eos_date END, "
+                "COUNT(*) "
+                "FROM software_inventory i JOIN risk_assessments r ON r.inventory_id = i.id "
+                "WHERE i.eos_date_id = ? AND (r.risk_level != ? OR r.eos_date IS NOT ?)"
+                + upload_filter + " "
+                "GROUP BY 1, 2, 3, 4, 5",
+                (eos_id, new_level, eos_date) + params
+            ).fetchall()
+            if not moving:
+                continue
+
+            risk = describe_risk(days_until) if days_until is not None else calculate_risk(eos_date, today)
+            new_dated = dated_eos(eos_date, risk['days_until_eos'])
+            cur = conn.execute(
+                "UPDATE risk_assessments SET risk_level = ?, days_until_eos = ?, "
+                "reason = ?, eos_date = ?, calculated_at = ? "
+                "WHERE (risk_level != ? OR eos_date IS NOT ?) AND inventory_id IN "
+                "(SELECT i.id FROM software_inventory i WHERE i.eos_date_id = ?" + upload_filter + ")",
+                (new_level, risk['days_until_eos'], risk['reason'], eos_date, calculated_at,
+                 new_level, eos_date, eos_id) + params
+            )
+            changed += cur.rowcount
+
+            deltas = Counter()
+            eos_deltas = Counter()
+            for up, old_level, vendor_id, src, old_dated, n in moving:
+                deltas[(up, old_level, vendor_id, src)] -= n
+                deltas[(up, new_level, vendor_id, src)] += n
+                if old_dated is not None:
+                    eos_deltas[(up, old_dated, vendor_id, src)] -= n
+                if new_dated is not None:
+                    eos_deltas[(up, new_dated, vendor_id, src)] += n
+            adjust_counts(conn, [key + (n,) for key, n in deltas.items() if n])
+            adjust_eos_counts(conn, [key + (n,) for key, n in eos_deltas.items() if n])
+
+    return {"checked": sum(n for *_, n in entries), "changed": changed}
+
+
+# ============================================================================
+# EOS PATCHES
+# ============================================================================
+# A patch to the EOS database (EOSStore.apply_patch) only changes a few
+# products, so stored inventory is brought up to date for those alone
+# instead of re-running every upload.
+
+def apply_eos_patch(snapshot, conn=None, today=None):
+    """
+    Update stored inventory after an EOS database patch.
+
+    The products/eos_dates mirror is updated for the patched products
+    only. Rows matched to one of them, plus unmatched rows if the patch
+    added a product or version (it may match them now), are looked up
+    again against the patched snapshot and re-scored; only rows whose
+    match or risk changed are written back.
+
+    Rows are always looked up in the current snapshot, and the mirror is
+    always brought to it: if a newer patch has replaced this one already,
+    this patch's products are re-assessed against the newer data, and the
+    mirror never goes back to this patch's version.
+
+    Args:
+        snapshot: EOS snapshot returned by EOSStore.apply_patch
+        conn: connection to use (default: this thread's pooled connection)
+        today: date to assess against (default: today)
+
+    Returns: dict with rows checked and rows changed
+    """
+    conn = conn or get_connection()
+    today = today or date.today()
+    current = get_eos_store().snapshot()
+    products = json.dumps(sorted(snapshot.changed_products))
+    calculated_at = now()
+
+    # Only the patched products change if the mirror is at this patch's
+    # base version and the patch is still current; otherwise a full sync
+    # to the current snapshot (a no-op if the mirror is there already),
+    # after which any unmatched row may have a match
+    synced = get_meta(conn, 'eos_version')
+    partial = current is snapshot and synced == snapshot.base_version
+    added_entries = snapshot.added_versions or not partial
+    if not partial:
+        sync_eos_catalog(conn, current)
+    vendor_ids = sync_vendors(conn)
+
+    with transaction(conn):
+        # Step 1: Mirror the patched products
+        if partial:
+            for product_name in snapshot.changed_products:
+                if product_name in current.db:
+                    mirror_product(conn, current, product_name, vendor_ids, calculated_at)
+        _, product_ids, eos_ids = load_reference_ids(conn)
+
+        # Step 2: Rows matched to a patched product, and unmatched rows
+        unmatched = (
+            " OR (i.eos_date_id IS NULL AND i.normalized_vendor_id IS NOT NULL "
+            "AND i.product != '' AND i.version != '')"
+        ) if added_entries else ""
+        rows = conn.execute(
+            "SELECT i.id, i.upload_id, IFNULL(i.normalized_vendor_id, 0), IFNULL(i.source, ''), "
+            "v.canonical_name, i.product, i.version, i.eos_date_id, i.normalized_product_id, "
+            "r.risk_level, r.days_until_eos, r.reason, r.eos_date "
+            "FROM software_inventory i "
+            "JOIN risk_assessments r ON r.inventory_id = i.id "
+            "LEFT JOIN vendors v ON v.id = i.normalized_vendor_id "
+            "WHERE i.eos_date_id IN (SELECT e.id FROM eos_dates e JOIN products p ON p.id = e.product_id "
+            "WHERE p.product_name IN (SELECT value FROM json_each(?)))" + unmatched,
+            (products,)
+        ).fetchall()
+
+        # Step 3: Look up each distinct (vendor, product, version) again
+        eos_results = lookup_eos_batch(
+            (vendor, product, version) for _, _, _, _, vendor, product, version, *_ in rows
+            if vendor and product and version
+        )
+        resolved = {}
+        for triple, eos_data in eos_results.items():
+            if eos_data:
+                key = (eos_data['matched_product'], eos_data['matched_version'])
+                risk = calculate_risk(eos_data.get('eos_date'), today)
+                resolved[triple] = (eos_ids.get(key), product_ids.get(key[0]), risk, eos_data.get('eos_date'))
+            else:
+                resolved[triple] = (None, None, NO_EOS_RISK, None)
+
+        # Step 4: Write back the rows whose match or risk changed
+        inventory = []
+        risks = []
+        deltas = Counter()
+        eos_deltas = Counter()
+        for (inventory_id, upload_id, vendor_id, source, vendor, product, version,
+             eos_id, product_id, level, days, reason, eos_date) in rows:
+            new_eos_id, new_product_id, risk, new_eos_date = resolved.get(
+                (vendor, product, version), (None, None, NO_EOS_RISK, None)
+            )
+            if (new_eos_id, new_product_id) != (eos_id, product_id):
+                inventory.append((new_eos_id, new_product_id, inventory_id))
+            if (risk['risk_level'], risk['days_until_eos'], risk['reason'], new_eos_date) != \
+                    (level, days, reason, eos_date):
+                risks.append((risk['risk_level'], risk['days_until_eos'], risk['reason'],
+                              new_eos_date, calculated_at, inventory_id))
+                if risk['risk_level'] != level:
+                    deltas[(upload_id, level, vendor_id, source)] -= 1
+                    deltas[(upload_id, risk['risk_level'], vendor_id, source)] += 1
+                old_dated = dated_eos(eos_date, days)
+                new_dated = dated_eos(new_eos_date, risk['days_until_eos'])
+                if old_dated != new_dated:
+                    if old_dated is not None:
+                        eos_deltas[(upload_id, old_dated, vendor_id, source)] -= 1
+                    if new_dated is not None:
+                        eos_deltas[(upload_id, new_dated, vendor_id, source)] += 1
+
+        conn.executemany(
+            "UPDATE software_inventory SET eos_date_id = ?, normalized_product_id = ? WHERE id = ?",
+            inventory
+        )
+        conn.executemany(
+            "UPDATE risk_assessments SET risk_level = ?, days_until_eos = ?, reason = ?, "
+            "eos_date = ?, calculated_at = ? WHERE inventory_id = ?",
+            risks
+        )
+        adjust_counts(conn, [key + (n,) for key, n in deltas.items() if n])
+        adjust_eos_counts(conn, [key + (n,) for key, n in eos_deltas.items() if n])
+
+        # Step 5: Drop mirrored versions the patch removed (no row uses them now)
+        for product_name in snapshot.changed_products:
+            versions = list(current.db.get(product_name, {}))
+            conn.execute(
+                "DELETE FROM eos_dates WHERE version NOT IN (SELECT value FROM json_each(?)) "
+                "AND product_id = (SELECT id FROM products WHERE product_name = ?)",
+                (json.dumps(versions), product_name)
+            )
+
+        set_meta(conn, 'eos_version', current.version)
+
+    changed = len({row[-1] for row in inventory} | {row[-1] for row in risks})
+    return {"checked": len(rows), "changed": changed}
@@ -0,0 +1,111 @@
+import hashlib
+import threading
+from collections import deque
+from csv_processor import iter_process_rows
+from database import (
+    InventoryWriter, get_connection, get_snapshot_upload, snapshot_fingerprints,
+    retire_rows, start_upload, summarize_upload
+)
+from eos_store import get_eos_store
+
+# ============================================================================
+# DELTA INGESTION
+# ============================================================================
+# Consecutive exports of the same inventory are mostly identical. In delta
+# mode an upload is diffed against the stored snapshot of the same name by
+# row fingerprint, and only rows that are new go through normalization,
+# lookup and risk scoring; rows that disappeared are retired. Unchanged
+# rows keep their stored assessment (reassess.py keeps those current).
+
+# One delta upload per snapshot name at a time: each one is diffed against
+# what the previous one stored
+_snapshot_locks = {}
+_snapshot_locks_lock = threading.Lock()
+
+
+def row_fingerprint(row):
+    """
+    64-bit hash of a CSV row's software_name, install_date and source
+    (signed, so it fits an SQLite INTEGER).
+    """
+    key = '\x1f'.join((
+        row.get('software_name') or '',
+        row.get('install_date') or '',
+        row.get('source') or ''
+    ))
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def snapshot_lock(snapshot_name):
+    """Return the lock serializing delta uploads to one snapshot name."""
+    with _snapshot_locks_lock:
+        return _snapshot_locks.setdefault(snapshot_name, threading.Lock())
+
+
+def ingest_delta(rows, snapshot_name, filename=None, conn=None):
+    """
+    Apply an inventory export to a named snapshot.
+
+    Identical rows may appear more than once; they are matched by count,
+    so two copies in the old export and three in the new one add one row.
+    Uploads to the same snapshot name run one at a time.
+
+    Args:
+        rows: iterable of dicts with software_name, install_date, source
+        snapshot_name: which inventory this export is a version of
+        filename: original upload name (optional)
+        conn: connection to use (default: this thread's pooled connection)
+
+    Returns:
+        dict with upload_id, added/removed/unchanged counts, results (for
+        the added rows only) and summary (of the whole updated snapshot)
+    """
+    conn = conn or get_connection()
+    eos_snapshot = get_eos_store().snapshot()
+
+    with snapshot_lock(snapshot_name):
+        # Step 1: Find the previous version of this inventory
+        upload = get_snapshot_upload(conn, snapshot_name)
+        if upload:
+            previous = snapshot_fingerprints(conn, upload['id'])
+            writer = InventoryWriter(conn, upload['id'], eos_snapshot)
+        else:
+            previous = {}
+            writer = start_upload(filename, eos_snapshot, conn, snapshot_name=snapshot_name)
+
+        # Step 2: Diff while reading; whatever is left in `previous` at the
+        # end was removed. Added rows are handed straight to the pipeline.
+        counts = {"added": 0, "removed": 0, "unchanged": 0}
+        added = deque()     # (row number, fingerprint) of added rows in flight
+
+        def added_rows():
+            for row_number, row in enumerate(rows):
+                fingerprint = row_fingerprint(row)
+                if previous.get(fingerprint, 0) > 0:
+                    previous[fingerprint] -= 1
+                    counts["unchanged"] += 1
+                else:
+                    counts["added"] += 1
+                    added.append((row_number, fingerprint))
+                    yield row
+
+        # Step 3: Process and store only the new rows
+        results = []
+        for result in iter_process_rows(added_rows()):
+            row_number, fingerprint = added.popleft()
+            writer.add(result, row_number=row_number, fingerprint=fingerprint)
+            results.append(result)
+        writer.close()
+
+        # Step 4: Retire rows missing from this export
+        removed = {fingerprint: n for fingerprint, n in previous.items() if n > 0}
+        if removed:
+            counts["removed"] = retire_rows(conn, writer.upload_id, removed)
+
+    return {
+        "upload_id": writer.upload_id,
+        **counts,
+        "results": results,
+        "summary": summarize_upload(conn, writer.upload_id),
+    }
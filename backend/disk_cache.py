@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import threading
+import normalizer
+from config import DISK_CACHE_PATH
+from eos_store import get_eos_store
+from metrics import register_cache
+from sqlite_cache import QUERY_BATCH, SQLiteCache
+
+# Source files whose logic decides what a raw name normalizes/matches to
+RULE_SOURCES = ['normalizer.py', 'eos_lookup.py', 'eos_index.py']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS normalize_cache (
+    ruleset TEXT NOT NULL,
+    raw_input TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (ruleset, raw_input)
+) WITHOUT ROWID;
+"""
+
+_rules_hash = None
+
+
+def rules_hash():
+    """
+    Hash of the normalizer rule tables (VENDOR_ALIASES, EDITION_KEYWORDS,
+    ...) and of the normalizer/matcher source, computed once per process.
+    Any change to either gives a new hash.
+    """
+    global _rules_hash
+
+    if _rules_hash is None:
+        digest = hashlib.sha256()
+        tables = [
+            normalizer.VENDOR_ALIASES,
+            normalizer.EDITION_KEYWORDS,
+            normalizer.PRODUCT_ABBREVIATIONS,
+            normalizer.ARCHITECTURE_KEYWORDS,
+            normalizer.COMPOUND_PRODUCTS,
+            [pattern.pattern for pattern, _ in normalizer.VERSION_PATTERNS],
+        ]
+        digest.update(json.dumps(tables, sort_keys=True).encode('utf-8'))
+
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in RULE_SOURCES:
+            with open(os.path.join(here, name), 'rb') as f:
+                digest.update(f.read())
+
+        _rules_hash = digest.hexdigest()
+
+    return _rules_hash
+
+
+def ruleset_key(eos_version):
+    """Cache namespace for the current rules plus one EOS database version."""
+    return hashlib.sha256(f"{rules_hash()}:{eos_version}".encode('utf-8')).hexdigest()[:32]
+
+
+class DiskCache(SQLiteCache):
+    """
+    Persistent raw software_name -> (normalized result, EOS match) cache
+    in a SQLite file, shared by every process and kept across restarts.
+
+    Entries are namespaced by ruleset_key(), so a change to the normalizer
+    rules or to the EOS database contents invalidates them automatically;
+    entries from older namespaces are deleted the first time a new one is
+    used. After an EOS database patch (see EOSStore.apply_patch) entries
+    the patch can't have changed are moved to the new namespace instead.
+    """
+
+    SCHEMA = SCHEMA
+
+    def __init__(self, path):
+        super().__init__(path, "disk")
+        self._lock = threading.Lock()
+        self._ruleset = None
+
+    def _use_ruleset(self, conn, ruleset, eos_version):
+        """Drop entries written under any other ruleset (once per change)."""
+        if ruleset == self._ruleset:
+            return
+
+        with self._lock:
+            with self._transaction(conn):
+                row = conn.execute("SELECT value FROM meta WHERE key = 'ruleset'").fetchone()
+                if not row or row[0] != ruleset:
+                    if row:
+                        self._carry_over(conn, row[0], ruleset, eos_version)
+                    deleted = conn.execute(
+                        "DELETE FROM normalize_cache WHERE ruleset != ?", (ruleset,)
+                    ).rowcount
+                    self.evictions += max(deleted, 0)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('ruleset', ?)",
+                        (ruleset,)
+                    )
+            self._ruleset = ruleset
+
+    def _carry_over(self, conn, old_ruleset, ruleset, eos_version):
+        """
+        If eos_version is a patch of the version old_ruleset was for, and
+        the product catalog didn't change, move the entries matched to
+        unpatched products over to the new ruleset. Misses and matches to
+        patched products are left behind (and deleted).
+        """
+        snapshot = get_eos_store().snapshot()
+        if (snapshot.version != eos_version or snapshot.base_version is None
+                or snapshot.catalog_changed or ruleset_key(snapshot.base_version) != old_ruleset):
+            return
+
+        conn.execute(
+            "UPDATE normalize_cache SET ruleset = ? WHERE ruleset = ? "
+            "AND json_extract(value, '$[1].matched_product') NOT IN (SELECT value FROM json_each(?))",
+            (ruleset, old_ruleset, json.dumps(sorted(snapshot.changed_products)))
+        )
+
+    def get_many(self, names, eos_version):
+        """
+        Look up many raw names at once.
+
+        Returns:
+            dict name -> (normalized dict, EOS data dict or None) for the
+            names that are cached
+        """
+        names = list(names)
+        if not names:
+            return {}
+
+        conn = self._connection()
+        ruleset = ruleset_key(eos_version)
+        self._use_ruleset(conn, ruleset, eos_version)
+
+        found = {}
+        for i in range(0, len(names), QUERY_BATCH):
+            batch = names[i:i + QUERY_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            for raw_input, value in conn.execute(
+                f"SELECT raw_input, value FROM normalize_cache "
+                f"WHERE ruleset = ? AND raw_input IN ({placeholders})",
+                [ruleset] + batch
+            ):
+                normalized, eos_data = json.loads(value)
+                found[raw_input] = (normalized, eos_data)
+
+        self.hits += len(found)
+        self.misses += len(names) - len(found)
+        return found
+
+    def put_many(self, entries, eos_version):
+        """
+        Store (name, normalized, eos_data) entries in one transaction.
+        Read-only mappings from the in-memory caches are fine.
+        """
+        rows = [
+            (name, json.dumps([normalized, eos_data], default=dict, separators=(',', ':')))
+            for name, normalized, eos_data in entries
+        ]
+        if not rows:
+            return
+
+        conn = self._connection()
+        ruleset = ruleset_key(eos_version)
+        self._use_ruleset(conn, ruleset, eos_version)
+
+        with self._transaction(conn):
+            conn.executemany(
+                "INSERT OR REPLACE INTO normalize_cache (ruleset, raw_input, value) VALUES (?, ?, ?)",
+                [(ruleset, name, value) for name, value in rows]
+            )
+        self.writes += len(rows)
+
+    def clear(self):
+        """Delete every entry."""
+        conn = self._connection()
+        conn.execute("DELETE FROM normalize_cache")
+
+
+# One cache per process (each thread gets its own connection)
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+
+def get_disk_cache():
+    """Return the process-wide disk cache, or None if DISK_CACHE_PATH is empty."""
+    global _disk_cache
+
+    if not DISK_CACHE_PATH:
+        return None
+
+    with _disk_cache_lock:
+        if _disk_cache is None:
+            _disk_cache = DiskCache(DISK_CACHE_PATH)
+            register_cache(_disk_cache)
+    return _disk_cache
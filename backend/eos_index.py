@@ -0,0 +1,590 @@
+import copy
+import re
+from bisect import bisect_right
+import numpy as np
+from rapidfuzz import process, fuzz
+
+# Minimum score for a product match to be accepted
+PRODUCT_MATCH_THRESHOLD = 70
+
+# Catalogs with more products than this are pre-filtered by the trigram
+# index; only the top CANDIDATE_COUNT candidates are fuzzy scored
+BLOCKING_MIN_PRODUCTS = 1000
+CANDIDATE_COUNT = 64
+
+# Trigrams found in more than this share of the catalog don't drive the
+# candidate search (unless the query has nothing rarer)...
+COMMON_GRAM_SHARE = 0.02
+
+# ...unless the best candidate scores below this; then all trigrams are
+# used to widen the search
+WIDEN_BELOW_SCORE = 90
+
+# A patched ProductIndex is rebuilt once more than this share of its
+# slots belong to removed products
+MAX_EMPTY_SHARE = 0.25
+
+
+def sort_tokens(text):
+    """
+    Lowercase and sort the words of a string.
+
+    fuzz.ratio on token-sorted strings gives exactly the same score as
+    fuzz.token_sort_ratio, so choices can be sorted once up front instead
+    of on every comparison.
+    """
+    return ' '.join(sorted(text.lower().split()))
+
+
+def trigrams(text):
+    """Character trigrams of a string, padded so word edges count too."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Inverted index from character trigrams to the strings containing them.
+
+    Used as a blocking stage: candidates() returns the strings sharing the
+    most trigrams with a query (Dice coefficient), so that only those have
+    to be scored with the exact, expensive scorer.
+    """
+
+    def __init__(self, strings):
+        postings = {}
+        self.gram_counts = np.zeros(len(strings), dtype=np.int32)
+        for i, text in enumerate(strings):
+            grams = trigrams(text)
+            self.gram_counts[i] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.size = len(strings)
+        self.common_limit = max(int(self.size * COMMON_GRAM_SHARE), CANDIDATE_COUNT)
+
+    def patched(self, removed=(), added=(), start=None):
+        """
+        Copy of this index with some strings taken out and others appended.
+        Only the posting lists of their trigrams are copied; the rest are
+        shared with this index, which is left unchanged.
+
+        Args:
+            removed: (id, string) pairs to take out; their ids are never
+                     returned by candidates() again
+            added: strings to add, with ids start, start + 1, ...
+            start: id of the first added string (default: after the last id)
+        """
+        index = copy.copy(self)
+        index.postings = dict(self.postings)
+        start = len(self.gram_counts) if start is None else start
+
+        for i, text in removed:
+            for gram in trigrams(text):
+                ids = index.postings[gram]
+                ids = ids[ids != i]
+                if len(ids):
+                    index.postings[gram] = ids
+                else:
+                    del index.postings[gram]
+
+        appended = {}
+        gram_counts = np.zeros(start + len(added), dtype=np.int32)
+        gram_counts[:len(self.gram_counts)] = self.gram_counts
+        for i, text in enumerate(added, start):
+            grams = trigrams(text)
+            gram_counts[i] = len(grams)
+            for gram in grams:
+                appended.setdefault(gram, []).append(i)
+        for gram, ids in appended.items():
+            ids = np.array(ids, dtype=np.int32)
+            if gram in index.postings:
+                ids = np.concatenate([index.postings[gram], ids])
+            index.postings[gram] = ids
+
+        index.gram_counts = gram_counts
+        index.size = self.size - len(removed) + len(added)
+        index.common_limit = max(int(index.size * COMMON_GRAM_SHARE), CANDIDATE_COUNT)
+        return index
+
+    def candidates(self, query, k=CANDIDATE_COUNT, common=False):
+        """
+        Ids of the (at most) k strings most similar to query by trigram
+        overlap, in ascending id order.
+
+        Grams shared by a large part of the catalog say little about a
+        match, so by default only the rarer ones are counted. That keeps
+        the work proportional to the matching entries instead of the
+        catalog size. common=True counts every gram (slower, wider).
+        """
+        grams = trigrams(query)
+        lists = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not lists:
+            return np.empty(0, dtype=np.int64)
+
+        if not common:
+            rare = [ids for ids in lists if len(ids) <= self.common_limit]
+            if rare:
+                lists = rare
+
+        ids, overlap = np.unique(np.concatenate(lists), return_counts=True)
+        dice = overlap / (len(grams) + self.gram_counts[ids])
+
+        if len(ids) > k:
+            ids = ids[np.argpartition(-dice, k - 1)[:k]]
+
+        # Ascending ids keep the same tie-breaking as an exhaustive scan
+        return np.sort(ids)
+
+
+class ProductIndex:
+    """
+    Fuzzy-match index over the product names of an EOS database.
+
+    Built once per loaded database and reused for every lookup, so no
+    per-call lists or maps are rebuilt.
+
+    With `vendors` (product name -> canonical vendor), each vendor's
+    products also get their own partition index. Queries with a known
+    vendor search that partition first and only fall back to the whole
+    catalog when nothing there reaches the threshold.
+
+    When the EOS database is patched, patched() derives the new index
+    from this one instead of rebuilding it (see there).
+    """
+
+    def __init__(self, product_names, blocking=None, vendors=None):
+        # Lowercased name -> original database key (last one wins on
+        # case-only duplicates, same as the old per-call map)
+        self.lower_map = {name.lower(): name for name in product_names}
+
+        # Parallel lists: original key and its preprocessed choice string
+        self.keys = list(self.lower_map.values())
+        self.choices = [sort_tokens(lower) for lower in self.lower_map]
+        self.ids = {key: i for i, key in enumerate(self.keys)}
+        self.empty_slots = 0
+
+        # Blocking stage for large catalogs (blocking=True/False forces it)
+        self.auto_blocking = blocking is None
+        if blocking is None:
+            blocking = len(self.choices) > BLOCKING_MIN_PRODUCTS
+        self.trigram_index = None
+        if blocking:
+            self.trigram_index = TrigramIndex(self.choices)
+
+        # Per-vendor partitions
+        self.vendors = vendors
+        self.partitions = {}
+        if vendors:
+            by_vendor = {}
+            for key in self.keys:
+                if vendors.get(key):
+                    by_vendor.setdefault(vendors[key], []).append(key)
+            self.partitions = {
+                vendor: ProductIndex(keys, blocking=blocking)
+                for vendor, keys in by_vendor.items()
+            }
+
+    def __len__(self):
+        return len(self.keys) - self.empty_slots
+
+    def patched(self, products, catalog, vendors=None):
+        """
+        Index for a catalog that differs from this one only in `products`.
+
+        This index is left as it is (readers of the old EOS snapshot keep
+        using it) and the new one shares everything that didn't change:
+        the choice lists are copied, but nothing is re-tokenized except
+        the added names, and only the trigram posting lists and vendor
+        partitions of the products involved are rebuilt.
+
+        A removed product leaves an empty choice behind, which scores 0
+        against every query. The other products keep their ids, and added
+        ones are appended, the same order a full rebuild from the patched
+        database would give, so ties are broken the same way. The index is
+        rebuilt from scratch when too many slots are empty, when blocking
+        would switch on or off, or when a name differs from another only
+        by case.
+
+        Args:
+            products: product keys added, removed or changed by the patch
+            catalog: the new catalog's product keys (a dict or set;
+                     only checked for membership of `products`)
+            vendors: product name -> vendor for the new catalog (indexes
+                     built with vendors)
+
+        Returns: a new ProductIndex, or this one if nothing it holds changed
+        """
+        removed = [name for name in products if name in self.ids and name not in catalog]
+        added = [name for name in products if name in catalog and name not in self.ids]
+
+        # Products whose vendor changed move to another partition
+        moves = []
+        if self.vendors is not None:
+            for name in products:
+                old = self.vendors.get(name) if name in self.ids else None
+                new = vendors.get(name) if name in catalog else None
+                if old != new:
+                    moves.append((name, old, new))
+
+        if not removed and not added and not moves:
+            return self
+
+        live = len(self) - len(removed) + len(added)
+        slots = len(self.keys) + len(added)
+        blocking = self.trigram_index is not None
+        if (any(name.lower() in self.lower_map for name in added)
+                or any(self.lower_map.get(name.lower()) != name for name in removed)
+                or (self.empty_slots + len(removed)) > slots * MAX_EMPTY_SHARE
+                or (self.auto_blocking and blocking != (live > BLOCKING_MIN_PRODUCTS))):
+            gone = set(removed)
+            names = [key for key in self.keys if key is not None and key not in gone] + added
+            return ProductIndex(names, blocking=None if self.auto_blocking else blocking, vendors=vendors)
+
+        index = copy.copy(self)
+        index.keys = list(self.keys)
+        index.choices = list(self.choices)
+        index.ids = dict(self.ids)
+        index.lower_map = dict(self.lower_map)
+        index.empty_slots = self.empty_slots + len(removed)
+
+        removed_choices = []
+        for name in removed:
+            i = index.ids.pop(name)
+            del index.lower_map[name.lower()]
+            removed_choices.append((i, index.choices[i]))
+            index.keys[i] = None
+            index.choices[i] = ''
+
+        start = len(index.keys)
+        for name in added:
+            index.ids[name] = len(index.keys)
+            index.lower_map[name.lower()] = name
+            index.keys.append(name)
+            index.choices.append(sort_tokens(name.lower()))
+
+        if self.trigram_index is not None:
+            index.trigram_index = self.trigram_index.patched(
+                removed_choices, index.choices[start:], start
+            )
+
+        # Patch only the partitions products left or joined
+        if self.vendors is not None:
+            index.vendors = vendors
+            index.partitions = dict(self.partitions)
+            changes = {}
+            for name, old, new in moves:
+                if old:
+                    changes.setdefault(old, ([], set()))[0].append(name)
+                if new:
+                    names, joined = changes.setdefault(new, ([], set()))
+                    names.append(name)
+                    joined.add(name)
+            for vendor, (names, joined) in changes.items():
+                partition = index.partitions.get(vendor)
+                if partition is None:
+                    partition = ProductIndex(names, blocking=blocking)
+                else:
+                    partition = partition.patched(names, joined)
+                if len(partition):
+                    index.partitions[vendor] = partition
+                else:
+                    del index.partitions[vendor]
+
+        return index
+
+    def build_queries(self, vendor, product):
+        """Search strings for a product, most specific first."""
+        queries = []
+        if vendor and product:
+            queries.append(f"{vendor} {product}")
+        if product:
+            queries.append(product)
+        return [sort_tokens(q) for q in queries]
+
+    def best_choice(self, query, score_cutoff):
+        """
+        Best scoring choice for one query string.
+
+        Large catalogs only score the trigram index's candidates; small
+        ones are scanned exhaustively.
+
+        Returns: (choice index, score) or None
+        """
+        if self.trigram_index is None:
+            match = process.extractOne(
+                query,
+                self.choices,
+                scorer=fuzz.ratio,
+                processor=None,
+                score_cutoff=score_cutoff
+            )
+            return (match[2], match[1]) if match else None
+
+        candidates = self.trigram_index.candidates(query)
+        match = self.score_candidates(query, candidates, score_cutoff)
+
+        # Weak or no match: the best entry may only share common grams
+        # (not worth it when a strong match from another query stands)
+        weak = match is None or match[1] < WIDEN_BELOW_SCORE
+        if weak and score_cutoff < WIDEN_BELOW_SCORE:
+            candidates = np.union1d(candidates, self.trigram_index.candidates(query, common=True))
+            match = self.score_candidates(query, candidates, score_cutoff)
+
+        return match
+
+    def score_candidates(self, query, candidates, score_cutoff):
+        """Best scoring choice among candidate indexes, as (index, score) or None."""
+        match = process.extractOne(
+            query,
+            [self.choices[i] for i in candidates],
+            scorer=fuzz.ratio,
+            processor=None,
+            score_cutoff=score_cutoff
+        )
+        return (int(candidates[match[2]]), match[1]) if match else None
+
+    def match(self, vendor, product, threshold=PRODUCT_MATCH_THRESHOLD):
+        """
+        Find the best matching product key.
+
+        Returns: (product_key, score) or (None, 0) if nothing scores at
+        least `threshold`
+        """
+        if not product or not self.choices:
+            return None, 0
+
+        # Search the vendor's own products first
+        partition = self.partitions.get(vendor)
+        if partition is not None:
+            match = partition.match(vendor, product, threshold)
+            if match[0] is not None:
+                return match
+
+        return self.match_global(vendor, product, threshold)
+
+    def match_global(self, vendor, product, threshold=PRODUCT_MATCH_THRESHOLD):
+        """match() over the whole catalog, ignoring vendor partitions."""
+        if not product or not self.choices:
+            return None, 0
+
+        best_match = None
+        best_score = 0
+
+        for query in self.build_queries(vendor, product):
+            if best_score >= 100:
+                break
+            match = self.best_choice(query, max(best_score, threshold))
+
+            if match:
+                idx, score = match
+                if score > best_score:
+                    best_score = score
+                    best_match = self.keys[idx]
+
+        if best_match is not None:
+            return best_match, best_score
+
+        return None, 0
+
+    def match_many(self, pairs, threshold=PRODUCT_MATCH_THRESHOLD):
+        """
+        Match many (vendor, product) pairs in one vectorized pass.
+
+        Every distinct query string is scored against every choice with a
+        single multithreaded rapidfuzz cdist call. Picks the same winner as
+        calling match() once per pair. Large (blocked) catalogs are
+        matched pair by pair against trigram candidates instead.
+
+        Returns: list of (product_key, score) in the same order as `pairs`
+        """
+        if self.partitions:
+            return self.match_many_partitioned(pairs, threshold)
+        return self.match_many_global(pairs, threshold)
+
+    def match_many_global(self, pairs, threshold=PRODUCT_MATCH_THRESHOLD):
+        """match_many() over the whole catalog, ignoring vendor partitions."""
+        # Blocked catalogs score a few candidates per query anyway; match
+        # pair by pair so later queries can stop early
+        if self.trigram_index is not None:
+            return [self.match_global(vendor, product, threshold) for vendor, product in pairs]
+
+        pair_queries = [
+            self.build_queries(vendor, product) if product else []
+            for vendor, product in pairs
+        ]
+
+        # Score each distinct query string only once
+        unique_queries = list(dict.fromkeys(q for qs in pair_queries for q in qs))
+        if not unique_queries or not self.choices:
+            return [(None, 0)] * len(pairs)
+
+        scores = process.cdist(
+            unique_queries,
+            self.choices,
+            scorer=fuzz.ratio,
+            processor=None,
+            dtype=np.float64,
+            workers=-1
+        )
+        best_idx = scores.argmax(axis=1)
+        best_score = scores[np.arange(len(unique_queries)), best_idx]
+        row_of = {q: i for i, q in enumerate(unique_queries)}
+
+        results = []
+        for queries in pair_queries:
+            best_match = None
+            best = 0
+            for query in queries:
+                row = row_of[query]
+                score = float(best_score[row])
+                # Same rule as match(): a later query must strictly win
+                if score >= threshold and score > best:
+                    best = score
+                    best_match = self.keys[best_idx[row]]
+            results.append((best_match, best) if best_match is not None else (None, 0))
+
+        return results
+
+    def match_many_partitioned(self, pairs, threshold=PRODUCT_MATCH_THRESHOLD):
+        """
+        match_many() with vendor partitions: pairs are matched within
+        their vendor's partition (one batch per vendor), and only those
+        without a match there are matched against the whole catalog.
+        """
+        results = [None] * len(pairs)
+
+        by_vendor = {}
+        for i, (vendor, product) in enumerate(pairs):
+            if vendor in self.partitions:
+                by_vendor.setdefault(vendor, []).append(i)
+
+        for vendor, positions in by_vendor.items():
+            matches = self.partitions[vendor].match_many([pairs[i] for i in positions], threshold)
+            for i, match in zip(positions, matches):
+                if match[0] is not None:
+                    results[i] = match
+
+        # Unknown vendors and partition misses: global search
+        rest = [i for i, result in enumerate(results) if result is None]
+        if rest:
+            matches = self.match_many_global([pairs[i] for i in rest], threshold)
+            for i, match in zip(rest, matches):
+                results[i] = match
+
+        return results
+
+
+# ============================================================================
+# VERSION INDEX
+# ============================================================================
+
+# Score for a version resolved to the nearest lower release
+NEAREST_LOWER_SCORE = 80
+
+# Majors in this range are release years (2016, 2019, ...)
+YEAR_RANGE = (1990, 2100)
+
+VERSION_NUMBER_PATTERN = re.compile(r'^(\d+(?:\.\d+)*)[a-z]*$', re.IGNORECASE)
+
+
+def parse_version(version):
+    """
+    Parse a version string into a comparable tuple of ints.
+
+    Trailing zero components are dropped, so "7.0" and "7" compare equal,
+    and letter suffixes are ignored ("19c" -> (19,)).
+
+    Examples:
+        "3.11.4" -> (3, 11, 4)
+        "19c" -> (19,)
+        "2023.001" -> (2023, 1)
+        "DC" -> None (named release, not numeric)
+    """
+    if not version:
+        return None
+
+    match = VERSION_NUMBER_PATTERN.match(version.strip())
+    if not match:
+        return None
+
+    return trim_zeros(int(part) for part in match.group(1).split('.'))
+
+
+def trim_zeros(parts):
+    """Drop trailing zero components: (7, 0) -> (7,)."""
+    parts = list(parts)
+    while len(parts) > 1 and parts[-1] == 0:
+        parts.pop()
+    return tuple(parts)
+
+
+def is_year(parts):
+    return YEAR_RANGE[0] <= parts[0] <= YEAR_RANGE[1]
+
+
+class VersionIndex:
+    """
+    Sorted index over the version keys of one product.
+
+    Resolution order:
+        1. exact key ("2019", "DC", case-insensitive)
+        2. exact or prefix match on the parsed tuple, longest prefix first
+           (3.11.4 -> 3.11, 8.6 -> 8, 19.3.0.0.0 -> 19c)
+        3. nearest lower release by bisection, within the same major
+           version or between release years (3.13 -> 3.12, 2020 -> 2019)
+
+    Returns (None, 0) when none apply. Only versions that don't parse as
+    numbers should then be fuzzy matched: by characters, "2017" is as
+    close to "2019" as anything.
+    """
+
+    def __init__(self, versions):
+        self.by_name = {}
+        self.by_parts = {}
+        for version in versions:
+            self.by_name[version.lower()] = version
+            parts = parse_version(version)
+            if parts is not None:
+                self.by_parts.setdefault(parts, version)
+
+        # Sorted parallel lists for bisection
+        self.sorted_parts = sorted(self.by_parts)
+        self.sorted_keys = [self.by_parts[parts] for parts in self.sorted_parts]
+
+    def __len__(self):
+        return len(self.by_name)
+
+    def match(self, version):
+        """
+        Resolve a version string to a key of this product.
+
+        Returns: (version_key, score) or (None, 0)
+        """
+        if not version:
+            return None, 0
+
+        # Step 1: Exact key
+        key = self.by_name.get(version.strip().lower())
+        if key is not None:
+            return key, 100
+
+        parts = parse_version(version)
+        if parts is None:
+            return None, 0
+
+        # Step 2: Exact or prefix match on the parsed version
+        for length in range(len(parts), 0, -1):
+            key = self.by_parts.get(trim_zeros(parts[:length]))
+            if key is not None:
+                return key, 100
+
+        # Step 3: Nearest lower release
+        i = bisect_right(self.sorted_parts, parts) - 1
+        if i >= 0:
+            lower = self.sorted_parts[i]
+            if lower[0] == parts[0] or (is_year(lower) and is_year(parts)):
+                return self.sorted_keys[i], NEAREST_LOWER_SCORE
+
+        return None, 0
@@ -1,10 +1,22 @@
-import json
+import copy
+import threading
+import time
 from rapidfuzz import process, fuzz
+from eos_store import get_eos_store
+from eos_index import ProductIndex, VersionIndex, parse_version
+from cache import LRUCache, freeze
+from config import LOOKUP_CACHE_SIZE
+from metrics import STAGE_SECONDS, LOOKUPS_TOTAL, MATCH_SCORE, register_cache
 
 def load_eos_database():
-    """Load the EOS database from JSON file."""
-    with open('data/eos_database.json', 'r') as f:
-        return json.load(f)
+    """
+    Return a copy of the EOS database.
+
+    The JSON file is parsed once per process and cached by the EOS store;
+    it is only re-read when the file on disk changes. Callers get their
+    own copy, so changing it can't corrupt the cached data or its indexes.
+    """
+    return copy.deepcopy(get_eos_store().get())
 
 def normalize_version(version):
     """
@@ -40,45 +52,25 @@ def normalize_version(version):
     
     return version
 
-def find_best_product_match(vendor, product, db):
-    """Find best matching product in database using fuzzy matching."""
+def find_best_product_match(vendor, product, db, index=None):
+    """
+    Find best matching product in database using fuzzy matching.
+    
+    Uses the prebuilt ProductIndex of the cached EOS store when `db` is
+    the store's database (or when an index is passed in); any other dict
+    gets a throwaway index.
+    """
     if not product:
         return None, 0
     
-    # Build search queries (normalize to lowercase for better matching)
-    search_queries = []
-    if vendor and product:
-        search_queries.append(f"{vendor} {product}".lower())
-    if product:
-        search_queries.append(product.lower())
-    
-    best_match = None
-    best_score = 0
-    
-    # Normalize database keys to lowercase for comparison
-    db_products = list(db.keys())
-    db_lower_map = {k.lower(): k for k in db_products}
-    
-    for query in search_queries:
-        match = process.extractOne(
-            query,
-            list(db_lower_map.keys()),
-            scorer=fuzz.token_sort_ratio
-        )
-        
-        if match:
-            matched_key_lower, score, _ = match
-            
-            ##print(f"DEBUG: Query '{query}' matched '{matched_key_lower}' with score {score}")
-            
-            if score > best_score:
-                best_score = score
-                best_match = db_lower_map[matched_key_lower]
+    if index is None:
+        snapshot = get_eos_store().snapshot()
+        if db is snapshot.db:
+            index = snapshot.product_index
+        else:
+            index = ProductIndex(db.keys())
     
-    if best_score >= 70:
-        return best_match, best_score
-    
-    return None, 0
+    return index.match(vendor, product)
 
 def find_best_version_match(target_version, available_versions, product_name=""):
     """
@@ -140,30 +132,195 @@ def lookup_eos_date(vendor, product, version):
         version: Version string (e.g., "2019")
     
     Returns:
-        dict with eos_date, source, notes, match_confidence
+        dict with eos_date, source, notes, matched_product,
+        matched_version, match_confidence
         None if not found
     """
-    db = load_eos_database()
+    snapshot = get_eos_store().snapshot()
+    db = snapshot.db
     
     # Step 1: Find best product match
-    matched_product, product_confidence = find_best_product_match(vendor, product, db)
+    matched_product, product_confidence = find_best_product_match(
+        vendor, product, db, index=snapshot.product_index
+    )
     
     if not matched_product:
         return None
     
-    # Step 2: Find best version match
-    available_versions = list(db[matched_product].keys())
-    matched_version, version_confidence = find_best_version_match(version, available_versions)
+    # Steps 2-3: Find best version match and build the result
+    return resolve_version(db, matched_product, product_confidence, version,
+                           index=snapshot.version_indexes[matched_product])
+
+def resolve_version(db, matched_product, product_confidence, version, index=None):
+    """
+    Match a version within an already matched product.
+    
+    Versions are resolved through the product's VersionIndex (exact,
+    prefix, then nearest lower release). Fuzzy matching is only tried
+    for versions that don't parse as numbers.
+    
+    Returns:
+        dict with eos_date, source, notes, matched_product,
+        matched_version, match_confidence
+        None if no version matches
+    """
+    if index is None:
+        snapshot = get_eos_store().snapshot()
+        if db is snapshot.db:
+            index = snapshot.version_indexes[matched_product]
+        else:
+            index = VersionIndex(db[matched_product].keys())
+    
+    matched_version, version_confidence = index.match(version)
+    
+    if not matched_version and parse_version(version) is None:
+        available_versions = list(db[matched_product].keys())
+        matched_version, version_confidence = find_best_version_match(version, available_versions)
     
     if not matched_version:
         return None
     
-    # Step 3: Return EOS data with confidence scores
+    # Return EOS data with the matched entry and confidence scores
     eos_data = db[matched_product][matched_version].copy()
+    eos_data['matched_product'] = matched_product
+    eos_data['matched_version'] = matched_version
     eos_data['match_confidence'] = {
         'product': product_confidence,
         'version': version_confidence,
         'overall': (product_confidence + version_confidence) / 2
     }
     
-    return eos_data
\ No newline at end of file
+    return eos_data
+
+# Cache of lookup results keyed on (vendor, product, version)
+_lookup_cache = LRUCache(LOOKUP_CACHE_SIZE, name="eos_lookup")
+register_cache(_lookup_cache)
+_lookup_cache_version = None
+
+# Held while the cache switches versions and while results are stored, so
+# results computed from an older snapshot can't land after the switch
+_lookup_cache_lock = threading.Lock()
+
+# Marker for "triple not in cache" (None is a valid cached result)
+_NOT_CACHED = object()
+
+def _current_lookup_cache(db_version):
+    """
+    Return the lookup cache, dropping it if the EOS database changed.
+    
+    After a patch to the cached version that left the product catalog
+    alone, only results the patch can have changed are dropped: those
+    matched to a patched product, and misses (a patched product may have
+    gained the missing version).
+    """
+    global _lookup_cache_version
+    
+    with _lookup_cache_lock:
+        if db_version != _lookup_cache_version:
+            snapshot = get_eos_store().snapshot()
+            if (snapshot.version == db_version and snapshot.base_version == _lookup_cache_version
+                    and not snapshot.catalog_changed):
+                products = snapshot.changed_products
+                _lookup_cache.discard_where(
+                    lambda triple, eos_data: eos_data is None or eos_data['matched_product'] in products
+                )
+            else:
+                _lookup_cache.clear()
+            _lookup_cache_version = db_version
+    
+    return _lookup_cache
+
+def _cache_results(entries, db_version):
+    """
+    Store (triple, frozen EOS data) pairs looked up in snapshot db_version.
+    Dropped if the cache has moved on to another version meanwhile.
+    """
+    with _lookup_cache_lock:
+        if db_version != _lookup_cache_version:
+            return
+        for triple, eos_data in entries:
+            _lookup_cache.put(triple, eos_data)
+
+def lookup_eos_batch(triples):
+    """
+    Look up EOS data for many (vendor, product, version) triples at once.
+    
+    Triples are deduplicated, served from the lookup cache where possible,
+    and all remaining product queries are scored against the product index
+    in one vectorized call. Versions are then resolved per matched product.
+    
+    Args:
+        triples: iterable of (vendor, product, version)
+    
+    Returns:
+        dict mapping each distinct triple to its read-only result (same
+        fields as lookup_eos_date) or None if not found
+    """
+    snapshot = get_eos_store().snapshot()
+    cache = _current_lookup_cache(snapshot.version)
+    
+    results = {}
+    pending = []
+    for triple in dict.fromkeys(triples):
+        cached = cache.get(triple, _NOT_CACHED)
+        if cached is _NOT_CACHED:
+            pending.append(triple)
+        else:
+            results[triple] = cached
+    
+    if results:
+        LOOKUPS_TOTAL.inc(len(results), cache="hit", outcome="cached")
+    if not pending:
+        return results
+    
+    # Step 1: Match every pending product in one pass
+    with STAGE_SECONDS.time(stage="product_match"):
+        product_matches = snapshot.product_index.match_many(
+            [(vendor, product) for vendor, product, _ in pending]
+        )
+    
+    # Step 2: Resolve versions per matched product
+    start = time.perf_counter()
+    outcomes = {"matched": 0, "no_product": 0, "no_version": 0}
+    computed = []
+    for triple, (matched_product, product_confidence) in zip(pending, product_matches):
+        eos_data = None
+        if matched_product:
+            eos_data = resolve_version(
+                snapshot.db, matched_product, product_confidence, triple[2],
+                index=snapshot.version_indexes[matched_product]
+            )
+        
+        if eos_data:
+            outcomes["matched"] += 1
+            MATCH_SCORE.observe(eos_data['match_confidence']['product'], kind="product")
+            MATCH_SCORE.observe(eos_data['match_confidence']['version'], kind="version")
+        else:
+            outcomes["no_version" if matched_product else "no_product"] += 1
+        
+        eos_data = freeze(eos_data)
+        computed.append((triple, eos_data))
+        results[triple] = eos_data
+    
+    _cache_results(computed, snapshot.version)
+    STAGE_SECONDS.observe(time.perf_counter() - start, stage="version_match")
+    for outcome, count in outcomes.items():
+        if count:
+            LOOKUPS_TOTAL.inc(count, cache="miss", outcome=outcome)
+    
+    return results
+
+def prime_lookup_cache(entries, db_version):
+    """
+    Load (triple, EOS data) pairs computed elsewhere into the cache.
+    Ignored if the EOS database has changed since db_version.
+    """
+    if db_version != get_eos_store().version:
+        return
+    
+    _current_lookup_cache(db_version)
+    _cache_results([(triple, freeze(eos_data)) for triple, eos_data in entries], db_version)
+
+def get_lookup_cache():
+    """Return the EOS lookup cache (for stats)."""
+    return _lookup_cache
@@ -0,0 +1,356 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import date
+from config import EOS_DATABASE_PATH
+from eos_index import ProductIndex, VersionIndex
+from normalizer import extract_vendor
+
+
+class EOSSnapshot:
+    """
+    An immutable view of one loaded EOS database plus the indexes
+    derived from it. Readers grab a snapshot and use it for the whole
+    lookup, so a reload never changes data underneath them.
+
+    A snapshot made by patched() also records what it was derived from:
+    base_version, the products the patch touched, whether the set of
+    products or their vendors changed (catalog_changed), and whether it
+    added any product versions (added_versions). Caches use that to keep
+    entries the patch can't have affected.
+    """
+
+    __slots__ = ('db', 'version', 'product_vendors', 'product_index', 'version_indexes',
+                 'base_version', 'changed_products', 'catalog_changed', 'added_versions')
+
+    def __init__(self, db, version):
+        self.db = db
+        self.version = version
+        self.product_vendors = {
+            product: product_vendor(product, versions) for product, versions in db.items()
+        }
+        self.product_index = ProductIndex(db.keys(), vendors=self.product_vendors)
+        self.version_indexes = {
+            product: VersionIndex(versions.keys()) for product, versions in db.items()
+        }
+        self.base_version = None
+        self.changed_products = frozenset()
+        self.catalog_changed = True
+        self.added_versions = True
+
+    def patched(self, db, version, products):
+        """
+        Snapshot of `db`, a copy of this snapshot's database in which only
+        `products` were added, changed or removed. Only those products'
+        indexes are built; the rest are shared with this snapshot.
+        """
+        snapshot = EOSSnapshot.__new__(EOSSnapshot)
+        snapshot.db = db
+        snapshot.version = version
+
+        snapshot.product_vendors = dict(self.product_vendors)
+        snapshot.version_indexes = dict(self.version_indexes)
+        for product in products:
+            if product in db:
+                snapshot.product_vendors[product] = product_vendor(product, db[product])
+                snapshot.version_indexes[product] = VersionIndex(db[product].keys())
+            else:
+                snapshot.product_vendors.pop(product, None)
+                snapshot.version_indexes.pop(product, None)
+
+        snapshot.product_index = self.product_index.patched(products, db, snapshot.product_vendors)
+        snapshot.base_version = self.version
+        snapshot.changed_products = frozenset(products)
+        snapshot.catalog_changed = snapshot.product_index is not self.product_index
+        snapshot.added_versions = any(
+            version not in self.db.get(product, {})
+            for product in products if product in db
+            for version in db[product]
+        )
+        return snapshot
+
+
+def product_vendor(product_name, versions):
+    """
+    Canonical vendor that owns a product: the "vendor" field of its
+    entries if the catalog has one, otherwise the vendor the normalizer
+    detects in the product name (None if unknown).
+    """
+    for entry in versions.values():
+        if isinstance(entry, dict) and entry.get('vendor'):
+            return entry['vendor']
+
+    vendor, _, _ = extract_vendor(product_name)
+    return vendor
+
+
+# ============================================================================
+# PATCHES
+# ============================================================================
+# Lifecycle data can be changed through the admin API instead of editing
+# the JSON file. A patch is a list of changes:
+#
+#   {"op": "set", "product": "Windows Server", "version": "2016",
+#    "entry": {"eos_date": "2027-01-12", "source": "Microsoft Official"}}
+#   {"op": "remove", "product": "Windows Server", "version": "2012"}
+#   {"op": "remove", "product": "Windows Server"}      (whole product)
+#
+# "set" adds the version (and the product, if new) or replaces its entry.
+
+PATCH_OPS = ('set', 'remove')
+
+
+def check_change(change):
+    """
+    Validate one patch change.
+
+    Raises: ValueError describing the first problem found
+    """
+    if not isinstance(change, dict):
+        raise ValueError("Each change must be an object")
+    op = change.get('op')
+    if op not in PATCH_OPS:
+        raise ValueError(f"Unknown op {op!r} (expected one of {', '.join(PATCH_OPS)})")
+
+    product = change.get('product')
+    if not isinstance(product, str) or not product.strip():
+        raise ValueError("Each change needs a product name")
+    version = change.get('version')
+    if not (version is None and op == 'remove') and (not isinstance(version, str) or not version.strip()):
+        raise ValueError(f"Change to {product!r} needs a version")
+
+    if op == 'set':
+        entry = change.get('entry')
+        if not isinstance(entry, dict) or 'eos_date' not in entry:
+            raise ValueError(f"Setting {product!r} {version!r} needs an entry with an eos_date")
+        eos_date = entry['eos_date']
+        if eos_date is not None:
+            try:
+                date.fromisoformat(eos_date)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid eos_date {eos_date!r} (expected YYYY-MM-DD or null)")
+
+
+def apply_changes(db, changes):
+    """
+    Apply patch changes to an EOS database, copy-on-write: `db` and its
+    product dicts are not modified; only the products touched are copied.
+
+    Args:
+        db: database dict (product -> version -> entry)
+        changes: list of change dicts (see above)
+
+    Returns: (new database dict, set of products touched)
+
+    Raises: ValueError for an invalid change or removing something that
+            doesn't exist (nothing is applied then)
+    """
+    if not isinstance(changes, list) or not changes:
+        raise ValueError("A patch needs a non-empty list of changes")
+
+    new_db = dict(db)
+    touched = set()
+    copied = set()      # products whose version dict is already our own copy
+
+    for change in changes:
+        check_change(change)
+        product, version = change['product'], change.get('version')
+        touched.add(product)
+
+        if change['op'] == 'remove':
+            if product not in new_db:
+                raise ValueError(f"Unknown product {product!r}")
+            if version is None:
+                del new_db[product]
+                copied.discard(product)
+                continue
+            if version not in new_db[product]:
+                raise ValueError(f"Unknown version {version!r} of {product!r}")
+
+        if product not in copied:
+            new_db[product] = dict(new_db.get(product, {}))
+            copied.add(product)
+        versions = new_db[product]
+
+        if change['op'] == 'set':
+            versions[version] = dict(change['entry'])
+        else:
+            del versions[version]
+            # A product is only listed while it has versions
+            if not versions:
+                del new_db[product]
+                copied.discard(product)
+
+    return new_db, touched
+
+
+def json_layout(raw):
+    """
+    json.dumps arguments that lay data out the way the file `raw` (bytes)
+    is: same indentation, non-ASCII escaped or not, trailing newline or
+    not. Patches rewrite the file this way, so its diff only shows the
+    entries they changed.
+
+    Returns: (dict of json.dumps keyword arguments, trailing newline)
+    """
+    text = raw.decode('utf-8')
+    indent = re.search(r'\n([ \t]+)\S', text)
+    kwargs = {
+        "indent": indent.group(1) if indent else None,
+        "ensure_ascii": text.isascii(),
+    }
+    return kwargs, text.endswith('\n')
+
+
+class EOSStore:
+    """
+    Process-wide, in-memory copy of the EOS database.
+
+    The JSON file is parsed once (on first use) and kept in memory along
+    with its match indexes. Every access does a cheap stat() of the file;
+    the data is only re-parsed when the file's mtime/size changed AND its
+    content hash differs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._stamp = None      # (mtime_ns, size) of the loaded file
+        self._layout = None     # json_layout() of the loaded file
+
+        # Counters
+        self.hits = 0
+        self.reloads = 0
+        self.patches = 0
+        self.load_seconds_total = 0.0
+        self.last_load_seconds = 0.0
+        self.loaded_at = None
+
+    def _file_stamp(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self, stamp):
+        """Read the file and swap in the new data if its content changed."""
+        start = time.perf_counter()
+
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        version = hashlib.sha256(raw).hexdigest()
+        self._layout = json_layout(raw)
+
+        # File was touched/rewritten but content is identical - keep it
+        if self._snapshot is not None and version == self._snapshot.version:
+            self._stamp = stamp
+            self.hits += 1
+            return
+
+        # Build the new snapshot fully before swapping it in
+        self._snapshot = EOSSnapshot(json.loads(raw), version)
+        self._stamp = stamp
+
+        elapsed = time.perf_counter() - start
+        self.reloads += 1
+        self.last_load_seconds = elapsed
+        self.load_seconds_total += elapsed
+        self.loaded_at = time.time()
+
+    def snapshot(self):
+        """Return the current snapshot, reloading only if the file changed."""
+        stamp = self._file_stamp()
+
+        snapshot = self._snapshot
+        if snapshot is not None and stamp == self._stamp:
+            self.hits += 1
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None or stamp != self._stamp:
+                self._load(stamp)
+            else:
+                # Another thread reloaded while we waited for the lock
+                self.hits += 1
+            return self._snapshot
+
+    def apply_patch(self, changes):
+        """
+        Change entries of the live database (see apply_changes()).
+
+        The new snapshot is built next to the current one, sharing the
+        indexes of every product the patch didn't touch, and the file is
+        rewritten (laid out as before, see json_layout()); then the new
+        snapshot is swapped in. Readers never wait
+        for a patch: they keep using the snapshot they already have, and
+        the next snapshot() call returns the new one. Other processes pick
+        the change up from the file, like an edit made by hand.
+
+        Returns: (new snapshot, set of products touched)
+
+        Raises: ValueError for an invalid patch
+        """
+        with self._lock:
+            stamp = self._file_stamp()
+            if self._snapshot is None or stamp != self._stamp:
+                self._load(stamp)
+            current = self._snapshot
+
+            db, products = apply_changes(current.db, changes)
+            kwargs, newline = self._layout
+            raw = (json.dumps(db, **kwargs) + ('\n' if newline else '')).encode('utf-8')
+            version = hashlib.sha256(raw).hexdigest()
+            if version == current.version:
+                return current, products
+
+            snapshot = current.patched(db, version, products)
+
+            # Write the new file fully before replacing the old one
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(raw)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+            self._snapshot = snapshot
+            self._stamp = self._file_stamp()
+            self.patches += 1
+            self.loaded_at = time.time()
+
+        return snapshot, products
+
+    def get(self):
+        """Return the EOS database dict."""
+        return self.snapshot().db
+
+    @property
+    def version(self):
+        """Content hash of the currently loaded database."""
+        return self.snapshot().version
+
+    def stats(self):
+        """Counters for monitoring (hits, reloads, time spent loading)."""
+        snapshot = self._snapshot
+        return {
+            "path": self.path,
+            "version": snapshot.version if snapshot else None,
+            "products": len(snapshot.db) if snapshot else 0,
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "patches": self.patches,
+            "last_load_seconds": round(self.last_load_seconds, 6),
+            "load_seconds_total": round(self.load_seconds_total, 6),
+            "loaded_at": self.loaded_at,
+        }
+
+
+# Single store shared by the whole process
+_store = EOSStore(EOS_DATABASE_PATH)
+
+
+def get_eos_store():
+    """Return the process-wide EOS store."""
+    return _store
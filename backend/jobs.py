@@ -0,0 +1,166 @@
+import csv
+import io
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import JOB_WORKERS, JOB_QUEUE_SIZE, JOB_HISTORY, PERSIST_UPLOADS
+from csv_processor import iter_process_rows, new_summary, add_to_summary
+from database import save_results
+
+
+class QueueFull(Exception):
+    """Raised when too many jobs are already queued or running."""
+
+
+class Job:
+    """One background CSV processing job and its progress."""
+
+    def __init__(self, filename):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = "queued"    # queued, running, done, failed, cancelled
+        self.total_rows = 0
+        self.rows_done = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.results = None
+        self.summary = None
+        self.upload_id = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def progress(self):
+        """Status and progress (rows done/total, rows/sec, ETA) as a dict."""
+        rows_per_sec = None
+        eta_seconds = None
+
+        if self.started_at:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+            if elapsed > 0 and self.rows_done:
+                rows_per_sec = round(self.rows_done / elapsed, 1)
+                if not self.finished:
+                    eta_seconds = round((self.total_rows - self.rows_done) / rows_per_sec, 1)
+
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "rows_done": self.rows_done,
+            "total_rows": self.total_rows,
+            "percent": round(100 * self.rows_done / self.total_rows, 1) if self.total_rows else 0.0,
+            "rows_per_sec": rows_per_sec,
+            "eta_seconds": eta_seconds,
+            "upload_id": self.upload_id,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """
+    Bounded queue of CSV processing jobs run on a background thread pool.
+
+    At most `max_active` jobs may be queued or running at once; submit()
+    raises QueueFull beyond that so callers can push back (HTTP 429).
+    Finished jobs are kept (newest `history` of them) so results can be
+    fetched.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, max_active=JOB_QUEUE_SIZE, history=JOB_HISTORY):
+        self.max_active = max_active
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="csv-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def active_count(self):
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def submit(self, csv_data, filename=None):
+        """Queue a CSV (as a string) for processing. Returns the Job."""
+        with self._lock:
+            if self.active_count() >= self.max_active:
+                raise QueueFull(f"{self.max_active} jobs already queued or running")
+
+            job = Job(filename)
+            self._jobs[job.id] = job
+            self._prune()
+
+        self._executor.submit(self._run, job, csv_data)
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Ask a job to stop. Returns the Job, or None if unknown."""
+        job = self._jobs.get(job_id)
+        if job and not job.finished:
+            job.cancel_event.set()
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.time()
+        return job
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond the history limit."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def _run(self, job, csv_data):
+        if job.cancel_event.is_set():
+            return
+
+        job.status = "running"
+        job.started_at = time.time()
+
+        try:
+            rows = list(csv.DictReader(io.StringIO(csv_data)))
+            del csv_data
+            job.total_rows = len(rows)
+
+            results = []
+            summary = new_summary()
+            for result in iter_process_rows(rows):
+                if job.cancel_event.is_set():
+                    job.status = "cancelled"
+                    return
+                results.append(result)
+                add_to_summary(summary, result)
+                job.rows_done += 1
+
+            if PERSIST_UPLOADS:
+                job.upload_id = save_results(results, job.filename)
+
+            job.results = results
+            job.summary = summary
+            job.status = "done"
+
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+
+        finally:
+            job.finished_at = time.time()
+
+
+# Single queue shared by the whole process
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide job queue (created on first use)."""
+    global _queue
+
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+    return _queue
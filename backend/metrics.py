@@ -0,0 +1,272 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from config import METRICS_ENABLED
+
+# ============================================================================
+# METRIC TYPES
+# ============================================================================
+# Minimal Prometheus-style counters and histograms. Hot paths record one
+# observation per chunk or per cache miss, never per row, so the overhead
+# stays negligible and metrics can stay on permanently.
+
+# Latency buckets (seconds), from a single regex pass to a whole upload
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)
+
+# Fuzzy match scores (0-100)
+SCORE_BUCKETS = (50, 60, 70, 80, 85, 90, 95, 99, 100)
+
+
+def format_labels(labelnames, values, extra=None):
+    """Render {a="x",b="y"} for a label tuple ('' if no labels)."""
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def drain(self):
+        """Return and reset the current values (for shipping to the parent)."""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values):
+        """Add values drained from another process."""
+        with self._lock:
+            for key, amount in values.items():
+                self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in values:
+            lines.append(f"{self.name}{format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Bucketed distribution (count, sum and cumulative buckets)."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}    # label key -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of a with-block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def drain(self):
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values):
+        with self._lock:
+            for key, other in values.items():
+                state = self._values.get(key)
+                if state is None:
+                    self._values[key] = list(other)
+                else:
+                    for i, amount in enumerate(other):
+                        state[i] += amount
+
+    def render(self):
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, state in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), state):
+                cumulative += count
+                labels = format_labels(self.labelnames, key, ('le', bound))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {state[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+STAGE_SECONDS = Histogram(
+    "scrumbot_stage_seconds",
+    "Time spent per pipeline stage (parse, disk_cache_read, normalize, product_match, "
+    "version_match, risk, disk_cache_write, persist, serialize, compress) per chunk",
+    labelnames=("stage",)
+)
+
+NORMALIZE_SECONDS = Histogram(
+    "scrumbot_normalize_seconds",
+    "Time to normalize one distinct software name (cache misses only)"
+)
+
+ROWS_TOTAL = Counter(
+    "scrumbot_rows_processed_total",
+    "Inventory rows processed, by risk level",
+    labelnames=("risk_level",)
+)
+
+LOOKUPS_TOTAL = Counter(
+    "scrumbot_eos_lookups_total",
+    "Distinct (vendor, product, version) lookups, by cache use and outcome",
+    labelnames=("cache", "outcome")
+)
+
+MATCH_SCORE = Histogram(
+    "scrumbot_match_score",
+    "Fuzzy match scores of resolved lookups",
+    labelnames=("kind",),
+    buckets=SCORE_BUCKETS
+)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "scrumbot_http_request_seconds",
+    "HTTP request latency by endpoint and status",
+    labelnames=("endpoint", "method", "status")
+)
+
+METRICS = [STAGE_SECONDS, NORMALIZE_SECONDS, ROWS_TOTAL, LOOKUPS_TOTAL, MATCH_SCORE, HTTP_REQUEST_SECONDS]
+
+
+# ============================================================================
+# CACHES AND GAUGES
+# ============================================================================
+# LRU caches already count hits and misses; they are read at scrape time
+# instead of being counted again on the hot path. Worker processes report
+# what their own caches did since the last drain.
+
+_caches = []
+_cache_reported = {}    # cache name -> (hits, misses, evictions) already drained
+_remote_cache_counts = {}
+_gauges = []
+
+
+def register_cache(cache):
+    """Export an LRUCache's hit/miss/eviction counters."""
+    _caches.append(cache)
+
+
+def register_gauge(name, help, func):
+    """Export a value read from func() at scrape time."""
+    _gauges.append((name, help, func))
+
+
+def cache_counts():
+    """(hits, misses, evictions) per cache name, including worker processes."""
+    counts = dict(_remote_cache_counts)
+    for cache in _caches:
+        remote = counts.get(cache.name, (0, 0, 0))
+        counts[cache.name] = (cache.hits + remote[0], cache.misses + remote[1], cache.evictions + remote[2])
+    return counts
+
+
+# ============================================================================
+# CROSS-PROCESS COLLECTION
+# ============================================================================
+
+def drain():
+    """
+    Return and reset everything recorded in this process since the last
+    drain. Called in pool workers after each chunk; the parent merge()s it.
+    """
+    caches = {}
+    for cache in _caches:
+        current = (cache.hits, cache.misses, cache.evictions)
+        reported = _cache_reported.get(cache.name, (0, 0, 0))
+        caches[cache.name] = tuple(c - r for c, r in zip(current, reported))
+        _cache_reported[cache.name] = current
+
+    return {
+        "metrics": {metric.name: metric.drain() for metric in METRICS},
+        "caches": caches,
+    }
+
+
+def merge(delta):
+    """Add a drain() result from a worker process."""
+    by_name = {metric.name: metric for metric in METRICS}
+    for name, values in delta["metrics"].items():
+        by_name[name].merge(values)
+
+    for name, counts in delta["caches"].items():
+        previous = _remote_cache_counts.get(name, (0, 0, 0))
+        _remote_cache_counts[name] = tuple(p + c for p, c in zip(previous, counts))
+
+
+# ============================================================================
+# EXPOSITION
+# ============================================================================
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+
+    counts = cache_counts()
+    lines.append("# HELP scrumbot_cache_requests_total In-memory cache lookups by result")
+    lines.append("# TYPE scrumbot_cache_requests_total counter")
+    for name, (hits, misses, _) in sorted(counts.items()):
+        lines.append(f'scrumbot_cache_requests_total{{cache="{name}",result="hit"}} {hits}')
+        lines.append(f'scrumbot_cache_requests_total{{cache="{name}",result="miss"}} {misses}')
+    lines.append("# HELP scrumbot_cache_evictions_total In-memory cache evictions")
+    lines.append("# TYPE scrumbot_cache_evictions_total counter")
+    for name, (_, _, evictions) in sorted(counts.items()):
+        lines.append(f'scrumbot_cache_evictions_total{{cache="{name}"}} {evictions}')
+
+    for name, help, func in _gauges:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {func()}")
+
+    return '\n'.join(lines) + '\n'
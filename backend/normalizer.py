@@ -1,5 +1,10 @@
+import json
 import re
+import time
 from rapidfuzz import fuzz
+from cache import LRUCache, freeze
+from config import NORMALIZE_CACHE_SIZE, VENDOR_ALIASES_PATH
+from metrics import NORMALIZE_SECONDS, register_cache
 
 # ============================================================================
 # CONFIGURATION
@@ -41,6 +46,53 @@ COMPOUND_PRODUCTS = {
 }
 
 
+# ============================================================================
+# COMPILED PATTERNS
+# ============================================================================
+# The keyword tables above are compiled once at import into single
+# alternation patterns, so each step is one pass over the string no
+# matter how many keywords there are.
+
+def compile_keywords(keywords):
+    """Compile keywords into one case-insensitive \\b(?:a|b|...)\\b pattern."""
+    alternation = '|'.join(re.escape(k) for k in keywords)
+    return re.compile(r'\b(?:' + alternation + r')\b', re.IGNORECASE)
+
+RHEL_PATTERN = re.compile(r'\bRHEL\b', re.IGNORECASE)
+VERSION_PREFIX_PATTERN = re.compile(r'\b(v|ver|version)\s*(?=\d)', re.IGNORECASE)
+WHITESPACE_PATTERN = re.compile(r'\s+')
+LEADING_DOT_PATTERN = re.compile(r'^\s*\.\s*')
+TRAILING_DOT_PATTERN = re.compile(r'\s*\.\s*$')
+
+# Longest first, so e.g. "arm64" is never cut down to "arm"
+ARCHITECTURE_PATTERN = compile_keywords(
+    sorted(ARCHITECTURE_KEYWORDS, key=len, reverse=True)
+)
+
+ABBREVIATION_PATTERN = compile_keywords(
+    sorted(PRODUCT_ABBREVIATIONS, key=len, reverse=True)
+)
+
+# List order is priority order ("professional plus" before "professional")
+EDITION_PATTERN = compile_keywords(EDITION_KEYWORDS)
+EDITION_PRIORITY = {edition: i for i, edition in enumerate(EDITION_KEYWORDS)}
+
+VERSION_PATTERNS = [
+    (re.compile(r'(\d+\.\d+\.\d+)', re.IGNORECASE), "three_part"),    # 3.11.4, 2023.001 (no \b for v2023.001)
+    (re.compile(r'(\d+\.\d+)', re.IGNORECASE), "two_part"),           # 8.6, 7.0 (no \b)
+    (re.compile(r'(20\d{2})', re.IGNORECASE), "year"),                # 2019, v2023 (no \b)
+    (re.compile(r'\b(\d+[a-z])\b', re.IGNORECASE), "letter_suffix"),  # 19c
+    (re.compile(r'\b(DC)\b', re.IGNORECASE), "adobe_dc"),             # DC
+    (re.compile(r'\b(\d{1,3})\b', re.IGNORECASE), "simple_number"),   # 365
+]
+ORACLE_DOTTED_PATTERN = re.compile(r'\b(\d{2})\.[\d\.]+\b')
+
+
+def expand_abbreviation(match):
+    """re.sub callback: replace an abbreviation with its full form."""
+    return PRODUCT_ABBREVIATIONS[match.group(0).lower()]
+
+
 # ============================================================================
 # STEP 1: PREPROCESSING
 # ============================================================================
@@ -57,22 +109,18 @@ def preprocess(software_name):
     result = result.replace('_', ' ').replace('-', ' ')
 
     # Expand RHEL acronym BEFORE other processing
-    result = re.sub(r'\bRHEL\b', 'Red Hat Enterprise Linux', result, flags=re.IGNORECASE)
+    result = RHEL_PATTERN.sub('Red Hat Enterprise Linux', result)
 
-    result = re.sub(r'\b(v|ver|version)\s*(?=\d)', '', result, flags=re.IGNORECASE)
+    result = VERSION_PREFIX_PATTERN.sub('', result)
     
     # Strip architecture keywords
-    for arch in ARCHITECTURE_KEYWORDS:
-        pattern = r'\b' + re.escape(arch) + r'\b'
-        result = re.sub(pattern, '', result, flags=re.IGNORECASE)
+    result = ARCHITECTURE_PATTERN.sub('', result)
     
     # Expand common abbreviations
-    for abbrev, full in PRODUCT_ABBREVIATIONS.items():
-        pattern = r'\b' + re.escape(abbrev) + r'\b'
-        result = re.sub(pattern, full, result, flags=re.IGNORECASE)
+    result = ABBREVIATION_PATTERN.sub(expand_abbreviation, result)
     
     # Collapse multiple spaces
-    result = re.sub(r'\s+', ' ', result).strip()
+    result = WHITESPACE_PATTERN.sub(' ', result).strip()
     
     return result
 
@@ -81,22 +129,110 @@ def preprocess(software_name):
 # STEP 2: VENDOR EXTRACTION
 # ============================================================================
 
+# Words, and each punctuation character as a token of its own ("c#" is
+# "c", "#"), so aliases can't lose characters that tell them apart
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+
+class AliasMatcher:
+    """
+    Word-level trie over a vendor alias table.
+    
+    Names and aliases are split into words and punctuation characters.
+    Aliases match whole tokens, like \\b...\\b: "notepad" matches
+    "notepad++", but "notepad++" needs the "++" and "c#" doesn't match a
+    bare "c". Spacing between tokens is ignored. A lookup walks the trie
+    once from each token of the name, so the cost depends on the length
+    of the name, not on the number of vendors or aliases.
+    
+    Ties are broken leftmost-longest: the alias starting at the earliest
+    word wins, and of the aliases starting there, the one with the most
+    words. An alias listed under two vendors belongs to the first.
+    """
+    
+    def __init__(self, vendor_aliases):
+        self.root = {}
+        self.size = 0
+        
+        for vendor, aliases in vendor_aliases.items():
+            for alias in aliases:
+                words = TOKEN_PATTERN.findall(alias.lower())
+                if not words:
+                    continue
+                node = self.root
+                for word in words:
+                    node = node.setdefault(word, {})
+                # The None key marks the end of an alias
+                if None not in node:
+                    node[None] = (vendor, alias.lower())
+                    self.size += 1
+    
+    def find(self, name):
+        """Return (vendor, alias) for the best alias in name, or (None, None)."""
+        words = TOKEN_PATTERN.findall(name.lower())
+        root = self.root
+        
+        for start, word in enumerate(words):
+            node = root.get(word)
+            if node is None:
+                continue
+            
+            match = node.get(None)
+            for next_word in words[start + 1:]:
+                node = node.get(next_word)
+                if node is None:
+                    break
+                match = node.get(None, match)
+            if match:
+                return match
+        
+        return None, None
+
+
+def load_vendor_aliases(path):
+    """
+    Read an alias table from a JSON file: {"Vendor": ["alias", ...], ...}.
+    
+    Raises ValueError if the file isn't shaped like that.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        table = json.load(f)
+    
+    if not isinstance(table, dict) or not all(
+        isinstance(aliases, list) and all(isinstance(alias, str) for alias in aliases)
+        for aliases in table.values()
+    ):
+        raise ValueError(f"{path}: expected {{\"Vendor\": [\"alias\", ...]}}")
+    return table
+
+
+def add_vendor_aliases(vendor_aliases, extra):
+    """Merge another alias table in (new aliases go after existing ones)."""
+    for vendor, aliases in extra.items():
+        known = vendor_aliases.setdefault(vendor, [])
+        known.extend(alias for alias in aliases if alias not in known)
+
+
+if VENDOR_ALIASES_PATH:
+    add_vendor_aliases(VENDOR_ALIASES, load_vendor_aliases(VENDOR_ALIASES_PATH))
+
+VENDOR_MATCHER = AliasMatcher(VENDOR_ALIASES)
+
+
 def extract_vendor(software_name):
     """Extract vendor with special case handling."""
     name_lower = software_name.lower()
     
-    for canonical_vendor, aliases in VENDOR_ALIASES.items():
-        for alias in aliases:
-            pattern = r'\b' + re.escape(alias) + r'\b'
-            if re.search(pattern, name_lower):
-                # Build context hints
-                context = {
-                    "matched_alias": alias,
-                    "is_os": ("windows" in alias or "linux" in name_lower or 
-                             "rhel" in alias or canonical_vendor == "Red Hat"),  # ← ADDED
-                    "is_database": "database" in name_lower or canonical_vendor == "Oracle",
-                }
-                return canonical_vendor, alias, context
+    canonical_vendor, alias = VENDOR_MATCHER.find(name_lower)
+    if canonical_vendor:
+        # Build context hints
+        context = {
+            "matched_alias": alias,
+            "is_os": ("windows" in alias or "linux" in name_lower or 
+                     "rhel" in alias or canonical_vendor == "Red Hat"),  # ← ADDED
+            "is_database": "database" in name_lower or canonical_vendor == "Oracle",
+        }
+        return canonical_vendor, alias, context
     
     return None, None, {}
 
@@ -109,22 +245,13 @@ def extract_version_contextual(software_name, vendor_context):
     """Extract version - return RAW, no normalization."""
     # Oracle special case
     if vendor_context.get("is_database") and vendor_context.get("matched_alias") == "oracle":
-        dotted_match = re.search(r'\b(\d{2})\.[\d\.]+\b', software_name)
+        dotted_match = ORACLE_DOTTED_PATTERN.search(software_name)
         if dotted_match:
             return f"{dotted_match.group(1)}c"
     
     # Try patterns from most specific to least specific
-    patterns = [
-        (r'(\d+\.\d+\.\d+)', "three_part"),    # 3.11.4, 2023.001 (no \b for v2023.001)
-        (r'(\d+\.\d+)', "two_part"),           # 8.6, 7.0 (no \b)
-        (r'(20\d{2})', "year"),                # 2019, v2023 (no \b)
-        (r'\b(\d+[a-z])\b', "letter_suffix"),  # 19c
-        (r'\b(DC)\b', "adobe_dc"),             # DC
-        (r'\b(\d{1,3})\b', "simple_number"),   # 365
-    ]
-    
-    for pattern, pattern_type in patterns:
-        match = re.search(pattern, software_name, re.IGNORECASE)
+    for pattern, pattern_type in VERSION_PATTERNS:
+        match = pattern.search(software_name)
         if match:
             return match.group(1)  # Return RAW - no normalization!
     
@@ -163,14 +290,12 @@ def extract_product_contextual(software_name, vendor, matched_alias, version):
         result = re.sub(pattern, '', result, flags=re.IGNORECASE)
     
     # Remove edition keywords
-    for edition in EDITION_KEYWORDS:
-        pattern = r'\b' + re.escape(edition) + r'\b'
-        result = re.sub(pattern, '', result, flags=re.IGNORECASE)
+    result = EDITION_PATTERN.sub('', result)
     
     # Clean up artifacts
-    result = re.sub(r'\s+', ' ', result)      # Multiple spaces
-    result = re.sub(r'^\s*\.\s*', '', result) # Leading dots
-    result = re.sub(r'\s*\.\s*$', '', result) # Trailing dots
+    result = WHITESPACE_PATTERN.sub(' ', result)      # Multiple spaces
+    result = LEADING_DOT_PATTERN.sub('', result)      # Leading dots
+    result = TRAILING_DOT_PATTERN.sub('', result)     # Trailing dots
     result = result.strip()
     
     # If empty, use matched alias as fallback
@@ -185,13 +310,12 @@ def extract_product_contextual(software_name, vendor, matched_alias, version):
 # ============================================================================
 
 def extract_edition(software_name):
-    """Extract edition keywords."""
+    """Extract edition keywords (highest priority keyword wins)."""
     name_lower = software_name.lower()
     
-    for edition in EDITION_KEYWORDS:
-        pattern = r'\b' + re.escape(edition) + r'\b'
-        if re.search(pattern, name_lower):
-            return edition.title()
+    priorities = [EDITION_PRIORITY[m.group(0)] for m in EDITION_PATTERN.finditer(name_lower)]
+    if priorities:
+        return EDITION_KEYWORDS[min(priorities)].title()
     
     return None
 
@@ -248,4 +372,40 @@ def normalize_version_for_lookup(version):
         return version
     
     # Keep original version as-is - normalization happens in eos_lookup
-    return version
\ No newline at end of file
+    return version
+
+
+# ============================================================================
+# CACHED ENTRY POINT
+# ============================================================================
+
+# Inventories repeat the same raw strings many times - normalize each once
+_normalize_cache = LRUCache(NORMALIZE_CACHE_SIZE, name="normalize")
+register_cache(_normalize_cache)
+
+def normalize_software_name_cached(software_name):
+    """
+    Same as normalize_software_name, but memoized on the raw string.
+    
+    Returns a read-only mapping shared between callers.
+    """
+    return _normalize_cache.get_or_compute(
+        software_name,
+        lambda: timed_normalize(software_name)
+    )
+
+def timed_normalize(software_name):
+    """normalize_software_name, recording its latency (cache misses only)."""
+    start = time.perf_counter()
+    result = normalize_software_name(software_name)
+    NORMALIZE_SECONDS.observe(time.perf_counter() - start)
+    return result
+
+def prime_normalize_cache(entries):
+    """Load (raw name, normalized result) pairs computed elsewhere into the cache."""
+    for software_name, normalized in entries:
+        _normalize_cache.put(software_name, freeze(normalized))
+
+def get_normalize_cache():
+    """Return the normalization cache (for stats)."""
+    return _normalize_cache
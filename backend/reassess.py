@@ -0,0 +1,22 @@
+import argparse
+import time
+from datetime import date
+from database import get_connection, reassess_risks
+
+def main():
+    """Nightly job: refresh stored risk levels for today's date."""
+    parser = argparse.ArgumentParser(description="Re-assess risk levels of stored inventory")
+    parser.add_argument('--date', help="Assess as of this date (YYYY-MM-DD, default: today)")
+    parser.add_argument('--upload-id', type=int, help="Only re-assess one upload")
+    args = parser.parse_args()
+
+    today = date.fromisoformat(args.date) if args.date else None
+
+    start = time.perf_counter()
+    stats = reassess_risks(get_connection(), today=today, upload_id=args.upload_id)
+    elapsed = time.perf_counter() - start
+
+    print(f"Checked {stats['checked']} rows, updated {stats['changed']} in {elapsed:.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+import hashlib
+import threading
+import time
+from datetime import date
+from disk_cache import rules_hash
+from config import RESPONSE_CACHE_PATH, RESPONSE_CACHE_MAX_BYTES, HIGH_RISK_DAYS, MEDIUM_RISK_DAYS
+from metrics import register_cache
+from sqlite_cache import SQLiteCache
+
+# ============================================================================
+# RESPONSE CACHE
+# ============================================================================
+# The same inventory export is often uploaded several times a day. Uploads
+# are hashed while they are read, and the encoded response is stored under
+# a key made of that hash and everything else the results depend on: the
+# EOS database version, the normalizer rules, the risk thresholds, today's
+# date (days until EOS change every day) and the response format. The key
+# doubles as the response's ETag.
+#
+# Bodies are stored gzip-compressed, so a hit for a client that accepts
+# gzip is sent without re-encoding anything.
+
+# Bytes read from the upload at a time
+READ_BLOCK_SIZE = 1 << 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    day TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used);
+"""
+
+
+def read_upload(stream, block_size=READ_BLOCK_SIZE):
+    """
+    Read an upload to the end, hashing it on the way.
+
+    Returns: (data bytes, SHA-256 hex digest of the data)
+    """
+    digest = hashlib.sha256()
+    blocks = []
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        digest.update(block)
+        blocks.append(block)
+    return b''.join(blocks), digest.hexdigest()
+
+
+def response_key(content_hash, eos_version, variant='', today=None):
+    """
+    Cache key (and ETag) for the response to an upload.
+
+    Args:
+        content_hash: read_upload() digest of the upload
+        eos_version: version of the EOS database the results come from
+        variant: response format ('' for rows, 'columnar', ...)
+        today: date the risk is measured from (default: today)
+    """
+    today = (today or date.today()).isoformat()
+    parts = [content_hash, eos_version, rules_hash(), str(HIGH_RISK_DAYS),
+             str(MEDIUM_RISK_DAYS), today, variant]
+    return hashlib.sha256(':'.join(parts).encode('utf-8')).hexdigest()[:32]
+
+
+class ResponseCache(SQLiteCache):
+    """
+    Size-bounded, least-recently-used store of encoded responses in a
+    SQLite file, shared by every process and kept across restarts.
+
+    Entries for earlier days can never be hit again (the date is part of
+    the key) and are deleted on the next write; beyond that the least
+    recently used entries are evicted once the bodies add up to more than
+    max_bytes.
+    """
+
+    SCHEMA = SCHEMA
+
+    def __init__(self, path, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        super().__init__(path, "response")
+        self.max_bytes = max_bytes
+
+    def get(self, key):
+        """Return the stored gzip-compressed body for key, or None."""
+        conn = self._connection()
+        row = conn.execute("SELECT body FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return row[0]
+
+    def put(self, key, body, today=None):
+        """
+        Store a gzip-compressed body, evicting old entries to stay within
+        max_bytes. Bodies larger than max_bytes on their own aren't stored.
+        """
+        if len(body) > self.max_bytes:
+            return
+
+        conn = self._connection()
+        day = (today or date.today()).isoformat()
+
+        with self._transaction(conn):
+            evicted = conn.execute("DELETE FROM responses WHERE day != ?", (day,)).rowcount
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, day, body, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, day, body, len(body), time.time())
+            )
+
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                stale = []
+                for old_key, size in conn.execute(
+                    "SELECT key, size FROM responses WHERE key != ? ORDER BY last_used", (key,)
+                ):
+                    stale.append((old_key,))
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+                conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+                evicted += len(stale)
+
+        self.evictions += max(evicted, 0)
+        self.writes += 1
+
+    def clear(self):
+        """Delete every entry."""
+        conn = self._connection()
+        conn.execute("DELETE FROM responses")
+
+    def stats(self):
+        """Counters for monitoring, plus the entries and bytes stored."""
+        conn = self._connection()
+        entries, size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        return dict(super().stats(), entries=entries, bytes=size, max_bytes=self.max_bytes)
+
+
+# One cache per process (each thread gets its own connection)
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide response cache, or None if RESPONSE_CACHE_PATH is empty."""
+    global _response_cache
+
+    if not RESPONSE_CACHE_PATH:
+        return None
+
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(RESPONSE_CACHE_PATH)
+            register_cache(_response_cache)
+    return _response_cache
@@ -0,0 +1,149 @@
+import gzip
+import json
+from operator import itemgetter
+from csv_processor import RESULT_FIELDS, result_to_dict
+from config import COMPRESS_MIN_BYTES
+
+# orjson is several times faster than the standard library encoder;
+# brotli is optional (without it only gzip is offered)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Fast settings: large responses are compressed on the request thread
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+# ============================================================================
+# JSON ENCODING
+# ============================================================================
+
+def encode_json(payload):
+    """
+    Serialize a response payload to UTF-8 JSON bytes.
+
+    Keys are sorted, like Flask's jsonify, so switching encoders doesn't
+    change the output clients see. Result records are converted to dicts
+    here, one at a time, as they are encoded.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, default=result_to_dict, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(payload, default=result_to_dict, sort_keys=True,
+                      separators=(',', ':')).encode('utf-8')
+
+
+# ============================================================================
+# COLUMNAR FORMAT
+# ============================================================================
+# Result rows all have the same keys, and most string columns (vendor,
+# source, risk level, EOS source, ...) repeat a handful of values. The
+# columnar shape sends each key once and each repeated string once:
+#
+#   "columns": ["raw_input", "install_date", ...],
+#   "data": [["MS Office 2019", ...], ["2023-01-05", ...], ...],
+#   "dictionaries": {"vendor": ["Microsoft", "Adobe", null], ...}
+#
+# data[i] holds column i for every row. A column listed in dictionaries
+# holds indexes into that list instead of the values themselves.
+
+# Columns holding numbers are never dictionary-encoded
+NUMERIC_FIELDS = {"confidence_score", "days_until_eos"}
+
+
+def dictionary_encode(values):
+    """
+    Return (dictionary, codes) if encoding pays off (at most half as many
+    distinct values as rows), else None.
+    """
+    dictionary = list(dict.fromkeys(values))
+    if len(dictionary) * 2 > len(values):
+        return None
+    codes = {value: code for code, value in enumerate(dictionary)}
+    return dictionary, list(map(codes.__getitem__, values))
+
+
+def columnar(results, fields=RESULT_FIELDS):
+    """
+    Convert result rows to the columnar shape.
+
+    Returns: dict with columns, data, dictionaries and row_count
+    """
+    data = []
+    dictionaries = {}
+
+    for field in fields:
+        values = list(map(itemgetter(field), results))
+        encoded = None if field in NUMERIC_FIELDS else dictionary_encode(values)
+        if encoded:
+            dictionaries[field], values = encoded
+        data.append(values)
+
+    return {
+        "columns": list(fields),
+        "data": data,
+        "dictionaries": dictionaries,
+        "row_count": len(results),
+    }
+
+
+def from_columnar(table):
+    """Inverse of columnar(): back to a list of result dicts (for clients and tests)."""
+    columns = []
+    for field, values in zip(table["columns"], table["data"]):
+        dictionary = table["dictionaries"].get(field)
+        columns.append([dictionary[code] for code in values] if dictionary is not None else values)
+    return [dict(zip(table["columns"], row)) for row in zip(*columns)]
+
+
+# ============================================================================
+# COMPRESSION
+# ============================================================================
+
+def available_encodings():
+    """Content-Encodings we can produce, preferred first."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress(body, accept_encodings):
+    """
+    Compress a response body for the client's Accept-Encoding header.
+
+    Args:
+        body: encoded response (bytes)
+        accept_encodings: werkzeug Accept for the request's Accept-Encoding
+
+    Returns: (body, content encoding or None if sent as-is)
+    """
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+
+    encoding = accept_encodings.best_match(available_encodings())
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY), 'br'
+    if encoding == 'gzip':
+        return gzip_body(body), 'gzip'
+    return body, None
+
+
+def gzip_body(body):
+    """Gzip a body (deterministically: no timestamp in the header)."""
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def recompress(gzipped, accept_encodings):
+    """
+    Prepare a stored gzip body for the client's Accept-Encoding header:
+    sent as-is if gzip is acceptable, otherwise decompressed and passed
+    through compress().
+
+    Returns: (body, content encoding or None if sent as-is)
+    """
+    if accept_encodings.best_match(available_encodings()) == 'gzip':
+        return gzipped, 'gzip'
+    return compress(gzip.decompress(gzipped), accept_encodings)
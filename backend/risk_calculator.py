@@ -1,11 +1,51 @@
 from datetime import datetime, date
+import numpy as np
+from config import HIGH_RISK_DAYS, MEDIUM_RISK_DAYS
 
-def calculate_risk(eos_date_str):
+# Risk levels for dated EOS entries, in bucket order (index = bucket code)
+RISK_BUCKETS = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
+
+# Risk for software without an EOS match
+NO_EOS_RISK = {"risk_level": "UNKNOWN", "days_until_eos": None, "reason": "No EOS data available"}
+
+def describe_risk(days_until, high_days=HIGH_RISK_DAYS, medium_days=MEDIUM_RISK_DAYS):
+    """
+    Risk level and reason for a known number of days until EOS.
+
+    Returns: dict with risk_level, days_until_eos, reason
+    """
+    if days_until < 0:
+        return {
+            "risk_level": "CRITICAL",
+            "days_until_eos": days_until,
+            "reason": f"Already past EOS by {abs(days_until)} days"
+        }
+    elif days_until < high_days:
+        return {
+            "risk_level": "HIGH",
+            "days_until_eos": days_until,
+            "reason": f"EOS in {days_until} days (< {high_days} days)"
+        }
+    elif days_until < medium_days:
+        return {
+            "risk_level": "MEDIUM",
+            "days_until_eos": days_until,
+            "reason": f"EOS in {days_until} days ({high_days}-{medium_days} days)"
+        }
+    else:
+        return {
+            "risk_level": "LOW",
+            "days_until_eos": days_until,
+            "reason": f"EOS in {days_until} days (> {medium_days} days)"
+        }
+
+def calculate_risk(eos_date_str, today=None):
     """
     Calculate risk level based on EOS date.
     
     Args:
         eos_date_str: Date string in format "YYYY-MM-DD" or None
+        today: date to measure from (default: today)
     
     Returns:
         dict with:
@@ -32,31 +72,63 @@ def calculate_risk(eos_date_str):
         }
     
     # Calculate days until EOS
-    today = date.today()
+    today = today or date.today()
     days_until = (eos_date - today).days
     
     # Determine risk level
-    if days_until < 0:
-        return {
-            "risk_level": "CRITICAL",
-            "days_until_eos": days_until,
-            "reason": f"Already past EOS by {abs(days_until)} days"
-        }
-    elif days_until < 90:
-        return {
-            "risk_level": "HIGH",
-            "days_until_eos": days_until,
-            "reason": f"EOS in {days_until} days (< 90 days)"
-        }
-    elif days_until < 180:
-        return {
-            "risk_level": "MEDIUM",
-            "days_until_eos": days_until,
-            "reason": f"EOS in {days_until} days (90-180 days)"
-        }
-    else:
-        return {
-            "risk_level": "LOW",
-            "days_until_eos": days_until,
-            "reason": f"EOS in {days_until} days (> 180 days)"
-        }
\ No newline at end of file
+    return describe_risk(days_until)
+
+def risk_buckets(days_until, high_days=HIGH_RISK_DAYS, medium_days=MEDIUM_RISK_DAYS):
+    """
+    Vectorized risk bucketing.
+
+    Args:
+        days_until: numpy array of days until EOS
+
+    Returns:
+        numpy array of bucket codes (index into RISK_BUCKETS)
+    """
+    thresholds = np.array([0, high_days, medium_days])
+    return np.searchsorted(thresholds, days_until, side='right')
+
+def days_until_eos(eos_days, today=None):
+    """
+    Vectorized days-until-EOS.
+
+    Args:
+        eos_days: numpy array of EOS dates as days since 1970-01-01
+        today: date to measure from (default: today)
+
+    Returns:
+        numpy int64 array
+    """
+    today = np.datetime64(today or date.today(), 'D').astype(np.int64)
+    return np.asarray(eos_days, dtype=np.int64) - today
+
+def bucket_counts(eos_days, counts, as_of_days, high_days=HIGH_RISK_DAYS, medium_days=MEDIUM_RISK_DAYS):
+    """
+    Vectorized risk bucket sizes as of several dates.
+
+    The EOS dates are sorted once; the rows falling in each bucket on a
+    given day are then differences of cumulative counts, found by binary
+    search at that day's bucket edges (the same edges as risk_buckets).
+
+    Args:
+        eos_days: numpy array of EOS dates as days since 1970-01-01
+        counts: numpy array of rows with each EOS date
+        as_of_days: numpy array of days (since 1970-01-01) to assess as of
+
+    Returns:
+        numpy int64 array of shape (len(as_of_days), len(RISK_BUCKETS))
+    """
+    eos_days = np.asarray(eos_days, dtype=np.int64)
+    order = np.argsort(eos_days, kind='stable')
+    cumulative = np.concatenate(([0], np.cumsum(np.asarray(counts, dtype=np.int64)[order])))
+
+    # Rows with days_until_eos below each edge, i.e. EOS before day + edge
+    edges = np.asarray(as_of_days, dtype=np.int64)[:, None] + np.array([0, high_days, medium_days])
+    below = cumulative[np.searchsorted(eos_days[order], edges, side='left')]
+
+    first = np.zeros((len(edges), 1), dtype=np.int64)
+    last = np.full((len(edges), 1), cumulative[-1], dtype=np.int64)
+    return np.diff(np.hstack([first, below, last]), axis=1)
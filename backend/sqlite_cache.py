@@ -0,0 +1,62 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Max host parameters per IN (...) query (SQLite's default limit is 999)
+QUERY_BATCH = 500
+
+
+class SQLiteCache:
+    """
+    Base for caches kept in a SQLite file, shared by every process and
+    kept across restarts. Each thread gets its own connection; subclasses
+    set SCHEMA and count their hits, misses, evictions and writes.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
+        self._local = threading.local()
+
+        # Counters (same names as LRUCache, so metrics can export them)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Losing the last writes on a crash only costs a recompute
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.executescript(self.SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self, conn):
+        """Write transaction, taking the write lock up front."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def stats(self):
+        """Counters for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,58 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import database
+from app import app
+
+# Streamed uploads are saved; use a throwaway database file
+tmp_dir = tempfile.mkdtemp()
+real_path = database.DATABASE_PATH
+database.DATABASE_PATH = os.path.join(tmp_dir, 'test.db')
+
+with open('data/sample_input.csv', 'rb') as f:
+    csv_data = f.read()
+
+client = app.test_client()
+
+
+def upload_ndjson(data, filename='sample_input.csv'):
+    response = client.post('/api/process-csv?stream=ndjson',
+                           data={'file': (io.BytesIO(data), filename)})
+    lines = response.get_data(as_text=True).splitlines()
+    return response, [json.loads(line) for line in lines]
+
+
+print("Testing App:\n")
+
+# One line per row, then a summary line
+response, lines = upload_ndjson(csv_data)
+*rows, final = lines
+print(f"NDJSON stream: {response.status_code} {response.mimetype}")
+print(f"  Row lines: {len(rows)} (input rows: {len(csv_data.splitlines()) - 1})")
+print(f"  First row: {rows[0]['raw_input']} -> {rows[0]['vendor']} {rows[0]['product']} {rows[0]['version']}")
+print(f"  Final line: success={final['success']}, summary={final['summary']}")
+print(f"  Summary counts the rows: {final['summary']['total'] == len(rows)}")
+stored = database.get_upload(database.get_connection(), final['upload_id'])
+print(f"  Saved as upload {final['upload_id']} with {stored['row_count']} rows")
+
+# Headers are sent before processing starts, so a failure is reported
+# in-band as the last line, and the partial upload is not kept
+uploads = len(database.list_uploads(database.get_connection()))
+response, lines = upload_ndjson(csv_data + b'\xff\xfe broken\n', 'broken.csv')
+print(f"\nBroken upload: {response.status_code}, last line: {lines[-1]['error']}")
+print(f"  Has a message and summary: {bool(lines[-1]['message'])}, {'summary' in lines[-1]}")
+print(f"  Partial upload kept: {len(database.list_uploads(database.get_connection())) != uploads}")
+
+# Same when the client goes away mid-stream
+response = client.post('/api/process-csv?stream=ndjson', buffered=False,
+                       data={'file': (io.BytesIO(csv_data), 'abandoned.csv')})
+first = next(response.response)
+response.close()
+print(f"\nAbandoned after one line ({len(first)} bytes), partial upload kept: "
+      f"{len(database.list_uploads(database.get_connection())) != uploads}")
+
+database.close_all()
+database.DATABASE_PATH = real_path
+shutil.rmtree(tmp_dir)
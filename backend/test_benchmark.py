@@ -0,0 +1,21 @@
+from benchmark import generate_inventory, check_regressions
+from normalizer import normalize_software_name
+
+print("Testing Synthetic Inventory Generator:\n")
+
+rows = generate_inventory(1000, seed=7)
+for row in rows[:10]:
+    print(f"  {row['software_name']:<50} {row['install_date']}  {row['source']}")
+
+# Same seed, same rows
+assert rows == generate_inventory(1000, seed=7)
+
+with_vendor = sum(1 for row in rows if normalize_software_name(row['software_name'])['vendor'])
+print(f"\nDistinct names: {len(set(row['software_name'] for row in rows))} of {len(rows)}")
+print(f"Rows with a detected vendor: {with_vendor} of {len(rows)}")
+
+print("\nTesting Regression Check:\n")
+
+baseline = {"results": {"normalize_software_name": {"1000": 20000.0}}}
+print(f"  10% slower: {check_regressions({'normalize_software_name': {'1000': 18000.0}}, baseline)}")
+print(f"  40% slower: {check_regressions({'normalize_software_name': {'1000': 12000.0}}, baseline)}")
@@ -0,0 +1,25 @@
+from cache import LRUCache
+from normalizer import normalize_software_name_cached, get_normalize_cache
+
+print("Testing LRU Cache:\n")
+
+cache = LRUCache(2, name="test")
+cache.put("a", 1)
+cache.put("b", 2)
+cache.get("a")          # "a" is now most recently used
+cache.put("c", 3)       # evicts "b"
+print(f"Keys after eviction: a={cache.get('a')}, b={cache.get('b')}, c={cache.get('c')}")
+print(f"Stats: {cache.stats()}\n")
+
+# Repeated raw strings are normalized once
+rows = ["win_svr_2019_std", "MS Office Professional Plus 2019"] * 500
+for name in rows:
+    result = normalize_software_name_cached(name)
+print(f"Normalize cache: {get_normalize_cache().stats()}")
+
+# Cached results are read-only
+try:
+    result["vendor"] = "Someone Else"
+    print("  ⚠️  Cached result was modified")
+except TypeError:
+    print(f"  Cached result is read-only (vendor still {result['vendor']})")
@@ -1,34 +1,80 @@
-from csv_processor import process_csv
+from concurrent.futures import ThreadPoolExecutor
+from csv_processor import process_csv, process_csv_data, get_process_pool, RESULT_FIELDS
 import json
+import pickle
+import sys
+from metrics import ROWS_TOTAL
 
-# Process the sample CSV
-results = process_csv('data/sample_input.csv')
-
-print("CSV Processing Results:\n")
-print("="*80)
-
-for result in results:
-    print(f"\nRaw Input: {result['raw_input']}")
-    print(f"Source: {result['source']}")
-    print(f"-" * 40)
-    print(f"Vendor: {result['vendor']}")
-    print(f"Product: {result['product']}")
-    print(f"Version: {result['version']}")
-    print(f"Edition: {result['edition']}")
-    print(f"Confidence: {result['confidence_score']:.2f}")
-    print(f"-" * 40)
-    print(f"EOS Date: {result['eos_date']}")
-    print(f"Risk Level: {result['risk_level']}")
-    print(f"Days Until EOS: {result['days_until_eos']}")
-    print(f"Risk Reason: {result['risk_reason']}")
+# Parallel runs start worker processes that re-run this file on start
+# (spawn); only the parent runs the checks
+if __name__ != '__mp_main__':
+    # Process the sample CSV
+    results = process_csv('data/sample_input.csv')
+
+    print("CSV Processing Results:\n")
     print("="*80)
 
-# Summary
-print("\n\nRISK SUMMARY:")
-risk_counts = {}
-for result in results:
-    level = result['risk_level']
-    risk_counts[level] = risk_counts.get(level, 0) + 1
+    for result in results:
+        print(f"\nRaw Input: {result['raw_input']}")
+        print(f"Source: {result['source']}")
+        print(f"-" * 40)
+        print(f"Vendor: {result['vendor']}")
+        print(f"Product: {result['product']}")
+        print(f"Version: {result['version']}")
+        print(f"Edition: {result['edition']}")
+        print(f"Confidence: {result['confidence_score']:.2f}")
+        print(f"-" * 40)
+        print(f"EOS Date: {result['eos_date']}")
+        print(f"Risk Level: {result['risk_level']}")
+        print(f"Days Until EOS: {result['days_until_eos']}")
+        print(f"Risk Reason: {result['risk_reason']}")
+        print("="*80)
+
+    # Summary
+    print("\n\nRISK SUMMARY:")
+    risk_counts = {}
+    for result in results:
+        level = result['risk_level']
+        risk_counts[level] = risk_counts.get(level, 0) + 1
+
+    for level, count in sorted(risk_counts.items()):
+        print(f"  {level}: {count} products")
+
+    # Result records read like dicts
+    record = results[0]
+    print("\n\nRESULT RECORDS:")
+    print(f"  Keys: {list(record.keys()) == RESULT_FIELDS}")
+    print(f"  get('vendor'): {record.get('vendor')}, get('missing'): {record.get('missing')}")
+    print(f"  Equal to its dict: {record == record.to_dict()}")
+    print(f"  JSON: {json.dumps(record.to_dict())[:60]}...")
+    print(f"  Pickle round trip: {pickle.loads(pickle.dumps(record)) == record}")
+    print(f"  Source strings shared: {all(r['source'] is sys.intern(r['source']) for r in results)}")
+
+    # Short rows (missing trailing cells) still process
+    short = process_csv_data('software_name,install_date,source\nPython 3.11.4\n', workers=1)
+    print(f"  Short row: {short[0]['product']}, install_date={short[0]['install_date']!r}, source={short[0]['source']!r}")
+
+    # Parallel processing: same rows in the same order as serial, with the
+    # workers' metrics merged into this process
+    with open('data/sample_input.csv') as f:
+        header, *lines = f.read().splitlines()
+    big = '\n'.join([header] + lines * 1400)
+
+    ROWS_TOTAL.drain()
+    serial = process_csv_data(big, workers=1)
+    serial_rows = sum(ROWS_TOTAL.drain().values())
+    parallel = process_csv_data(big, workers=2)
+    parallel_rows = sum(ROWS_TOTAL.drain().values())
+
+    print("\n\nPARALLEL PROCESSING:")
+    print(f"  Rows: {len(parallel)}, same results in the same order: "
+          f"{[r.to_dict() for r in parallel] == [r.to_dict() for r in serial]}")
+    print(f"  Rows counted in metrics: serial {serial_rows}, parallel {parallel_rows}")
 
-for level, count in sorted(risk_counts.items()):
-    print(f"  {level}: {count} products")
\ No newline at end of file
+    # Concurrent first requests share one pool, and asking for another
+    # worker count leaves the pool in use alone
+    in_use = get_process_pool(2)
+    with ThreadPoolExecutor(8) as threads:
+        pools = list(threads.map(get_process_pool, [3] * 8))
+    print(f"  Concurrent callers share one pool: {len({id(pool) for pool in pools}) == 1}")
+    print(f"  Pool in use kept: {get_process_pool(2) is in_use}")
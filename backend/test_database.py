@@ -0,0 +1,229 @@
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+import database
+import eos_store
+from csv_processor import process_csv, process_rows, summarize_results
+from risk_calculator import calculate_risk, describe_risk
+
+# Use a throwaway database file
+tmp_dir = tempfile.mkdtemp()
+db_path = os.path.join(tmp_dir, 'test.db')
+conn = database.connect(db_path)
+
+results = process_csv('data/sample_input.csv')
+
+print("Testing Database:\n")
+
+# Save the sample upload
+upload_id = database.save_results(results, 'sample_input.csv', conn=conn)
+print(f"Upload: {database.get_upload(conn, upload_id)}")
+
+matched = conn.execute(
+    "SELECT COUNT(*) FROM software_inventory WHERE upload_id = ? AND eos_date_id IS NOT NULL",
+    (upload_id,)
+).fetchone()[0]
+print(f"Rows matched to an EOS entry: {matched} of {len(results)}")
+
+print("\nRisk levels stored:")
+for row in conn.execute(
+    "SELECT risk_level, COUNT(*) AS n FROM risk_assessments WHERE upload_id = ? GROUP BY risk_level",
+    (upload_id,)
+):
+    print(f"  {row['risk_level']}: {row['n']}")
+
+# Paginated, filtered results
+print("\nResults by EOS date (pages of 5):")
+cursor = None
+while True:
+    page, cursor = database.query_results(conn, upload_id, limit=5, cursor=cursor)
+    print(f"  {[(r['raw_input'], r['days_until_eos']) for r in page]}")
+    if not cursor:
+        break
+
+
+def all_pages(**filters):
+    ids, cursor = [], None
+    while True:
+        page, cursor = database.query_results(conn, upload_id, limit=4, cursor=cursor, **filters)
+        ids.extend(r['id'] for r in page)
+        if not cursor:
+            return ids
+
+
+print(f"Descending pages reverse the ascending ones: {all_pages(descending=True) == all_pages()[::-1]}")
+
+page, _ = database.query_results(conn, upload_id, risk_levels=['CRITICAL'], vendor='Microsoft')
+print(f"\nCritical Microsoft rows: {[r['raw_input'] for r in page]}")
+print(f"Summary: {database.summarize_upload(conn, upload_id)}")
+
+# Re-risking as of a later date: only rows whose level changes are
+# rewritten, and upload_counts follows them
+before = database.summarize_upload(conn, upload_id)
+later = date.today() + timedelta(days=400)
+expected_levels = [calculate_risk(r['eos_date'], later)['risk_level'] if r['eos_product'] else 'UNKNOWN'
+                   for r in results]
+moved = sum(level != r['risk_level'] for level, r in zip(expected_levels, results))
+stats = database.reassess_risks(conn, today=later, upload_id=upload_id)
+print(f"\nRe-risked 400 days ahead: {stats}, expected {moved} changed")
+stored_levels = [row[0] for row in conn.execute(
+    "SELECT r.risk_level FROM risk_assessments r JOIN software_inventory i ON i.id = r.inventory_id "
+    "WHERE r.upload_id = ? ORDER BY i.row_number", (upload_id,)
+)]
+print(f"Stored levels match: {stored_levels == expected_levels}")
+summary = database.summarize_upload(conn, upload_id)
+print(f"Counts follow: {all(summary[level.lower()] == expected_levels.count(level) for level in set(expected_levels))}")
+
+# Results describe risk as of today whatever the last assessment was
+page, _ = database.query_results(conn, upload_id, limit=100)
+dated = [r for r in page if r['days_until_eos'] is not None]
+print(f"Result level/reason agree with days until EOS: "
+      f"{all((r['risk_level'], r['risk_reason']) == tuple(describe_risk(r['days_until_eos'])[k] for k in ('risk_level', 'reason')) for r in dated)}")
+
+database.reassess_risks(conn, upload_id=upload_id)
+print(f"Back to today, summary restored: {database.summarize_upload(conn, upload_id) == before}")
+
+# A synced catalog with a new date for a matched entry: its rows are
+# re-pointed at the new date, not just re-scored
+def python_rows():
+    page, _ = database.query_results(conn, upload_id, limit=100)
+    return [(r['eos_date'], r['risk_level']) for r in page if r['eos_product'] == 'Python']
+
+
+def eos_counts():
+    return dict(conn.execute(
+        "SELECT eos_date, SUM(row_count) FROM upload_eos_counts WHERE upload_id = ? "
+        "GROUP BY eos_date HAVING SUM(row_count) > 0", (upload_id,)
+    ).fetchall())
+
+
+python_entry = "(SELECT e.id FROM eos_dates e JOIN products p ON p.id = e.product_id " \
+               "WHERE p.product_name = 'Python' AND e.version = '3.11')"
+python_date = conn.execute(f"SELECT eos_date FROM eos_dates WHERE id = {python_entry}").fetchone()[0]
+conn.execute(f"UPDATE eos_dates SET eos_date = '2024-10-24' WHERE id = {python_entry}")
+stats = database.reassess_risks(conn, upload_id=upload_id)
+page, _ = database.query_results(conn, upload_id, risk_levels=['CRITICAL'])
+summary = database.summarize_upload(conn, upload_id)
+print(f"\nPython 3.11 moved to 2024-10-24: {stats}, rows {python_rows()}")
+print(f"  Critical filter and summary agree: {len(page) == summary['critical']}, "
+      f"counted under the new date: {eos_counts().get('2024-10-24')}, old date: {eos_counts().get(python_date)}")
+conn.execute(f"UPDATE eos_dates SET eos_date = ? WHERE id = {python_entry}", (python_date,))
+database.reassess_risks(conn, upload_id=upload_id)
+print(f"  Moved back, summary restored: {database.summarize_upload(conn, upload_id) == before}")
+
+# Bulk insert throughput
+many = results * 10000
+start = time.perf_counter()
+database.save_results(many, 'bulk.csv', conn=conn)
+elapsed = time.perf_counter() - start
+print(f"\nBulk insert: {len(many)} rows in {elapsed:.2f}s ({len(many) / elapsed:,.0f} rows/sec)")
+
+# EOS database patches re-assess only the rows they affect. Patches
+# rewrite the EOS file, so the store is pointed at a copy meanwhile.
+
+real_store = eos_store._store
+eos_store._store = eos_store.EOSStore(os.path.join(tmp_dir, 'eos_database.json'))
+shutil.copy('data/eos_database.json', eos_store._store.path)
+
+rows = [{"software_name": r['raw_input'], "install_date": r['install_date'], "source": r['source']}
+        for r in results]
+rows.append({"software_name": "Microsoft Visual Studio 2019", "install_date": "2021-03-01", "source": "SCCM"})
+patch_upload = database.save_results(process_rows(rows), 'patch.csv', conn=conn)
+
+snapshot, products = eos_store.get_eos_store().apply_patch([
+    {"op": "set", "product": "Windows Server", "version": "2019",
+     "entry": {"eos_date": (date.today() + timedelta(days=30)).isoformat(), "source": "Test"}},
+    {"op": "set", "product": "Adobe Acrobat", "version": "2023",
+     "entry": {"eos_date": "2028-11-01", "source": "Test"}},
+    {"op": "set", "product": "Visual Studio", "version": "2019",
+     "entry": {"eos_date": "2029-04-10", "source": "Test"}},
+    {"op": "remove", "product": "VMware vSphere"},
+])
+stats = database.apply_eos_patch(snapshot, conn=conn)
+print(f"\nPatched {sorted(products)}: {stats}")
+
+# Stored rows now match processing the same rows from scratch
+fields = ['raw_input', 'eos_product', 'eos_version', 'eos_date', 'risk_level', 'days_until_eos', 'risk_reason']
+fresh = process_rows(rows)
+stored, _ = database.query_results(conn, patch_upload, limit=100)
+key = lambda r: tuple(str(r[f]) for f in fields)
+print(f"Stored rows match a fresh run: {sorted(map(key, stored)) == sorted(map(key, fresh))}")
+summary = database.summarize_upload(conn, patch_upload)
+print(f"Summary matches: {all(summary[k] == v for k, v in summarize_results(fresh).items())}")
+for r in sorted(stored, key=lambda r: r['raw_input']):
+    if r['raw_input'] in ('win_svr_2019_std', 'adobe_acrobat_reader_dc_v2023.001',
+                          'VMware vSphere 7.0', 'Microsoft Visual Studio 2019'):
+        print(f"  {r['raw_input']}: {r['eos_product']} {r['eos_version']} -> {r['risk_level']}")
+print(f"Catalog mirror up to date: {database.get_meta(conn, 'eos_version') == snapshot.version}")
+
+# Two patches re-assessed in reverse order: the mirror ends up at the
+# newer one, not back at the older one
+first, _ = eos_store.get_eos_store().apply_patch([
+    {"op": "set", "product": "Windows Server", "version": "2019",
+     "entry": {"eos_date": "2026-11-01", "source": "Test"}},
+])
+second, _ = eos_store.get_eos_store().apply_patch([
+    {"op": "set", "product": "Windows Server", "version": "2019",
+     "entry": {"eos_date": "2031-01-01", "source": "Test"}},
+])
+database.apply_eos_patch(second, conn=conn)
+database.apply_eos_patch(first, conn=conn)
+mirrored = conn.execute(
+    "SELECT e.eos_date FROM eos_dates e JOIN products p ON p.id = e.product_id "
+    "WHERE p.product_name = 'Windows Server' AND e.version = '2019'"
+).fetchone()[0]
+stored = {r['raw_input']: r['eos_date'] for r in database.query_results(conn, patch_upload, limit=100)[0]}
+print(f"Out of order patches: mirror {mirrored}, rows {stored['win_svr_2019_std']}, "
+      f"version current: {database.get_meta(conn, 'eos_version') == second.version}")
+
+# A patch that only changes a date adds no match for unmatched rows, so
+# only the patched product's rows are looked up again
+third, _ = eos_store.get_eos_store().apply_patch([
+    {"op": "set", "product": "Windows Server", "version": "2019",
+     "entry": {"eos_date": "2031-06-30", "source": "Test"}},
+])
+stats = database.apply_eos_patch(third, conn=conn)
+windows_rows = conn.execute(
+    "SELECT COUNT(*) FROM software_inventory i JOIN products p ON p.id = i.normalized_product_id "
+    "WHERE p.product_name = 'Windows Server'"
+).fetchone()[0]
+print(f"Date-only patch: {stats}, rows matched to Windows Server: {windows_rows}")
+
+eos_store._store = real_store
+
+# Exposure forecast, answered from the count tables, matches scoring every
+# stored row as of each period start (here for the patched upload)
+forecast = database.forecast_upload(conn, patch_upload, periods=12, as_of=date(2025, 6, 15),
+                                    high_days=60, medium_days=365)
+print(f"\nForecast periods: {forecast['periods'][:3]} ... {forecast['periods'][-1]}, end {forecast['end']}")
+
+
+def scored(rows, day):
+    levels = Counter()
+    for r in rows:
+        if r['days_until_eos'] is None:
+            levels[r['risk_level'].lower()] += 1
+        else:
+            days = (date.fromisoformat(r['eos_date']) - day).days
+            levels[describe_risk(days, 60, 365)['risk_level'].lower()] += 1
+    return levels
+
+
+inventory, _ = database.query_results(conn, patch_upload, limit=100)
+starts = [date.fromisoformat(day) for day in forecast['periods']]
+expected = [scored(inventory, day) for day in starts]
+levels = ['critical', 'high', 'medium', 'low', 'unknown']
+print(f"Matches per-row scoring: "
+      f"{all(forecast['totals']['risk'][level] == [c[level] for c in expected] for level in levels)}")
+microsoft = [r for r in inventory if r['vendor'] == 'Microsoft']
+print(f"Microsoft matches: {forecast['by_vendor']['Microsoft']['risk']['critical'] == [scored(microsoft, day)['critical'] for day in starts]}")
+print(f"Crossing into CRITICAL per month: {forecast['totals']['crossings']['critical']}")
+print(f"Crossing into HIGH or worse per month: {forecast['totals']['crossings']['high']}")
+weekly = database.forecast_upload(conn, patch_upload, periods=4, interval='week', as_of=date(2025, 6, 15))
+print(f"Weekly periods: {weekly['periods']}")
+
+conn.close()
+shutil.rmtree(tmp_dir)
@@ -0,0 +1,87 @@
+import csv
+import os
+import shutil
+import tempfile
+import threading
+import database
+from csv_processor import process_rows, summarize_results
+from delta import ingest_delta, row_fingerprint
+
+# Use a throwaway database file
+tmp_dir = tempfile.mkdtemp()
+conn = database.connect(os.path.join(tmp_dir, 'test.db'))
+
+with open('data/sample_input.csv', newline='') as f:
+    rows = list(csv.DictReader(f))
+
+print("Testing Delta Ingestion:\n")
+
+print(f"Fingerprint: {row_fingerprint(rows[0])}")
+print(f"Same fields, same fingerprint: {row_fingerprint(dict(rows[0])) == row_fingerprint(rows[0])}")
+print(f"Other source, other fingerprint: {row_fingerprint({**rows[0], 'source': 'x'}) != row_fingerprint(rows[0])}")
+
+
+def show(label, delta):
+    print(f"\n{label}: upload {delta['upload_id']}, added {delta['added']}, "
+          f"removed {delta['removed']}, unchanged {delta['unchanged']}, "
+          f"processed {len(delta['results'])}")
+    summary = delta['summary']
+    print(f"  Summary: total {summary['total']}, critical {summary['critical']}, "
+          f"high {summary['high']}, low {summary['low']}, unknown {summary['unknown']}")
+
+
+# First export: everything is new
+show("First export", ingest_delta(rows, 'cmdb', 'export1.csv', conn=conn))
+
+# Same export again: nothing to do
+show("Same export", ingest_delta(rows, 'cmdb', 'export2.csv', conn=conn))
+
+# Two rows gone, one new row and one extra copy of an existing row
+changed = rows[2:] + [
+    {"software_name": "Notepad++ 8.5", "install_date": "2024-01-01", "source": "Endpoint"},
+    rows[5],
+]
+delta = ingest_delta(changed, 'cmdb', 'export3.csv', conn=conn)
+show("Changed export", delta)
+print(f"  Processed: {[r['raw_input'] for r in delta['results']]}")
+
+# The merged summary matches processing the whole export from scratch
+expected = summarize_results(process_rows(changed))
+print(f"  Matches a full run: {all(delta['summary'][k] == v for k, v in expected.items())}")
+print(f"  Stored row count: {database.get_upload(conn, delta['upload_id'])['row_count']}")
+
+# Another snapshot name is a separate inventory
+show("Other snapshot", ingest_delta(rows[:3], 'endpoint', 'endpoint.csv', conn=conn))
+
+# Concurrent uploads to a new snapshot name: one creates it, the other
+# finds every row already there. Each export waits (up to a second) for
+# the other to start reading, which only happens if nothing serializes them.
+deltas = []
+both_reading = threading.Barrier(2)
+
+
+def export_rows():
+    try:
+        both_reading.wait(timeout=1)
+    except threading.BrokenBarrierError:
+        pass
+    yield from rows
+
+
+def upload_export(n):
+    thread_conn = database.connect(os.path.join(tmp_dir, 'test.db'))
+    deltas.append(ingest_delta(export_rows(), 'race', f'race{n}.csv', conn=thread_conn))
+    thread_conn.close()
+
+
+threads = [threading.Thread(target=upload_export, args=(n,)) for n in range(2)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+uploads = [u for u in database.list_uploads(conn) if u['snapshot_name'] == 'race']
+print(f"\nConcurrent uploads: added {sorted(d['added'] for d in deltas)}, "
+      f"{len(uploads)} upload with {uploads[0]['row_count']} rows")
+
+conn.close()
+shutil.rmtree(tmp_dir)
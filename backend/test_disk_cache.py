@@ -0,0 +1,36 @@
+import os
+import shutil
+import tempfile
+from disk_cache import DiskCache, ruleset_key
+from normalizer import normalize_software_name
+from eos_lookup import lookup_eos_date
+
+# Use a throwaway cache file
+tmp_dir = tempfile.mkdtemp()
+cache = DiskCache(os.path.join(tmp_dir, 'cache.db'))
+
+print("Testing Disk Cache:\n")
+
+names = ["win_svr_2019_std", "oracle_db_19.3.0.0.0", "Notepad++ 8.5"]
+entries = []
+for name in names:
+    normalized = normalize_software_name(name)
+    eos_data = lookup_eos_date(normalized['vendor'], normalized['product'], normalized['version'])
+    entries.append((name, normalized, eos_data))
+
+cache.put_many(entries, eos_version="v1")
+
+found = cache.get_many(names + ["never seen"], eos_version="v1")
+for name in names:
+    normalized, eos_data = found[name]
+    print(f"  {name}: {normalized['vendor']} / {normalized['product']} {normalized['version']}"
+          f" -> {eos_data['eos_date'] if eos_data else None}")
+print(f"Round trip identical: {all(found[name] == (n, e) for name, n, e in entries)}")
+print(f"Stats: {cache.stats()}")
+
+# A different EOS database (or rule set) is a different namespace
+print(f"\nNamespaces differ per EOS version: {ruleset_key('v1') != ruleset_key('v2')}")
+print(f"Found after EOS change: {len(cache.get_many(names, eos_version='v2'))}")
+print(f"Old entries dropped: {cache.stats()['evictions']}")
+
+shutil.rmtree(tmp_dir)
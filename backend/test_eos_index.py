@@ -0,0 +1,66 @@
+import csv
+from eos_index import ProductIndex, VersionIndex, parse_version
+from eos_lookup import load_eos_database
+from normalizer import normalize_software_name
+from benchmark import generate_catalog, catalog_queries, measure_recall
+
+print("Testing Version Parsing:\n")
+
+for version in ["3.11.4", "7.0", "19c", "19.3.0.0.0", "2023.001", "DC", "365"]:
+    print(f"  {version:<12} -> {parse_version(version)}")
+
+print("\nTesting Version Index:\n")
+
+products = {
+    "Python": ["3.9", "3.10", "3.11", "3.12"],
+    "Oracle Database": ["19c", "21c"],
+    "Adobe Acrobat": ["DC", "2020"],
+    "Windows Server": ["2012", "2016", "2019", "2022"],
+    "Red Hat Enterprise Linux": ["8", "9"],
+    "VMware vSphere": ["7.0", "8.0"],
+}
+cases = [
+    ("Python", "3.11.4"),               # prefix
+    ("Python", "3.13"),                 # nearest lower release
+    ("Python", "2.7"),                  # older major: no match
+    ("Oracle Database", "19"),          # 19 == 19c
+    ("Adobe Acrobat", "dc"),            # named release
+    ("Windows Server", "2019"),         # exact, never 2016
+    ("Windows Server", "2020"),         # nearest lower year
+    ("Red Hat Enterprise Linux", "8.6"),
+    ("VMware vSphere", "7.0.3"),
+    ("VMware vSphere", "6.7"),
+]
+indexes = {product: VersionIndex(versions) for product, versions in products.items()}
+for product, version in cases:
+    print(f"  {product + ' ' + version:<34} -> {indexes[product].match(version)}")
+
+print("\nTesting Product Index:\n")
+
+index = ProductIndex(products)
+for vendor, product in [("Microsoft", "Windows Server"), ("Red Hat", "Linux"), (None, "Notepad++")]:
+    print(f"  {vendor} {product} -> {index.match(vendor, product)}")
+
+print("\nTesting Vendor Partitions:\n")
+
+vendors = {"Python": "Python Software Foundation", "Oracle Database": "Oracle",
+           "Adobe Acrobat": "Adobe", "Windows Server": "Microsoft",
+           "Red Hat Enterprise Linux": "Red Hat", "VMware vSphere": "VMware"}
+partitioned = ProductIndex(products, vendors=vendors)
+print(f"  Partitions: {sorted(partitioned.partitions)}")
+for vendor, product in [("Microsoft", "Windows Server"), ("Oracle", "Database"),
+                        (None, "VMware vSphere"), ("Adobe", "Acrobat Reader")]:
+    print(f"  {vendor} {product} -> {partitioned.match(vendor, product)}")
+
+print("\nTesting Trigram Blocking Recall:\n")
+
+# Sample file queries against the real EOS database
+with open('data/sample_input.csv', newline='') as f:
+    sample = [normalize_software_name(row['software_name']) for row in csv.DictReader(f)]
+report = measure_recall(list(load_eos_database()), [(n['vendor'], n['product']) for n in sample])
+print(f"  Sample set: {report['recall']:.0%} of {report['queries']} queries match exhaustive search")
+
+# Synthetic catalog
+catalog = generate_catalog(5000, seed=3)
+report = measure_recall(catalog, catalog_queries(catalog, 500, seed=3))
+print(f"  Synthetic {report['catalog_size']} products: {report['recall']:.1%} of {report['queries']} queries")
@@ -1,4 +1,9 @@
-from eos_lookup import lookup_eos_date
+import os
+import shutil
+import tempfile
+import eos_lookup
+import eos_store
+from eos_lookup import load_eos_database, lookup_eos_date, lookup_eos_batch
 
 # Test cases
 test_cases = [
@@ -23,4 +28,35 @@ for vendor, product, version in test_cases:
             print(f"  Notes: {result['notes']}")
     else:
         print(f"  ⚠️  Not found in database")
-    print()
\ No newline at end of file
+    print()
+
+# Callers get their own copy of the database
+db = load_eos_database()
+db["Windows Server"]["2019"]["eos_date"] = "1999-01-01"
+print(f"Changing a loaded copy leaves lookups alone: "
+      f"{lookup_eos_date('Microsoft', 'Windows Server', '2019')['eos_date'] != '1999-01-01'}\n")
+
+# Results looked up in a snapshot that a patch has since replaced are not
+# cached. Patches rewrite the EOS file, so the store is pointed at a copy.
+tmp_dir = tempfile.mkdtemp()
+real_store = eos_store._store
+eos_store._store = eos_store.EOSStore(os.path.join(tmp_dir, 'eos_database.json'))
+shutil.copy('data/eos_database.json', eos_store._store.path)
+
+triple = ("Microsoft", "Windows Server", "2019")
+before = eos_store.get_eos_store().snapshot()
+stale = lookup_eos_batch([triple])[triple]
+eos_store.get_eos_store().apply_patch([
+    {"op": "set", "product": "Windows Server", "version": "2019",
+     "entry": {"eos_date": "2031-01-01", "source": "Test"}},
+])
+
+# Another lookup moves the cache to the patched version, then an upload
+# still holding the old snapshot stores its results
+lookup_eos_batch([("Microsoft", "Office", "2019")])
+eos_lookup._cache_results([(triple, stale)], before.version)
+print(f"Before the patch: {stale['eos_date']}")
+print(f"After the patch: {lookup_eos_batch([triple])[triple]['eos_date']}")
+
+eos_store._store = real_store
+shutil.rmtree(tmp_dir)
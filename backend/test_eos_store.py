@@ -0,0 +1,89 @@
+import json
+import os
+import shutil
+import tempfile
+from eos_store import EOSStore, EOSSnapshot, apply_changes
+
+# Work on a temporary copy so the real database is never touched
+tmp_dir = tempfile.mkdtemp()
+db_path = os.path.join(tmp_dir, 'eos_database.json')
+shutil.copy('data/eos_database.json', db_path)
+
+store = EOSStore(db_path)
+
+print("Testing EOS Store:\n")
+
+# First access loads the file, the rest are served from memory
+for _ in range(1000):
+    db = store.get()
+print(f"After 1000 reads: {store.stats()}")
+
+# Touching the file without changing content should not re-parse it
+os.utime(db_path, ns=(0, 0))
+store.get()
+print(f"After touch: reloads={store.reloads}")
+
+# Changing the content triggers exactly one reload
+db = dict(db)
+db["Test Product"] = {"1.0": {"eos_date": "2030-01-01", "source": "Test"}}
+with open(db_path, 'w') as f:
+    json.dump(db, f)
+store.get()
+store.get()
+print(f"After edit: reloads={store.reloads}, products={len(store.get())}")
+
+# Patches: copy-on-write, only the touched products get new indexes
+before = store.snapshot()
+old_entry = before.db["Windows Server"]["2019"]
+snapshot, products = store.apply_patch([
+    {"op": "set", "product": "Windows Server", "version": "2019",
+     "entry": {"eos_date": "2030-01-09", "source": "Test"}},
+    {"op": "set", "product": "Notepad++", "version": "8", "entry": {"eos_date": None}},
+    {"op": "remove", "product": "Python", "version": "3.11"},
+])
+print(f"\nPatched: {sorted(products)}, patches={store.patches}, reloads={store.reloads}")
+print(f"Old snapshot unchanged: {before.db['Windows Server']['2019'] is old_entry and 'Notepad++' not in before.db}")
+print(f"New entry: {store.get()['Windows Server']['2019']}")
+print(f"Untouched indexes shared: {snapshot.version_indexes['SQL Server'] is before.version_indexes['SQL Server']}")
+print(f"Catalog changed: {snapshot.catalog_changed}, versions added: {snapshot.added_versions}")
+
+rebuilt = EOSSnapshot(snapshot.db, snapshot.version)
+queries = [("Microsoft", "Windows Server"), (None, "notepad++"), ("Python Software Foundation", "Python"),
+           ("Oracle", "Oracle DB"), (None, "acrobat reader")]
+print(f"Matches a rebuilt index: {snapshot.product_index.match_many(queries) == rebuilt.product_index.match_many(queries)}")
+
+# The file was rewritten: a fresh store loads the patched data
+print(f"File has the patch: {EOSStore(db_path).version == snapshot.version}")
+with open(db_path) as f:
+    print(f"Still on one line, like before the patch: {len(f.read().splitlines()) == 1}")
+
+# A date change adds no versions
+snapshot, _ = store.apply_patch([
+    {"op": "set", "product": "Windows Server", "version": "2019",
+     "entry": {"eos_date": "2030-01-10", "source": "Test"}},
+])
+print(f"Date change adds versions: {snapshot.added_versions}")
+
+# Patches keep the file's layout, so only the changed lines differ
+db = {"Café POS": {"1.0": {"eos_date": "2029-05-01", "source": "Vendor"}}, "Python": store.get()["Python"]}
+with open(db_path, 'w', encoding='utf-8') as f:
+    f.write(json.dumps(db, indent=4, ensure_ascii=False) + '\n')
+with open(db_path, encoding='utf-8') as f:
+    before_lines = f.read().splitlines(keepends=True)
+store.apply_patch([{"op": "set", "product": "Café POS", "version": "1.0",
+                    "entry": {"eos_date": "2029-06-01", "source": "Vendor"}}])
+with open(db_path, encoding='utf-8') as f:
+    after_lines = f.read().splitlines(keepends=True)
+changed = [(a, b) for a, b in zip(before_lines, after_lines) if a != b]
+print(f"Lines changed by the patch: {len(before_lines)} -> {len(after_lines)} lines, {changed}")
+
+# Bad patches are rejected as a whole
+for changes in [[{"op": "set", "product": "X", "version": "1", "entry": {"eos_date": "soon"}}],
+                [{"op": "remove", "product": "Python", "version": "1.0"}],
+                [{"op": "rename", "product": "Python"}]]:
+    try:
+        apply_changes(store.get(), changes)
+    except ValueError as e:
+        print(f"  Rejected: {e}")
+
+shutil.rmtree(tmp_dir)
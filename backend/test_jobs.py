@@ -0,0 +1,103 @@
+import io
+import threading
+import time
+import app
+import jobs
+from jobs import Job, JobQueue, QueueFull
+
+with open('data/sample_input.csv') as f:
+    csv_data = f.read()
+
+# Keep results in memory only
+jobs.PERSIST_UPLOADS = False
+
+# Jobs pause after their first row until released, so they can be
+# caught running (and others queued behind them)
+started = threading.Event()
+release = threading.Event()
+process_rows = jobs.iter_process_rows
+
+
+def paused_rows(rows):
+    for n, result in enumerate(process_rows(rows)):
+        yield result
+        if n == 0:
+            started.set()
+            release.wait()
+
+
+jobs.iter_process_rows = paused_rows
+
+
+def wait_until_finished(job, timeout=30):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    return job.status
+
+
+print("Testing Jobs:\n")
+
+# Progress and ETA from rows done so far
+job = Job('progress.csv')
+job.status = "running"
+job.started_at = time.time() - 2
+job.total_rows = 1000
+job.rows_done = 250
+progress = job.progress()
+print(f"Progress: {progress['percent']}% at {progress['rows_per_sec']} rows/sec, ETA {progress['eta_seconds']}s")
+
+# One worker, at most two jobs queued or running
+queue = JobQueue(workers=1, max_active=2, history=2)
+running = queue.submit(csv_data, 'running.csv')
+started.wait()
+queued = queue.submit(csv_data, 'queued.csv')
+print(f"\nStatuses: {running.status}, {queued.status}")
+
+try:
+    queue.submit(csv_data, 'third.csv')
+except QueueFull as e:
+    print(f"Queue full: {e}")
+
+# Same over HTTP: 429 with Retry-After, and results only once done
+jobs._queue = queue
+client = app.app.test_client()
+response = client.post('/api/process-csv?async=1',
+                       data={'file': (io.BytesIO(csv_data.encode('utf-8')), 'third.csv')})
+print(f"HTTP submit while full: {response.status_code}, Retry-After {response.headers.get('Retry-After')}")
+response = client.get(f'/api/jobs/{running.id}/results')
+print(f"Results while running: {response.status_code} {response.get_json()['message']}")
+
+# Cancelling a queued job takes effect right away
+queue.cancel(queued.id)
+print(f"\nCancelled while queued: {queued.status}")
+response = client.get(f'/api/jobs/{queued.id}/results')
+print(f"Results of a cancelled job: {response.status_code} {response.get_json()['message']}")
+
+# The running job finishes once released
+release.set()
+print(f"Running job: {wait_until_finished(running)}, {running.rows_done} of {running.total_rows} rows")
+response = client.get(f'/api/jobs/{running.id}/results')
+print(f"Results when done: {response.status_code}, {len(response.get_json()['results'])} rows")
+
+# Cancelling a running job stops it at the next row
+started.clear()
+release.clear()
+cancelled = queue.submit(csv_data, 'cancelled.csv')
+started.wait()
+queue.cancel(cancelled.id)
+print(f"\nCancel requested while {cancelled.status}")
+release.set()
+print(f"Running job: {wait_until_finished(cancelled)}, {cancelled.rows_done} of {cancelled.total_rows} rows")
+
+# Only the newest `history` finished jobs are kept
+for n in range(3):
+    wait_until_finished(queue.submit(csv_data, f'later{n}.csv'))
+last = queue.submit(csv_data, 'last.csv')
+kept = [job.filename for job in queue._jobs.values() if job.finished]
+print(f"\nFinished jobs kept (history=2): {kept}")
+print(f"Oldest job pruned: {queue.get(running.id) is None}")
+
+wait_until_finished(last)
+jobs._queue = None
+jobs.iter_process_rows = process_rows
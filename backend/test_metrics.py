@@ -0,0 +1,27 @@
+import metrics
+from metrics import Counter, Histogram
+from csv_processor import process_csv
+
+print("Testing Metrics:\n")
+
+# Counters and histograms render in the Prometheus text format
+requests = Counter("test_requests_total", "Test requests", labelnames=("status",))
+requests.inc(status="200")
+requests.inc(2, status="500")
+latency = Histogram("test_latency_seconds", "Test latency", buckets=(0.1, 1))
+for seconds in (0.05, 0.5, 5):
+    latency.observe(seconds)
+print('\n'.join(requests.render() + latency.render()))
+
+# Worker processes drain their metrics; the parent merges them
+copy = Histogram("test_latency_seconds", "Test latency", buckets=(0.1, 1))
+copy.merge(latency.drain())
+print(f"\nAfter drain/merge: {copy.render()[-1]}, original now has {len(latency.render())} lines")
+
+# Stage timings and row counts from a real run
+process_csv('data/sample_input.csv')
+print("\nPipeline metrics after the sample file:")
+for line in metrics.render().splitlines():
+    if line.startswith(("scrumbot_stage_seconds_count", "scrumbot_rows_processed_total",
+                        "scrumbot_eos_lookups_total", "scrumbot_cache_requests_total")):
+        print(f"  {line}")
@@ -1,4 +1,5 @@
-from normalizer import normalize_software_name
+import time
+from normalizer import normalize_software_name, AliasMatcher, VENDOR_ALIASES, VENDOR_MATCHER
 
 # Test cases from our sample data
 test_cases = [
@@ -18,4 +19,26 @@ for software in test_cases:
     print(f"  Product: {result['product']}")
     print(f"  Version: {result['version']}")
     print(f"  Edition: {result['edition']}")
-    print(f"  Confidence: {result['confidence_score']}\n")
\ No newline at end of file
+    print(f"  Confidence: {result['confidence_score']}\n")
+
+# Vendor detection: one trie walk per name, leftmost-longest alias wins
+print("Vendor aliases:")
+for name in ["vm ware esxi 7.0", "adobe reader for windows", "red hat linux", "winrar 6.2"]:
+    print(f"  {name} -> {VENDOR_MATCHER.find(name)}")
+
+# Punctuation in aliases has to be there in the name too
+punctuated = AliasMatcher({"Microsoft": ["c#"], "Notepad++": ["notepad++"], "AT&T": ["at&t"]})
+for name in ["c# 10", "c 10", "notepad++ 8.5", "notepad 8.5", "at&t vpn", "at t vpn"]:
+    print(f"  {name} -> {punctuated.find(name)}")
+
+# Per-name cost with thousands of vendors (synthetic aliases)
+names = [software.lower() for software in test_cases] * 2000
+large = dict(VENDOR_ALIASES)
+large.update({f"Vendor {i}": [f"vendor{i}", f"vendor {i} software"] for i in range(5000)})
+
+for label, matcher in [("built-in", VENDOR_MATCHER), ("5000 vendors", AliasMatcher(large))]:
+    start = time.perf_counter()
+    for name in names:
+        matcher.find(name)
+    elapsed = time.perf_counter() - start
+    print(f"  {label} ({matcher.size} aliases): {elapsed / len(names) * 1e6:.1f} us/name")
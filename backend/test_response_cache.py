@@ -0,0 +1,54 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from werkzeug.http import parse_accept_header
+from response_cache import ResponseCache, read_upload, response_key
+from responses import gzip_body, recompress
+
+# Use a throwaway cache file
+tmp_dir = tempfile.mkdtemp()
+cache = ResponseCache(os.path.join(tmp_dir, 'responses.db'), max_bytes=3000)
+
+print("Testing Response Cache:\n")
+
+with open('data/sample_input.csv', 'rb') as f:
+    upload = f.read()
+
+# Hashing while reading gives the same bytes and a stable hash
+data, content_hash = read_upload(io.BytesIO(upload), block_size=100)
+print(f"Read back intact: {data == upload}")
+print(f"Same hash in one block: {read_upload(io.BytesIO(upload))[1] == content_hash}")
+
+# Everything the results depend on is part of the key
+key = response_key(content_hash, "v1")
+print(f"\nKey: {len(key)} hex chars, stable: {key == response_key(content_hash, 'v1')}")
+print(f"Other EOS version, other key: {key != response_key(content_hash, 'v2')}")
+print(f"Other format, other key: {key != response_key(content_hash, 'v1', 'columnar')}")
+print(f"Tomorrow, other key: {key != response_key(content_hash, 'v1', today=date.today() + timedelta(days=1))}")
+
+# Stored bodies come back for gzip clients as-is, for others decompressed
+body = b'{"results": []}' * 50
+cache.put(key, gzip_body(body))
+stored = cache.get(key)
+print(f"\nHit: {stored is not None}, miss: {cache.get('unknown') is None}")
+print(f"gzip client: {recompress(stored, parse_accept_header('gzip'))[1]}")
+plain, encoding = recompress(stored, parse_accept_header('identity'))
+print(f"identity client: {encoding}, same body: {plain == body}")
+
+# Least recently used entries go once the size bound is exceeded
+for n in range(4):
+    cache.put(f"entry{n}", os.urandom(900))
+    cache.get(key)
+stats = cache.stats()
+print(f"\nEntries after filling: {stats['entries']}, {stats['bytes']} of {stats['max_bytes']} bytes")
+print(f"Recently used entry kept: {cache.get(key) is not None}, oldest evicted: {cache.get('entry0') is None}")
+cache.put("huge", os.urandom(5000))
+print(f"Too large to store: {cache.get('huge') is None}")
+
+# Entries from earlier days are dropped on the next write
+cache.put("tomorrow", b"x", today=date.today() + timedelta(days=1))
+print(f"Only the new day's entry left: {cache.stats()['entries']}")
+
+shutil.rmtree(tmp_dir)
@@ -0,0 +1,35 @@
+import gzip
+import json
+from werkzeug.http import parse_accept_header
+from csv_processor import process_csv
+from responses import encode_json, columnar, from_columnar, compress
+
+results = process_csv('data/sample_input.csv')
+
+print("Testing Responses:\n")
+
+# Same JSON as the standard library, keys sorted like jsonify
+body = encode_json({"results": results})
+plain = [result.to_dict() for result in results]
+print(f"Encoder output matches json.dumps: {json.loads(body) == json.loads(json.dumps({'results': plain}))}")
+
+# Columnar shape round-trips to the same rows
+table = columnar(results * 100)
+print(f"\nColumns: {table['columns']}")
+print(f"Dictionary-encoded: {sorted(table['dictionaries'])}")
+print(f"Vendor dictionary: {table['dictionaries']['vendor']}")
+print(f"Round trip identical: {from_columnar(table) == results * 100}")
+
+rows_size = len(encode_json({"results": results * 100}))
+columnar_size = len(encode_json({"results": table}))
+print(f"Size, 1500 rows: rows {rows_size:,} bytes, columnar {columnar_size:,} bytes")
+
+# Content negotiation (brotli is only offered if installed)
+for header in ["gzip, deflate", "br;q=1.0, gzip;q=0.5", "identity", "gzip;q=0"]:
+    compressed, encoding = compress(body, parse_accept_header(header))
+    print(f"\nAccept-Encoding: {header} -> {encoding}")
+    if encoding == 'gzip':
+        print(f"  {len(body):,} -> {len(compressed):,} bytes, decompresses to the same body: "
+              f"{gzip.decompress(compressed) == body}")
+
+print(f"\nSmall bodies are sent as-is: {compress(b'{}', parse_accept_header('gzip'))[1]}")
@@ -1,5 +1,6 @@
-from risk_calculator import calculate_risk
+from risk_calculator import calculate_risk, RISK_BUCKETS, bucket_counts, describe_risk
 from datetime import date, timedelta
+import numpy as np
 
 # Generate test dates relative to today
 today = date.today()
@@ -25,4 +26,17 @@ for eos_date, description in test_cases:
     print(f"  Risk Level: {result['risk_level']}")
     print(f"  Days Until EOS: {result['days_until_eos']}")
     print(f"  Reason: {result['reason']}")
-    print()
\ No newline at end of file
+    print()
+
+# Bucket sizes for several dates at once match scoring each row
+eos_days = np.array([19000, 19100, 19100, 19400, 20000])
+counts = np.array([1, 2, 3, 1, 5])
+as_of_days = np.array([18800, 19000, 19050, 19500])
+buckets = bucket_counts(eos_days, counts, as_of_days, high_days=90, medium_days=180)
+expected = [[sum(n for eos, n in zip(eos_days, counts)
+                 if describe_risk(int(eos - day), 90, 180)['risk_level'] == level)
+             for level in RISK_BUCKETS] for day in as_of_days]
+print("Bucket counts (CRITICAL, HIGH, MEDIUM, LOW) by day:")
+for day, row in zip(as_of_days, buckets):
+    print(f"  {day}: {row.tolist()}")
+print(f"Match per-row scoring: {buckets.tolist() == expected}")